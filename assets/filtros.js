@@ -0,0 +1,94 @@
+// Callbacks del navegador para los filtros del dashboard (ver dashboard_empresas.py).
+//
+// aplicar: los controles no disparan los callbacks del servidor directamente, sino que
+// copian su valor a los stores filtro-* tras una pausa. Una selección de varios municipios
+// o una serie de cambios seguidos llega al servidor como una sola petición por salida; las
+// llamadas que quedan superadas por otra más nueva no escriben nada.
+//
+// vista_previa: mientras tanto, los KPIs se calculan aquí con el cubo compacto del store
+// cubo-cliente, también mientras se arrastra el slider (drag_value), y el servidor los
+// confirma cuando llegan los filtros aplicados.
+
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    var turno = 0;
+
+    function miles(valor) {
+        return Math.round(valor).toLocaleString('en-US');
+    }
+
+    function fijo(valor, decimales) {
+        // toFixed redondea con el valor exacto, como Python, salvo en los empates exactos
+        // (26.5), que Python lleva al par: el desarrollo exacto termina en 5 y ceros
+        var exacto = valor.toFixed(decimales + 20);
+        if (/^50*$/.test(exacto.slice(exacto.length - 20))) {
+            var truncado = exacto.slice(0, exacto.length - 20).replace(/\.$/, '');
+            if (Number(truncado.slice(-1)) % 2 === 0) return truncado;
+        }
+        return valor.toFixed(decimales);
+    }
+
+    function resumen(cubo, sector, municipios, ventas) {
+        var elegidos = municipios && municipios.length ? new Set(municipios) : null;
+        var r = {
+            empresas: 0, nVentas: 0, sumaVentas: 0, maxVentas: -Infinity,
+            nEmpleados: 0, sumaEmpleados: 0, nRatio: 0, sumaRatio: 0, sectores: new Set()
+        };
+
+        for (var i = 0; i < cubo.empresas.length; i++) {
+            if (sector && cubo.sectores[cubo.sector[i]] !== sector) continue;
+            if (elegidos && !elegidos.has(cubo.municipios[cubo.municipio[i]])) continue;
+            // Mismos tramos que consultar_cubo: 2k para ventas exactas en k, 2k+1 entre k y k+1
+            if (ventas && (cubo.tramo[i] < 2 * ventas[0] || cubo.tramo[i] > 2 * ventas[1])) continue;
+
+            r.empresas += cubo.empresas[i];
+            r.nVentas += cubo.n_ventas[i];
+            r.sumaVentas += cubo.suma_ventas[i];
+            if (cubo.max_ventas[i] !== null && cubo.max_ventas[i] > r.maxVentas) r.maxVentas = cubo.max_ventas[i];
+            r.nEmpleados += cubo.n_empleados[i];
+            r.sumaEmpleados += cubo.suma_empleados[i];
+            r.nRatio += cubo.n_ratio[i];
+            r.sumaRatio += cubo.suma_ratio[i];
+            // pd.factorize deja el sector faltante en -1: suma en los totales pero no es un
+            // sector, igual que en nunique() del servidor
+            if (cubo.empresas[i] > 0 && cubo.sector[i] >= 0) r.sectores.add(cubo.sector[i]);
+        }
+        return r;
+    }
+
+    window.dash_clientside.filtros = {
+        aplicar: function (sector, municipios, ventas, retardo) {
+            var propio = ++turno;
+            var nada = window.dash_clientside.no_update;
+            // Al soltar el slider el valor ya es el definitivo: se aplica sin esperar
+            var disparo = window.dash_clientside.callback_context.triggered.map(function (t) {
+                return t.prop_id;
+            });
+            var espera = disparo.length === 1 && disparo[0] === 'ventas-slider.value' ? 0 : retardo;
+
+            return new Promise(function (resolver) {
+                setTimeout(function () {
+                    resolver(propio === turno ? [sector, municipios, ventas] : [nada, nada, nada]);
+                }, espera);
+            });
+        },
+
+        vista_previa: function (sector, municipios, arrastre, ventas, cubo) {
+            if (!cubo) {
+                return window.dash_clientside.no_update;
+            }
+            // Mismos textos que actualizar_kpis
+            var r = resumen(cubo, sector, municipios, arrastre || ventas);
+            return [
+                miles(r.empresas),
+                '$' + fijo(r.nVentas ? r.sumaVentas / r.nVentas : 0, 1) + 'M',
+                miles(r.nEmpleados ? r.sumaEmpleados : 0),
+                String(r.sectores.size),
+                '$' + fijo(r.nRatio ? r.sumaRatio / r.nRatio : 0, 2) + 'M',
+                '$' + fijo(r.nVentas ? r.maxVentas : 0, 1) + 'M',
+                fijo(r.nEmpleados ? r.sumaEmpleados / r.nEmpleados : 0, 0)
+            ];
+        }
+    };
+})();
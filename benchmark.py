@@ -0,0 +1,339 @@
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_kde import ventas_sinteticas
+
+# Benchmark del dashboard y de los scripts sobre datos sintéticos con la forma de los
+# de Boyacá: mismas columnas, 4 sectores y 108 municipios con pesos sesgados, ventas
+# sesgadas a la derecha y guardadas como texto, con ~18 % de valores inválidos.
+# Cada medición queda en un JSON (etapa, escenario, filas, tiempos) y --comparar
+# marca las etapas que se volvieron más lentas respecto a una corrida anterior.
+
+TAMANOS = [1_000, 100_000, 1_000_000]
+ETAPAS = ['carga', 'limpieza', 'dashboard', 'graficos']
+DIRECTORIO_RESULTADOS = "resultados_benchmark"
+
+# Escribir y leer Excel de un millón de filas toma varios minutos; por encima de este
+# tamaño las etapas con Excel se omiten (se pueden forzar con --max-filas-excel)
+MAX_FILAS_EXCEL = 100_000
+
+# Una etapa es una regresión si tarda más de (1 + TOLERANCIA) veces lo que tardaba y
+# al menos MINIMO_REGRESION segundos más (las etapas de microsegundos son solo ruido)
+TOLERANCIA = 0.25
+MINIMO_REGRESION = 0.001
+
+SECTORES = {'Artesanal': 0.639, 'Agroindustria': 0.253, 'Servicios': 0.072, 'Industria': 0.036}
+MUNICIPIOS = 108
+GENEROS = {'Masculino': 0.506, 'Femenino': 0.447, 'Otro': 0.047}
+PROGRAMAS = ['ARTESANIAS DE BOYACÁ', 'HERRAMIENTAS GERENCIALES', 'TERRITORIO DE SABORES',
+             'BOYACÁ EMPRENDE', 'BOYACÁ EXPORTA', 'MARCA TERRITORIAL SOY BOYACÁ']
+
+
+def _pesos_zipf(n):
+    pesos = 1 / np.arange(1, n + 1)
+    return pesos / pesos.sum()
+
+
+def _elegir(rng, opciones, n, pesos=None):
+    return np.asarray(opciones, dtype=object)[rng.choice(len(opciones), size=n, p=pesos)]
+
+
+def datos_crudos(n, semilla=0):
+    # Mismas columnas y tipos que la hoja original, antes de la limpieza
+    rng = np.random.default_rng(semilla)
+    ids = np.arange(1, n + 1)
+
+    ventas = np.char.mod('%.2f', ventas_sinteticas(n, semilla)).astype(object)
+    ventas[rng.random(n) < 0.178] = '2025-05-09 00:00:00'
+
+    programas = _elegir(rng, PROGRAMAS, n, _pesos_zipf(len(PROGRAMAS)))
+    combinados = rng.random(n) < 0.05
+    programas[combinados] = programas[combinados] + ' ;x| ' + _elegir(rng, PROGRAMAS, combinados.sum())
+
+    productos = _elegir(rng, [f"PRODUCTO {i}" for i in range(440)], n, _pesos_zipf(440))
+    productos[rng.random(n) < 0.208] = 'Sin datos'
+
+    acompanamiento = _elegir(rng, [f"ACOMPAÑAMIENTO {i}" for i in range(79)], n, _pesos_zipf(79))
+    acompanamiento[rng.random(n) < 0.05] = None
+
+    return pd.DataFrame({
+        'ID': ids,
+        'Año': np.full(n, 2022),
+        'NombreEmpresa': [f"EMPRESA {i} S.A.S." for i in ids],
+        'Municipio': _elegir(rng, [f"Municipio {i:03d}" for i in range(1, MUNICIPIOS + 1)], n,
+                             _pesos_zipf(MUNICIPIOS)),
+        'Correo': [f"contacto{i}@empresa{i}.com" for i in ids],
+        'SectorProductivo': _elegir(rng, list(SECTORES), n, list(SECTORES.values())),
+        'ProductoElaborado': productos,
+        'ProgramaVinculado': programas,
+        'AcompanamientoRecibido': acompanamiento,
+        'Estado': np.full(n, 'ACTIVA', dtype=object),
+        'Numero empleados': np.clip(rng.gamma(2, 12, n).round(), 1, 50).astype(int),
+        'Ventas mensuales (Millones)': ventas,
+        'Edad responsable': rng.integers(18, 66, n),
+        'Genero responsable': _elegir(rng, list(GENEROS), n, list(GENEROS.values())),
+        'Antiguedad empresa': rng.integers(0, 21, n),
+        'Registro Invima': _elegir(rng, ['No', 'Sí'], n, [0.8, 0.2]),
+    })
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos, resultado
+
+
+class Registro:
+    def __init__(self, filas):
+        self.filas = filas
+        self.resultados = []
+
+    def medir(self, etapa, funcion, repeticiones, escenario=None, **extra):
+        tiempos, resultado = medir(funcion, repeticiones)
+        self.resultados.append({
+            'etapa': etapa,
+            'escenario': escenario,
+            'filas': self.filas,
+            'repeticiones': repeticiones,
+            'segundos_min': min(tiempos),
+            'segundos_mediana': statistics.median(tiempos),
+            **extra,
+        })
+        print(f"   {etapa}{f' [{escenario}]' if escenario else ''}: {min(tiempos) * 1000:.1f} ms")
+        return resultado
+
+
+def etapas_carga_limpieza(registro, crudo, carpeta, etapas, repeticiones, max_filas_excel):
+    import limpiar_datos_empresas as limpieza
+    from carga_datos import cargar_datos
+
+    n = len(crudo)
+    if 'limpieza' in etapas:
+        registro.medir('limpieza.limpiar', lambda: limpieza.limpiar(crudo.copy()), repeticiones)
+    ruta_parquet = os.path.join(carpeta, "limpio.parquet")
+    limpieza.limpiar(crudo.copy()).to_parquet(ruta_parquet, index=False)
+    if 'carga' in etapas:
+        registro.medir('carga.cargar_datos_parquet', lambda: cargar_datos(ruta_parquet), repeticiones)
+
+    if n > max_filas_excel:
+        print(f"   etapas con Excel omitidas ({n:,} filas > {max_filas_excel:,})")
+        return ruta_parquet
+
+    ruta_cruda = os.path.join(carpeta, "crudo.xlsx")
+    ruta_limpia = os.path.join(carpeta, "limpio.xlsx")
+    crudo.to_excel(ruta_cruda, sheet_name=limpieza.hoja, index=False)
+    # Las etapas con Excel se miden una sola vez: son las más lentas y las menos ruidosas
+    if 'carga' in etapas:
+        registro.medir('carga.read_excel', lambda: pd.read_excel(ruta_cruda, sheet_name=limpieza.hoja), 1)
+    if 'limpieza' in etapas:
+        registro.medir('limpieza.limpiar_archivo',
+                       lambda: limpieza.limpiar_archivo(ruta_cruda, ruta_limpia, limpieza.hoja), 1)
+    if 'carga' in etapas:
+        if not os.path.exists(ruta_limpia):
+            limpieza.limpiar_archivo(ruta_cruda, ruta_limpia, limpieza.hoja)
+        cache = os.path.join(carpeta, "cache")
+        registro.medir('carga.cargar_datos_excel', lambda: cargar_datos(ruta_limpia, cache), 1)
+        registro.medir('carga.cargar_datos_cache', lambda: cargar_datos(ruta_limpia, cache), repeticiones)
+    return ruta_parquet
+
+
+def escenarios_filtro(df):
+    from dashboard_empresas import limites_slider
+
+    minimo, maximo = limites_slider(df)
+    sector = df['SectorProductivo'].value_counts().index[0]
+    municipios = list(df['Municipio'].value_counts().index[:3])
+    return {
+        'todos': (None, None, [minimo, maximo]),
+        'sector': (sector, None, [minimo, maximo]),
+        'municipios_ventas': (None, municipios, [5, 30]),
+    }
+
+
+def etapas_dashboard(registro, ruta_parquet, repeticiones):
+    import plotly.io as pio
+
+    import dashboard_empresas as dashboard
+    from cubo_agregados import consultar_cubo, resumen_kpis, conteo_por
+    from consulta_tabla import consultar_tabla
+    from estadisticas import combinar
+
+    datos = registro.medir('dashboard.preparar_datos', lambda: dashboard.preparar_datos(ruta_parquet), 1)
+    # Los callbacks leen los datos del vigilante: se le dan los sintéticos y se apaga la
+    # revisión del archivo para que no los reemplace por los reales
+    datos['version'] = f"benchmark-{registro.filas}"
+    dashboard.vigilante.intervalo = 0
+    dashboard.vigilante.datos = datos
+
+    def a_json(objeto):
+        return pio.json.to_json_plotly(objeto)
+
+    def sin_avance(avance):
+        pass
+
+    for escenario, (sector, municipios, ventas_range) in escenarios_filtro(datos['df']).items():
+        clave = (sector, tuple(sorted(municipios)) if municipios else None, tuple(ventas_range))
+        def filtrar_sin_cache():
+            datos['cache_filtrado'].limpiar()
+            return datos['filtrar_filas'](*clave)
+
+        filtrado = registro.medir('dashboard.filtro', filtrar_sin_cache, repeticiones, escenario)
+        celdas = registro.medir('dashboard.cubo', lambda: consultar_cubo(datos['cubo'], sector, municipios, ventas_range),
+                                repeticiones, escenario)
+        registro.medir('dashboard.kpis', lambda: resumen_kpis(celdas), repeticiones, escenario)
+
+        figuras = {
+            'histograma': lambda: dashboard.figura_histograma(filtrado),
+            'boxplot': lambda: dashboard.figura_boxplot(filtrado),
+            'pastel': lambda: dashboard.figura_pastel(conteo_por(celdas, 'Genero responsable')),
+            'barras': lambda: dashboard.figura_barras(conteo_por(celdas, 'Municipio').nlargest(10)),
+            'dispersion': lambda: dashboard.figura_dispersion(filtrado),
+            'correlacion': lambda: dashboard.figura_correlacion(combinar(datos['momentos'], celdas.index.to_numpy())),
+        }
+        for nombre, construir in figuras.items():
+            figura = registro.medir(f"dashboard.figura.{nombre}", construir, repeticiones, escenario)
+            cuerpo = dashboard.solo_datos(figura)
+            texto = registro.medir(f"dashboard.json.{nombre}", lambda: a_json(cuerpo), repeticiones, escenario)
+            registro.resultados[-1]['bytes'] = len(texto)
+
+        tabla = registro.medir('dashboard.tabla',
+                               lambda: consultar_tabla(filtrado, None, None, 0, 10, dashboard.COLUMNAS_TABLA),
+                               repeticiones, escenario)
+        texto = registro.medir('dashboard.json.tabla', lambda: a_json(tabla), repeticiones, escenario)
+        registro.resultados[-1]['bytes'] = len(texto)
+
+        # Callbacks completos sin la caché de resultados ni la de filtrado, como en la
+        # primera petición con esos filtros. Los de segundo plano se llaman aquí mismo,
+        # sin el proceso aparte, y reciben un set_progress que no hace nada
+        def callbacks():
+            datos['cache_filtrado'].limpiar()
+            for callback in (dashboard.actualizar_kpis, dashboard.actualizar_histograma,
+                             dashboard.actualizar_boxplot, dashboard.actualizar_piechart,
+                             dashboard.actualizar_barchart, dashboard.actualizar_correlacion):
+                a_json(inspect.unwrap(callback)(sector, municipios, ventas_range))
+            a_json(dashboard.actualizar_scatterplot(sin_avance, sector, municipios, ventas_range))
+            a_json(dashboard.pagina_tabla(sin_avance, sector, municipios, ventas_range, 0, 10, [], None))
+
+        registro.medir('dashboard.callbacks', callbacks, repeticiones, escenario, filas_seleccionadas=len(filtrado))
+
+
+def etapas_graficos(registro, ruta_parquet, repeticiones):
+    import matplotlib.pyplot as plt
+
+    import graficos_empresas as graficos
+    from carga_datos import cargar_datos
+
+    plt.switch_backend('Agg')
+    graficos.aplicar_estilo()
+    df = cargar_datos(ruta_parquet)
+
+    def renderizar(nombre):
+        funcion, _, _ = graficos.GRAFICOS[nombre]
+        funcion(graficos.datos_grafico(df, nombre))
+        graficos.guardar(nombre, io.BytesIO())
+        plt.close('all')
+
+    for nombre in graficos.GRAFICOS:
+        registro.medir(f"graficos.{nombre}", lambda: renderizar(nombre), repeticiones)
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def entorno():
+    import plotly
+    import dash
+
+    return {
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'dash': dash.__version__,
+    }
+
+
+def comparar(resultados, ruta_anterior, tolerancia=TOLERANCIA):
+    with open(ruta_anterior, encoding='utf-8') as f:
+        anterior = json.load(f)
+    base = {(r['etapa'], r['escenario'], r['filas']): r for r in anterior['resultados']}
+
+    print(f" Comparación con {ruta_anterior} (commit {anterior['entorno'].get('commit')}):")
+    regresiones = 0
+    for r in resultados:
+        previo = base.get((r['etapa'], r['escenario'], r['filas']))
+        if previo is None:
+            continue
+        antes, ahora = previo['segundos_min'], r['segundos_min']
+        razon = ahora / antes if antes > 0 else float('inf')
+        es_regresion = razon > 1 + tolerancia and ahora - antes > MINIMO_REGRESION
+        regresiones += es_regresion
+        if es_regresion or razon < 1 / (1 + tolerancia):
+            marca = "REGRESIÓN" if es_regresion else "mejora"
+            escenario = f" [{r['escenario']}]" if r['escenario'] else ""
+            print(f"   {marca}: {r['etapa']}{escenario} ({r['filas']:,} filas): "
+                  f"{antes * 1000:.1f} ms -> {ahora * 1000:.1f} ms ({razon:.2f}x)")
+    print(f" {regresiones} regresiones")
+    return regresiones
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del dashboard y de los scripts con datos sintéticos")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--max-filas-excel', type=int, default=MAX_FILAS_EXCEL,
+                        help="Tamaño máximo para las etapas que leen o escriben Excel")
+    parser.add_argument('--salida', help=f"Archivo JSON de resultados (por defecto {DIRECTORIO_RESULTADOS}/<commit>.json)")
+    parser.add_argument('--comparar', metavar='JSON', help="Resultados anteriores con los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help="Aumento relativo a partir del cual una etapa cuenta como regresión")
+    args = parser.parse_args()
+
+    informacion = entorno()
+    todos = []
+    for n in args.tamanos:
+        print(f" {n:,} filas")
+        registro = Registro(n)
+        crudo = datos_crudos(n)
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as carpeta:
+            ruta_parquet = etapas_carga_limpieza(registro, crudo, carpeta, args.etapas, args.repeticiones,
+                                                 args.max_filas_excel)
+            if 'dashboard' in args.etapas:
+                etapas_dashboard(registro, ruta_parquet, args.repeticiones)
+            if 'graficos' in args.etapas:
+                etapas_graficos(registro, ruta_parquet, args.repeticiones)
+        todos.extend(registro.resultados)
+
+    salida = args.salida or os.path.join(DIRECTORIO_RESULTADOS, f"{informacion['commit'] or 'sin_commit'}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump({'entorno': informacion, 'resultados': todos}, f, indent=1, ensure_ascii=False)
+    print(f" Resultados guardados en {salida}")
+
+    if args.comparar:
+        sys.exit(1 if comparar(todos, args.comparar, args.tolerancia) else 0)
@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from resumenes_graficos import densidad_kde
+
+# Compara densidad_kde (binning + FFT) con scipy.stats.gaussian_kde sobre ventas
+# sintéticas con una forma parecida a la de los datos reales (entre 1 y 49 millones,
+# sesgadas a la derecha), evaluando ambas en 200 puntos como el histograma.
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+PUNTOS = 200
+
+
+def ventas_sinteticas(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.clip(rng.lognormal(mean=2.3, sigma=0.7, size=n), 1, 49).round(2)
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de la KDE del histograma de ventas")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--ancho-banda', default='scott')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    ancho_banda = args.ancho_banda if args.ancho_banda in ('scott', 'silverman') else float(args.ancho_banda)
+    print(f"{'filas':>10} {'gaussian_kde (s)':>17} {'densidad_kde (s)':>17} {'aceleración':>12} {'error relativo':>15}")
+    for n in args.tamanos:
+        ventas = ventas_sinteticas(n)
+        x = np.linspace(ventas.min(), ventas.max(), PUNTOS)
+
+        # gaussian_kde es lenta en los tamaños grandes: una sola repetición basta
+        t_scipy, esperado = cronometrar(lambda: gaussian_kde(ventas, bw_method=ancho_banda)(x), 1)
+        t_fft, obtenido = cronometrar(lambda: densidad_kde(ventas, x, ancho_banda), args.repeticiones)
+        error = np.abs(esperado - obtenido).max() / esperado.max()
+        print(f"{n:>10,} {t_scipy:>17.4f} {t_fft:>17.4f} {t_scipy / t_fft:>11.0f}x {error:>15.1e}")
@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+
+from plotly.io.json import to_json_plotly
+
+# Caché de resultados de los callbacks: muchos usuarios abren el dashboard con los
+# mismos filtros (sin filtro, un sector popular, Tunja/Duitama/Sogamoso...), así que
+# se guarda el JSON ya serializado de cada salida para esa combinación de filtros.
+# Primero se busca en memoria (LRU acotada por bytes) y, si se configura
+# CACHE_RESULTADOS_DB, en una base SQLite local compartida por todos los workers.
+
+MAX_BYTES_MEMORIA = int(float(os.environ.get("CACHE_RESULTADOS_MB", 64)) * 1024 * 1024)
+MAX_BYTES_COMPARTIDA = int(float(os.environ.get("CACHE_RESULTADOS_DB_MB", 512)) * 1024 * 1024)
+RUTA_COMPARTIDA = os.environ.get("CACHE_RESULTADOS_DB")
+
+
+# Cachés creadas en este proceso, para rehacer sus locks en los procesos hijos
+_caches = weakref.WeakSet()
+
+
+def _tras_fork():
+    # Un hijo creado con fork desde un worker con varios hilos (los trabajos en segundo
+    # plano) hereda los locks como estaban: uno tomado por otro hilo no se soltaría nunca
+    for cache in list(_caches):
+        cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+
+def clave_filtros(sector, municipios, ventas_range):
+    # Normaliza los filtros para que el orden de los municipios o una lista vacía
+    # no generen claves distintas para el mismo resultado
+    return json.dumps([
+        sector or None,
+        sorted(municipios) if municipios else None,
+        [float(v) for v in ventas_range] if ventas_range else None,
+    ], ensure_ascii=False)
+
+
+class CacheLRU:
+    # medida(valor) da los bytes de cada entrada: por defecto len(), para el JSON serializado
+    def __init__(self, max_bytes=MAX_BYTES_MEMORIA, medida=len):
+        self.max_bytes = max_bytes
+        self.medida = medida
+        self.bytes = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[0]
+
+    def guardar(self, clave, valor):
+        tamano = self.medida(valor)
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self.bytes -= anterior[1]
+
+            self._datos[clave] = (valor, tamano)
+            self.bytes += tamano
+
+            # Se descartan las entradas usadas hace más tiempo hasta volver al límite
+            while self.bytes > self.max_bytes:
+                _, (_, tamano_descartado) = self._datos.popitem(last=False)
+                self.bytes -= tamano_descartado
+
+    def limpiar(self, conservar=None):
+        # conservar(clave) indica qué entradas se quedan; sin él se borra todo
+        with self._lock:
+            if conservar is None:
+                self._datos.clear()
+                self.bytes = 0
+                return
+            for clave in [clave for clave in self._datos if not conservar(clave)]:
+                self.bytes -= self._datos.pop(clave)[1]
+
+
+class CacheSQLite:
+    def __init__(self, ruta, max_bytes=MAX_BYTES_COMPARTIDA):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self._conexion = None
+        self._pid = None
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def _conectar(self):
+        # Cada proceso (worker de gunicorn) abre su propia conexión tras el fork
+        if self._conexion is None or self._pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=5, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                "clave TEXT PRIMARY KEY, valor BLOB NOT NULL, tamano INTEGER NOT NULL, usado REAL NOT NULL)"
+            )
+            conexion.execute("CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado)")
+            self._conexion, self._pid = conexion, os.getpid()
+        return self._conexion
+
+    def obtener(self, clave):
+        with self._lock:
+            conexion = self._conectar()
+            fila = conexion.execute("SELECT valor FROM resultados WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            with conexion:
+                conexion.execute("UPDATE resultados SET usado = ? WHERE clave = ?", (time.time(), clave))
+            return fila[0]
+
+    def guardar(self, clave, valor):
+        tamano = len(valor)
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                conexion.execute(
+                    "INSERT OR REPLACE INTO resultados (clave, valor, tamano, usado) VALUES (?, ?, ?, ?)",
+                    (clave, valor, tamano, time.time())
+                )
+                total = conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM resultados").fetchone()[0]
+                if total <= self.max_bytes:
+                    return
+
+                # Se borran las entradas usadas hace más tiempo hasta volver al límite
+                sobrante = total - self.max_bytes
+                for clave_vieja, tamano_viejo in conexion.execute(
+                        "SELECT clave, tamano FROM resultados ORDER BY usado").fetchall():
+                    if sobrante <= 0:
+                        break
+                    conexion.execute("DELETE FROM resultados WHERE clave = ?", (clave_vieja,))
+                    sobrante -= tamano_viejo
+
+    def limpiar(self, conservar_con=None):
+        # Con conservar_con se borran solo las claves que no contienen ese texto
+        with self._lock:
+            conexion = self._conectar()
+            with conexion:
+                if conservar_con is None:
+                    conexion.execute("DELETE FROM resultados")
+                else:
+                    conexion.execute("DELETE FROM resultados WHERE instr(clave, ?) = 0", (conservar_con,))
+
+
+cache_memoria = CacheLRU()
+cache_compartida = CacheSQLite(RUTA_COMPARTIDA) if RUTA_COMPARTIDA else None
+
+
+def _obtener(clave):
+    valor = cache_memoria.obtener(clave)
+    if valor is None and cache_compartida is not None:
+        valor = cache_compartida.obtener(clave)
+        if valor is not None:
+            cache_memoria.guardar(clave, valor)
+    return valor
+
+
+def _guardar(clave, valor):
+    cache_memoria.guardar(clave, valor)
+    if cache_compartida is not None:
+        cache_compartida.guardar(clave, valor)
+
+
+def limpiar_cache(version=None):
+    # Sin versión se borra todo. Con la versión vigente se borra solo lo calculado con
+    # otros datos: en la base compartida quedan los resultados que otro worker ya
+    # recargado guardó para la misma versión
+    if version is None:
+        cache_memoria.limpiar()
+        if cache_compartida is not None:
+            cache_compartida.limpiar()
+        return
+
+    marca = f":{version}:"
+    cache_memoria.limpiar(lambda clave: marca in clave)
+    if cache_compartida is not None:
+        cache_compartida.limpiar(marca)
+
+
+def cachear_resultado(nombre, version=None):
+    # Decorador para callbacks con firma (sector, municipios, ventas_range). Guarda la
+    # salida ya serializada; en un acierto se devuelve el JSON decodificado, que Dash
+    # acepta igual que la figura o el componente original.
+    # version() identifica los datos vigentes: tras una recarga las claves cambian y
+    # los resultados anteriores dejan de usarse. Se lee antes de calcular, así que un
+    # resultado nunca queda guardado bajo una versión más nueva que la de sus datos
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(sector, municipios, ventas_range):
+            prefijo = f"{nombre}:{version()}" if version else nombre
+            clave = f"{prefijo}:{clave_filtros(sector, municipios, ventas_range)}"
+            valor = _obtener(clave)
+            if valor is not None:
+                return json.loads(valor)
+
+            resultado = funcion(sector, municipios, ventas_range)
+            _guardar(clave, to_json_plotly(resultado).encode('utf-8'))
+            return resultado
+        return envoltura
+    return decorador
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# Archivo limpio generado por limpiar_datos_empresas.py
+ARCHIVO_LIMPIO = "PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx"
+
+# Carpeta donde se guarda la copia columnar (Parquet) del archivo limpio
+DIRECTORIO_CACHE = os.environ.get("CACHE_DATOS_DIR", ".cache_datos")
+
+# Tipos de las columnas en memoria: las de pocos valores distintos como categoría, el
+# texto libre como cadenas de Arrow y los enteros con el menor tamaño que los contiene.
+# Las ventas se dejan en float64 para no cambiar los promedios por redondeo
+COLUMNAS_CATEGORICAS = [
+    'Municipio', 'SectorProductivo', 'ProgramaVinculado', 'AcompanamientoRecibido',
+    'Estado', 'Genero responsable', 'Registro Invima',
+]
+COLUMNAS_TEXTO = ['NombreEmpresa', 'Correo', 'ProductoElaborado']
+COLUMNAS_ENTERAS = ['ID', 'Año', 'Numero empleados', 'Edad responsable', 'Antiguedad empresa']
+
+
+def _hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _rutas_cache(ruta_excel, directorio):
+    base = os.path.splitext(os.path.basename(ruta_excel))[0]
+    return (os.path.join(directorio, f"{base}.parquet"),
+            os.path.join(directorio, f"{base}.json"))
+
+
+def _escribir_atomico(ruta, escribir):
+    # Se escribe en un temporal y se renombra, así otro worker nunca lee un archivo a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def _guardar_json(ruta, datos):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f)
+
+
+def aplicar_esquema(df):
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns and not isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].astype('category')
+    for columna in COLUMNAS_TEXTO:
+        if columna in df.columns:
+            df[columna] = df[columna].astype(pd.StringDtype('pyarrow'))
+    for columna in COLUMNAS_ENTERAS:
+        # Solo si la columna no tiene faltantes (en ese caso read_excel la deja en float)
+        if columna in df.columns and pd.api.types.is_integer_dtype(df[columna]):
+            df[columna] = pd.to_numeric(df[columna], downcast='integer')
+    return df
+
+
+def reporte_memoria(antes, despues):
+    # Memoria por columna (en KB) antes y después de aplicar el esquema
+    memoria_antes = antes.memory_usage(deep=True, index=False)
+    memoria_despues = despues.memory_usage(deep=True, index=False)
+    lineas = [f"   {columna}: {antes[columna].dtype} {memoria_antes[columna] / 1024:.1f} KB -> "
+              f"{despues[columna].dtype} {memoria_despues[columna] / 1024:.1f} KB"
+              for columna in antes.columns]
+    lineas.append(f"   Total: {memoria_antes.sum() / 1024:.1f} KB -> {memoria_despues.sum() / 1024:.1f} KB")
+    return "\n".join(lineas)
+
+
+def cache_vigente(ruta_excel=ARCHIVO_LIMPIO, directorio=DIRECTORIO_CACHE):
+    ruta_parquet, ruta_meta = _rutas_cache(ruta_excel, directorio)
+    if not (os.path.exists(ruta_parquet) and os.path.exists(ruta_meta)):
+        return False
+
+    try:
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    estado = os.stat(ruta_excel)
+    if meta.get('mtime_ns') == estado.st_mtime_ns and meta.get('tamano') == estado.st_size:
+        return True
+
+    # La fecha cambió (copia, checkout de git...) pero el contenido puede ser el mismo
+    if meta.get('sha256') != _hash_archivo(ruta_excel):
+        return False
+
+    meta.update(mtime_ns=estado.st_mtime_ns, tamano=estado.st_size)
+    _escribir_atomico(ruta_meta, lambda r: _guardar_json(r, meta))
+    return True
+
+
+def construir_cache(ruta_excel=ARCHIVO_LIMPIO, directorio=DIRECTORIO_CACHE):
+    ruta_parquet, ruta_meta = _rutas_cache(ruta_excel, directorio)
+    estado = os.stat(ruta_excel)
+    df = aplicar_esquema(pd.read_excel(ruta_excel))
+
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        _escribir_atomico(ruta_parquet, lambda r: df.to_parquet(r, index=False))
+        meta = {
+            'origen': os.path.abspath(ruta_excel),
+            'mtime_ns': estado.st_mtime_ns,
+            'tamano': estado.st_size,
+            'sha256': _hash_archivo(ruta_excel),
+        }
+        _escribir_atomico(ruta_meta, lambda r: _guardar_json(r, meta))
+    except Exception as e:
+        # Sin caché el dashboard sigue funcionando, solo arranca más lento
+        print(f"No se pudo guardar la caché de datos: {e}")
+
+    return df
+
+
+def cargar_datos(ruta_excel=ARCHIVO_LIMPIO, directorio=DIRECTORIO_CACHE):
+    # El almacén Parquet del modo incremental de la limpieza ya es columnar
+    if ruta_excel.lower().endswith('.parquet'):
+        return aplicar_esquema(pd.read_parquet(ruta_excel))
+
+    ruta_parquet, _ = _rutas_cache(ruta_excel, directorio)
+    if cache_vigente(ruta_excel, directorio):
+        try:
+            # Las cachés guardadas antes del esquema se convierten al leerlas
+            return aplicar_esquema(pd.read_parquet(ruta_parquet))
+        except Exception as e:
+            print(f"Caché de datos ilegible, se reconstruye: {e}")
+    return construir_cache(ruta_excel, directorio)
+
+
+if __name__ == '__main__':
+    # Permite generar la caché antes de arrancar el servidor (por ejemplo en el build)
+    datos = construir_cache()
+    print(f"Caché generada en {DIRECTORIO_CACHE}: {len(datos)} filas, {len(datos.columns)} columnas")
+    print(" Memoria por columna:")
+    print(reporte_memoria(pd.read_excel(ARCHIVO_LIMPIO), datos))
@@ -0,0 +1,113 @@
+import math
+import re
+
+import pandas as pd
+
+# Paginación, orden y filtros de la tabla resueltos en el servidor sobre todas las
+# filas filtradas: el navegador solo recibe la página visible.
+
+# Formato de cada parte de filter_query: "{Columna} operador valor". Los operadores
+# con "i" no distinguen mayúsculas (la tabla usa filter_options={'case': 'insensitive'})
+PATRON_FILTRO = re.compile(r"^\s*\{(?P<nombre>[^}]*)\}\s*(?P<operador>>=|<=|!=|<|>|=|[a-z]+)\s*(?P<valor>.*)$", re.S)
+
+
+def separar_filtro(parte):
+    # Convierte "{Columna} op valor" en (columna, operador, valor). El valor queda como
+    # texto: la tabla solo pone comillas a los valores con espacios, así que "1" puede
+    # ser el texto a buscar en un correo; se convierte a número al comparar (ver _comparar)
+    coincidencia = PATRON_FILTRO.match(parte)
+    if coincidencia is None:
+        return None, None, None
+
+    valor = coincidencia.group('valor').strip()
+    comilla = valor[:1]
+    if comilla and len(valor) > 1 and comilla == valor[-1] and comilla in ("'", '"', '`'):
+        valor = valor[1:-1].replace('\\' + comilla, comilla)
+    return coincidencia.group('nombre'), coincidencia.group('operador'), valor
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+
+def _comparar(columna, operador, valor):
+    if operador in ('ieq', 'ine', 'icontains'):
+        operador = operador[1:]
+        if not pd.api.types.is_numeric_dtype(columna):
+            columna = columna.str.lower()
+            valor = valor.lower()
+
+    # Solo las comparaciones con una columna numérica usan el valor como número;
+    # contains y datestartswith, y las columnas de texto, usan el texto tal cual
+    if pd.api.types.is_numeric_dtype(columna) and operador not in ('contains', 'datestartswith'):
+        valor = _numero(valor)
+
+    if operador in ('eq', '='):
+        return columna == valor
+    if operador in ('ne', '!='):
+        return columna != valor
+    if operador == 'contains':
+        return columna.astype(str).str.contains(valor, regex=False, na=False)
+    if operador == 'datestartswith':
+        return columna.astype(str).str.startswith(valor, na=False)
+    if operador in ('lt', '<'):
+        return columna < valor
+    if operador in ('le', '<='):
+        return columna <= valor
+    if operador in ('gt', '>'):
+        return columna > valor
+    if operador in ('ge', '>='):
+        return columna >= valor
+    return pd.Series(True, index=columna.index)
+
+
+def _condicion(columna, operador, valor):
+    resultado = _comparar(columna, operador, valor)
+    if resultado.dtype != bool:
+        # Las columnas de texto Arrow devuelven NA al comparar un faltante; se resuelve
+        # como con las columnas object: un faltante solo cumple "distinto de"
+        resultado = resultado.fillna(operador in ('ne', '!=', 'ine')).astype(bool)
+    return resultado
+
+
+def aplicar_filtros(df, filter_query):
+    if not filter_query:
+        return df
+
+    mascara = pd.Series(True, index=df.index)
+    for parte in filter_query.split(' && '):
+        nombre, operador, valor = separar_filtro(parte)
+        if nombre not in df.columns:
+            continue
+        try:
+            mascara &= _condicion(df[nombre], operador, valor)
+        except TypeError:
+            # Comparar un número con texto (p. ej. "> abc" en una columna numérica) no deja pasar ninguna fila
+            mascara &= False
+    return df[mascara]
+
+
+def ordenar(df, sort_by):
+    if not sort_by:
+        return df
+    columnas = [orden['column_id'] for orden in sort_by if orden['column_id'] in df.columns]
+    ascendente = [orden['direction'] == 'asc' for orden in sort_by if orden['column_id'] in df.columns]
+    if not columnas:
+        return df
+    return df.sort_values(columnas, ascending=ascendente, kind='stable', na_position='last')
+
+
+def consultar_tabla(df, filter_query=None, sort_by=None, page_current=0, page_size=10, columnas=None):
+    # Solo se filtra y ordena por las columnas visibles, así que no hace falta mover el resto
+    if columnas is not None:
+        df = df[columnas]
+
+    resultado = ordenar(aplicar_filtros(df, filter_query), sort_by)
+    total_paginas = max(1, math.ceil(len(resultado) / page_size))
+    pagina = min(page_current or 0, total_paginas - 1)
+
+    inicio = pagina * page_size
+    return resultado.iloc[inicio:inicio + page_size].to_dict('records'), total_paginas
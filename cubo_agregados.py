@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Cubo de agregados precalculados: cada celda resume las empresas de una combinación
+# Sector x Municipio x Género x tramo de ventas, así los KPIs, el pastel y el top de
+# municipios se responden sumando celdas en lugar de recorrer todas las filas.
+
+DIMENSIONES = ['SectorProductivo', 'Municipio', 'Genero responsable']
+VENTAS = 'Ventas mensuales (Millones)'
+EMPLEADOS = 'Numero empleados'
+
+# Tramo reservado para empresas sin ventas reportadas
+SIN_VENTAS = -1
+
+
+def tramo_ventas(ventas):
+    # El slider de ventas se mueve en pasos de 1, así que basta separar los valores
+    # enteros exactos (tramo 2k) de los que quedan entre k y k+1 (tramo 2k+1)
+    base = np.floor(ventas)
+    tramo = 2 * base + (ventas != base)
+    return tramo.fillna(SIN_VENTAS).astype('int64')
+
+
+def _claves_cubo(df):
+    claves = pd.DataFrame({dimension: df[dimension] for dimension in DIMENSIONES})
+    claves['tramo_ventas'] = tramo_ventas(df[VENTAS])
+    return claves
+
+
+def celda_por_fila(df):
+    # Posición en el cubo de la celda de cada fila, con el mismo agrupamiento que
+    # construir_cubo (mismo orden de celdas), para acumular otros datos por celda
+    claves = _claves_cubo(df)
+    return claves.groupby(list(claves.columns), dropna=False, sort=False, observed=True).ngroup().to_numpy()
+
+
+def construir_cubo(df):
+    ventas = df[VENTAS]
+    empleados = df[EMPLEADOS]
+    ratio_valido = ventas.notna() & empleados.notna() & (empleados > 0)
+
+    datos = _claves_cubo(df)
+    datos['ventas'] = ventas
+    datos['ventas2'] = ventas ** 2
+    datos['empleados'] = empleados
+    datos['ratio'] = (ventas / empleados).where(ratio_valido)
+    datos['fila'] = np.arange(len(df))
+
+    cubo = datos.groupby(DIMENSIONES + ['tramo_ventas'], dropna=False, sort=False, observed=True).agg(
+        empresas=('fila', 'size'),
+        primera_fila=('fila', 'min'),
+        n_ventas=('ventas', 'count'),
+        suma_ventas=('ventas', 'sum'),
+        suma_ventas2=('ventas2', 'sum'),
+        min_ventas=('ventas', 'min'),
+        max_ventas=('ventas', 'max'),
+        n_empleados=('empleados', 'count'),
+        suma_empleados=('empleados', 'sum'),
+        n_ratio=('ratio', 'count'),
+        suma_ratio=('ratio', 'sum'),
+    )
+    return cubo.reset_index()
+
+
+def consultar_cubo(cubo, sector=None, municipios=None, ventas_range=None):
+    seleccion = np.ones(len(cubo), dtype=bool)
+
+    if sector:
+        seleccion &= (cubo['SectorProductivo'] == sector).to_numpy()
+
+    if municipios:
+        seleccion &= cubo['Municipio'].isin(municipios).to_numpy()
+
+    if ventas_range:
+        minimo, maximo = ventas_range
+        if not (float(minimo).is_integer() and float(maximo).is_integer()):
+            raise ValueError(f"El cubo solo admite rangos de ventas enteros: {ventas_range}")
+        tramos = cubo['tramo_ventas'].to_numpy()
+        seleccion &= (tramos >= 2 * minimo) & (tramos <= 2 * maximo)
+
+    return cubo[seleccion]
+
+
+def resumen_kpis(celdas):
+    n_ventas = celdas['n_ventas'].sum()
+    n_empleados = celdas['n_empleados'].sum()
+    n_ratio = celdas['n_ratio'].sum()
+    con_empresas = celdas[celdas['empresas'] > 0]
+
+    return {
+        'total_empresas': int(celdas['empresas'].sum()),
+        'promedio_ventas': celdas['suma_ventas'].sum() / n_ventas if n_ventas else 0,
+        'total_empleados': celdas['suma_empleados'].sum() if n_empleados else 0,
+        'sectores_activos': con_empresas['SectorProductivo'].nunique(),
+        'ratio_promedio': celdas['suma_ratio'].sum() / n_ratio if n_ratio else 0,
+        'ventas_maxima': celdas['max_ventas'].max() if n_ventas else 0,
+        'ventas_minima': celdas['min_ventas'].min() if n_ventas else 0,
+        'promedio_empleados': celdas['suma_empleados'].sum() / n_empleados if n_empleados else 0,
+    }
+
+
+def conteo_por(celdas, dimension):
+    # Mismo orden que value_counts(): se parte del orden de aparición en los datos
+    # y se ordena igual que pandas, para que los empates salgan en el mismo lugar
+    grupos = celdas.groupby(dimension, sort=False, observed=True).agg(
+        empresas=('empresas', 'sum'),
+        primera_fila=('primera_fila', 'min'),
+    )
+    grupos = grupos[grupos['empresas'] > 0].sort_values('primera_fila')
+    return grupos['empresas'].rename('count').sort_values(ascending=False)
+
+
+def cubo_cliente(cubo):
+    # Versión compacta del cubo para el navegador, con el género sumado y en columnas:
+    # sector y municipio van como posiciones en sus listas de nombres. Alcanza para
+    # calcular ahí mismo los KPIs de una selección mientras se mueven los filtros
+    sectores, nombres_sector = pd.factorize(cubo['SectorProductivo'])
+    municipios, nombres_municipio = pd.factorize(cubo['Municipio'])
+    celdas = cubo.assign(sector=sectores, municipio=municipios).groupby(
+        ['sector', 'municipio', 'tramo_ventas'], sort=False).agg(
+        empresas=('empresas', 'sum'),
+        n_ventas=('n_ventas', 'sum'),
+        suma_ventas=('suma_ventas', 'sum'),
+        max_ventas=('max_ventas', 'max'),
+        n_empleados=('n_empleados', 'sum'),
+        suma_empleados=('suma_empleados', 'sum'),
+        n_ratio=('n_ratio', 'sum'),
+        suma_ratio=('suma_ratio', 'sum'),
+    ).reset_index()
+
+    columnas = {'sectores': list(nombres_sector), 'municipios': list(nombres_municipio)}
+    for columna in celdas.columns:
+        valores = celdas[columna]
+        # NaN no es JSON válido: las celdas sin ventas llevan null como máximo
+        columnas[columna] = valores.astype(object).where(valores.notna(), None).tolist()
+    columnas['tramo'] = columnas.pop('tramo_ventas')
+    return columnas
@@ -1,21 +1,158 @@
+import gc
+import os
 import dash
-from dash import dcc, html, Input, Output, dash_table
+import diskcache
+import flask
+from dash import dcc, html, ctx, Input, Output, State, Patch, ClientsideFunction, DiskcacheManager, dash_table, no_update
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import numpy as np
+from carga_datos import ARCHIVO_LIMPIO, cargar_datos
+from cubo_agregados import construir_cubo, consultar_cubo, resumen_kpis, conteo_por, celda_por_fila, cubo_cliente
+from indices_filtros import construir_indice, filas_seleccionadas
+from cache_resultados import CacheLRU, cachear_resultado, clave_filtros, limpiar_cache
+from consulta_tabla import consultar_tabla
+from resumenes_graficos import (
+    UMBRAL_WEBGL, UMBRAL_DENSIDAD, densidad_por_grupo, densidad_kde, histograma, estadisticas_caja
+)
+from recarga_datos import INTERVALO_REVISION, VigilanteDatos, orden_version
+from estadisticas import COLUMNAS_ESTADISTICAS, momentos_por_grupo, combinar, correlacion
+from metricas import etapa, medir_callback, instrumentar_servidor, desactivar_metricas
+from perfilador import perfilador_configurado
+
+
+# Los filtros se aplican RETARDO_FILTROS_MS después del último cambio (ver assets/filtros.js)
+RETARDO_FILTROS_MS = int(os.environ.get("RETARDO_FILTROS_MS", 350))
+
+# Celdas del cubo, sumado el género, hasta las que se envía al navegador para los KPIs
+MAX_CELDAS_NAVEGADOR = 20_000
+
+# Memoria por worker para los DataFrames filtrados que comparten los callbacks
+MAX_BYTES_FILTRADO = int(float(os.environ.get("CACHE_FILTRADO_MB", 128)) * 1024 * 1024)
+
+
+def limites_slider(df):
+    ventas = df['Ventas mensuales (Millones)']
+    if ventas.isna().all():
+        return 0, 100
+    return int(ventas.min()), int(ventas.max())
+
+
+def bytes_filtrado(filtrado):
+    # Sin deep: las columnas de texto de la copia apuntan a los mismos objetos del
+    # DataFrame completo, lo que ocupa de más es el arreglo de referencias
+    return int(filtrado.memory_usage(index=True).sum())
+
+
+def cubo_para_navegador(cubo):
+    # Con extractos muy grandes el cubo pesaría demasiado en la página: sin él, los KPIs
+    # esperan al servidor como el resto de las salidas
+    if len(cubo) > MAX_CELDAS_NAVEGADOR:
+        return None
+    return cubo_cliente(cubo)
+
+
+def preparar_datos(ruta):
+    # Todo lo que depende de los datos se construye junto, también la caché de filtrado,
+    # así una recarga nunca mezcla el DataFrame de una versión con el índice de otra
+    df = cargar_datos(ruta)
+    indice = construir_indice(df)
+
+    cache_filtrado = CacheLRU(MAX_BYTES_FILTRADO, medida=bytes_filtrado)
+
+    def filtrar_filas(sector, municipios, ventas_range):
+        # Sector y municipios se resuelven con el índice de bitmaps y el rango de ventas con
+        # el índice ordenado, sin copiar todo el DataFrame ni comparar columnas completas
+        clave = (sector, municipios, ventas_range)
+        filtrado = cache_filtrado.obtener(clave)
+        if filtrado is not None:
+            return filtrado
+
+        posiciones = filas_seleccionadas(indice, sector, municipios, ventas_range)
+        if posiciones is None or len(posiciones) == len(df):
+            # Si quedan todas las filas se comparte el DataFrame completo, sin copia
+            return df
+        filtrado = df.take(posiciones)
+        cache_filtrado.guardar(clave, filtrado)
+        return filtrado
+
+    # Momentos por celda del cubo: la correlación de cualquier selección sale de sumarlos
+    cubo = construir_cubo(df)
+    momentos = momentos_por_grupo(df[COLUMNAS_ESTADISTICAS].to_numpy(dtype=float), celda_por_fila(df), len(cubo))
+
+    return {'df': df, 'cubo': cubo, 'momentos': momentos, 'indice': indice,
+            'filtrar_filas': filtrar_filas, 'cache_filtrado': cache_filtrado,
+            'limites': limites_slider(df), 'cubo_cliente': cubo_para_navegador(cubo)}
+
+
+def descartar_resultados_anteriores(datos):
+    # Las claves de la caché de resultados llevan la versión, así que lo calculado con los
+    # datos anteriores ya no se pide: se libera en lugar de esperar a que el LRU lo descarte
+    limpiar_cache(datos['version'])
+
+
+def tras_recargar(datos):
+    descartar_resultados_anteriores(datos)
+    # Los datos recargados son del worker y no se comparten con los demás (ver el final
+    # del módulo); se congelan igual que los del arranque para que las pasadas del
+    # recolector no recorran el DataFrame, el cubo y los índices en cada petición
+    gc.collect()
+    gc.freeze()
 
-df = pd.read_excel("PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx")
-print("Archivo cargado correctamente")
+
+vigilante = VigilanteDatos(ARCHIVO_LIMPIO, preparar_datos, al_recargar=tras_recargar)
+
+
+def datos_actuales():
+    return vigilante.actual()
+
+
+def version_datos():
+    return datos_actuales()['version']
+
+
+df = vigilante.datos['df']
 print(f"Datos cargados: {len(df)} filas, {len(df.columns)} columnas")
-print("Columnas disponibles:")
-for i, col in enumerate(df.columns):
-    print(f"{i+1}. {col}")
-print("-" * 50)
 
-app = dash.Dash(__name__)
+# La dispersión y la tabla, las salidas que más tardan con extractos grandes, corren como
+# callbacks en segundo plano: cada petición lanza un proceso aparte y el worker queda libre
+# mientras el navegador consulta el avance. Si los filtros cambian antes de que termine, Dash
+# cancela el proceso anterior. Los resultados quedan en una caché en disco compartida por
+# todos los workers, por versión de los datos
+#
+# El proceso del trabajo se crea con fork desde el worker, que atiende con varios hilos:
+# hereda los locks tal como estaban en ese momento. Antes de ejecutar el callback se
+# apagan las métricas y el hilo de recarga, y las cachés rehacen sus locks al hacer fork
+# (ver cache_resultados), así el filtrado no espera ningún lock que otro hilo tenía tomado.
+# Con spawn o forkserver cada trabajo volvería a importar este módulo y a cargar los datos
+DIRECTORIO_SEGUNDO_PLANO = os.environ.get("CACHE_SEGUNDO_PLANO_DIR", ".cache_segundo_plano")
+EXPIRACION_SEGUNDO_PLANO = int(os.environ.get("CACHE_SEGUNDO_PLANO_SEGUNDOS", 3600))
+INTERVALO_AVANCE_MS = 250
+
+
+class GestorSegundoPlano(DiskcacheManager):
+    def make_job_fn(self, fn, progress, key=None):
+        trabajo = super().make_job_fn(fn, progress, key)
+
+        def trabajo_en_hijo(*args):
+            desactivar_metricas()
+            vigilante.sin_revision()
+            return trabajo(*args)
+        return trabajo_en_hijo
+
+
+gestor_segundo_plano = GestorSegundoPlano(
+    diskcache.Cache(DIRECTORIO_SEGUNDO_PLANO), cache_by=[version_datos], expire=EXPIRACION_SEGUNDO_PLANO
+)
+
+app = dash.Dash(__name__, background_callback_manager=gestor_segundo_plano)
 app.title = "📊 Dashboard Empresas Boyacá"
 
+# Métricas en /metrics y, con PERFILAR_PETICIONES_LENTAS_MS, perfiles de las peticiones lentas
+instrumentar_servidor(app.server, perfilador_configurado())
+
 # Paleta de colores corporativa mejorada - amarillo más visible
 COLORS = {
     'background': '#f8fafc',          # Blanco suave
@@ -31,238 +168,612 @@ COLORS = {
     'shadow': 'rgba(0, 0, 0, 0.1)'   # Sombra suave
 }
 
-app.layout = html.Div([
-    # Header principal
-    html.Div([
-        html.H1("📊 DASHBOARD EMPRESAS BOYACÁ", 
-                style={
-                    'textAlign': 'center',
-                    'color': COLORS['primary'],
-                    'fontSize': '42px',
-                    'fontWeight': '700',
-                    'margin': '20px 0 10px 0',
-                    'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif',
-                    'letterSpacing': '-0.5px'
-                }),
-        html.P("Análisis Estratégico de Empresas - Departamento de Boyacá",
-               style={
-                   'textAlign': 'center',
-                   'color': COLORS['text_secondary'],
-                   'fontSize': '18px',
-                   'marginBottom': '30px',
-                   'fontWeight': '400',
-                   'fontFamily': 'Inter, sans-serif'
-               })
+# Paleta de colores mejorada para gráficos (sin amarillo suave)
+COLORES_GRAFICOS = [COLORS['primary'], COLORS['accent'], COLORS['warning'], COLORS['secondary'], COLORS['danger'], '#8b5cf6', '#06b6d4', '#84cc16']
+
+# Plantilla de los gráficos, registrada una sola vez: fondos, fuentes, títulos y
+# colores comunes que antes se repetían con update_layout en cada figura
+pio.templates['boyaca'] = go.layout.Template(layout=dict(
+    plot_bgcolor=COLORS['surface'],
+    paper_bgcolor=COLORS['surface'],
+    font=dict(color=COLORS['text'], family='Inter'),
+    title=dict(x=0.5, font=dict(size=18, color=COLORS['text'], family='Inter')),
+    colorway=COLORES_GRAFICOS
+))
+
+# Template limpio para gráficos
+TEMPLATE_GRAFICOS = "plotly_white+boyaca"
+
+
+def tarjeta_kpi(id_valor, icono, color, etiqueta):
+    # Tarjeta de KPI principal; el callback solo actualiza el texto del valor
+    return html.Div([
+        html.Div([
+            html.I(className=f"fas {icono}", style={'fontSize': '24px', 'color': COLORS[color], 'marginBottom': '10px'}),
+            html.H2(id=id_valor,
+                   style={
+                       'color': COLORS[color], 
+                       'fontSize': '36px', 
+                       'margin': '0',
+                       'fontWeight': '700',
+                       'fontFamily': 'Inter, sans-serif'
+                   }),
+            html.P(etiqueta, 
+                  style={
+                      'color': COLORS['text_secondary'], 
+                      'fontSize': '14px', 
+                      'margin': '5px 0 0 0',
+                      'fontWeight': '500',
+                      'fontFamily': 'Inter, sans-serif'
+                  })
+        ], style={'textAlign': 'center'})
     ], style={
-        'background': f'linear-gradient(135deg, {COLORS["surface"]} 0%, #f1f5f9 100%)',
-        'padding': '40px 30px',
-        'borderRadius': '16px',
-        'margin': '20px',
-        'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
-        'border': f'1px solid {COLORS["border"]}'
-    }),
-
-    # Sección de filtros - TODOS EN UNA LÍNEA
-    html.Div([
-        # Filtro por Sector
+        'backgroundColor': COLORS['surface'], 
+        'padding': '30px 20px', 
+        'borderRadius': '12px', 
+        'width': '18%', 
+        'display': 'inline-block', 
+        'margin': '1%',
+        'boxShadow': f'0 4px 12px {COLORS["shadow"]}',
+        'border': f'2px solid {COLORS[color]}',
+        'borderTop': f'4px solid {COLORS[color]}',
+        'transition': 'transform 0.2s ease'
+    })
+
+
+def tarjeta_kpi_adicional(id_valor, icono, color, etiqueta):
+    return html.Div([
         html.Div([
-            html.Label("Filtrar por Sector:", 
-                      style={
-                          'color': COLORS['text'], 
-                          'fontWeight': '600', 
-                          'fontSize': '16px',
-                          'marginBottom': '8px',
-                          'display': 'block',
-                          'fontFamily': 'Inter, sans-serif'
-                      }),
-            dcc.Dropdown(
-                id='sector-dropdown',
-                options=[{"label": f"🏢 {s}", "value": s} for s in sorted(df["SectorProductivo"].dropna().unique())],
-                value=None,
-                placeholder="Selecciona un sector",
-                clearable=True,
-                style={
-                    'fontFamily': 'Inter, sans-serif'
-                },
-                className='custom-dropdown'
-            )
-        ], style={
-            'width': '28%', 
-            'display': 'inline-block', 
-            'marginRight': '2%',
-            'padding': '20px',
-            'backgroundColor': COLORS['surface'],
-            'borderRadius': '12px',
-            'border': f'1px solid {COLORS["border"]}',
-            'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
-            'verticalAlign': 'top'
-        }),
+            html.I(className=f"fas {icono}", style={'fontSize': '20px', 'color': COLORS[color], 'marginBottom': '8px'}),
+            html.H3(id=id_valor,
+                   style={
+                       'color': COLORS[color], 
+                       'fontSize': '28px', 
+                       'margin': '0',
+                       'fontWeight': '700',
+                       'fontFamily': 'Inter, sans-serif'
+                   }),
+            html.P(etiqueta, 
+                  style={
+                      'color': COLORS['text_secondary'], 
+                      'fontSize': '12px', 
+                      'margin': '5px 0 0 0',
+                      'fontWeight': '500',
+                      'fontFamily': 'Inter, sans-serif'
+                  })
+        ], style={'textAlign': 'center'})
+    ], style={
+        'backgroundColor': COLORS['surface'], 
+        'padding': '20px 15px', 
+        'borderRadius': '10px', 
+        'width': '30%', 
+        'display': 'inline-block', 
+        'margin': '1.5%',
+        'boxShadow': f'0 3px 10px {COLORS["shadow"]}',
+        'border': f'1px solid {COLORS[color]}',
+        'borderLeft': f'4px solid {COLORS[color]}'
+    })
+
+
+def figura_histograma(datos):
+    # Histograma: los conteos por barra se calculan aquí y solo viajan las barras
+    bordes, conteos = histograma(datos['Ventas mensuales (Millones)'], barras=25)
+    fig_hist = go.Figure(go.Bar(
+        x=(bordes[:-1] + bordes[1:]) / 2, y=conteos, width=np.diff(bordes),
+        customdata=np.column_stack((bordes[:-1], bordes[1:])),
+        hovertemplate="Ventas mensuales (Millones)=%{customdata[0]:g} - %{customdata[1]:g}<br>Número de empresas=%{y}<extra></extra>",
+        marker_color=COLORS['primary'], opacity=0.8, marker_line_width=1, marker_line_color='white'
+    ))
+
+    # Curva de densidad (KDE) escalada a número de empresas por barra
+    ventas = datos['Ventas mensuales (Millones)'].dropna().to_numpy(dtype=float)
+    if len(ventas) > 1 and ventas.min() < ventas.max():
+        x_kde = np.linspace(ventas.min(), ventas.max(), 200)
+        fig_hist.add_trace(go.Scatter(
+            x=x_kde, y=densidad_kde(ventas, x_kde) * len(ventas) * (bordes[1] - bordes[0]),
+            mode='lines', line=dict(color=COLORS['accent'], width=3), name='Densidad',
+            hovertemplate="Densidad estimada=%{y:.1f}<extra></extra>"
+        ))
+    fig_hist.update_layout(
+        title="📊 Distribución de Ventas Mensuales",
+        template=TEMPLATE_GRAFICOS,
+        bargap=0,
+        showlegend=False,
+        yaxis_title="Número de empresas",  # Asegurar el título del eje Y
+        xaxis_title="Ventas mensuales (Millones)"
+    )
+    return fig_hist
+
+
+def figura_boxplot(datos):
+    # Boxplot: cuartiles, bigotes y una muestra de atípicos calculados aquí por sector
+    fig_box = go.Figure()
+    cajas = estadisticas_caja(datos, "Ventas mensuales (Millones)", "SectorProductivo")
+    for i, caja in enumerate(cajas):
+        color = COLORES_GRAFICOS[i % len(COLORES_GRAFICOS)]
+        fig_box.add_trace(go.Box(
+            x=[caja['grupo']], q1=[caja['q1']], median=[caja['mediana']], q3=[caja['q3']],
+            lowerfence=[caja['limite_inferior']], upperfence=[caja['limite_superior']],
+            name=caja['grupo'], legendgroup=caja['grupo'], marker_color=color, boxpoints=False
+        ))
+        if len(caja['atipicos']):
+            fig_box.add_trace(go.Scatter(
+                x=[caja['grupo']] * len(caja['atipicos']), y=caja['atipicos'],
+                mode='markers', name=caja['grupo'], legendgroup=caja['grupo'],
+                marker_color=color, showlegend=False,
+                hovertemplate="SectorProductivo=%{x}<br>Ventas mensuales (Millones)=%{y}<extra></extra>"
+            ))
+    fig_box.update_layout(
+        title="📈 Análisis de Ventas por Sector Productivo",
+        template=TEMPLATE_GRAFICOS,
+        boxmode='overlay',
+        xaxis_title="SectorProductivo",
+        yaxis_title="Ventas mensuales (Millones)",
+        showlegend=False
+    )
+    fig_box.update_xaxes(tickangle=45)
+    return fig_box
+
+
+def figura_pastel(genero_counts):
+    fig_pie = px.pie(
+        names=genero_counts.index, values=genero_counts.values,
+        title="👥 Distribución por Género del Responsable",
+        template=TEMPLATE_GRAFICOS
+    )
+    fig_pie.update_traces(
+        textposition='inside', 
+        textinfo='percent+label', 
+        textfont_size=14, 
+        marker=dict(line=dict(color='white', width=2)),
+        textfont_family='Inter'
+    )
+    return fig_pie
+
+
+def figura_barras(top_municipios):
+    fig_bar = px.bar(
+        x=top_municipios.values, y=top_municipios.index,
+        orientation='h', title="🏛️ Top 10 Municipios por Número de Empresas",
+        color=top_municipios.values,
+        color_continuous_scale=[[0, COLORS['primary']], [0.5, COLORS['accent']], [1, COLORS['warning']]],
+        template=TEMPLATE_GRAFICOS
+    )
+    fig_bar.update_layout(showlegend=False, coloraxis_showscale=False)
+    return fig_bar
+
+
+def figura_dispersion(datos):
+    # Scatter plot: SVG con un punto por empresa en extractos pequeños, WebGL en los
+    # medianos y densidad agregada por sector en los grandes, para acotar el tamaño
+    if len(datos) > UMBRAL_DENSIDAD:
+        densidad = densidad_por_grupo(datos, "Numero empleados", "Ventas mensuales (Millones)", "SectorProductivo")
+        return px.scatter(
+            densidad, x="x", y="y",
+            color="SectorProductivo", size="empresas",
+            hover_data={"empresas": True},
+            labels={"x": "Numero empleados", "y": "Ventas mensuales (Millones)", "empresas": "Empresas"},
+            title="🔍 Relación Empleados vs Ventas por Sector",
+            size_max=25,
+            template=TEMPLATE_GRAFICOS,
+            opacity=0.7,
+            render_mode="webgl"
+        )
+    return px.scatter(
+        datos, x="Numero empleados", y="Ventas mensuales (Millones)",
+        color="SectorProductivo", size="Ventas mensuales (Millones)",
+        hover_name="NombreEmpresa",
+        title="🔍 Relación Empleados vs Ventas por Sector",
+        size_max=25,
+        template=TEMPLATE_GRAFICOS,
+        opacity=0.7,
+        render_mode="webgl" if len(datos) > UMBRAL_WEBGL else "svg"
+    )
+
+
+def figura_correlacion(momentos):
+    # Mapa de calor de la correlación de Pearson entre las variables numéricas
+    r = correlacion(momentos)
+    fig_corr = go.Figure(go.Heatmap(
+        z=r, x=COLUMNAS_ESTADISTICAS, y=COLUMNAS_ESTADISTICAS,
+        zmin=-1, zmax=1, zmid=0, colorscale='RdBu_r',
+        text=np.where(np.isnan(r), "", np.vectorize(lambda v: f"{v:.2f}")(r)), texttemplate="%{text}",
+        hovertemplate="%{y} vs %{x}<br>Correlación=%{z:.3f}<extra></extra>"
+    ))
+    fig_corr.update_layout(
+        title="🔗 Correlación entre Variables",
+        template=TEMPLATE_GRAFICOS,
+        yaxis_autorange='reversed'
+    )
+    return fig_corr
+
+
+def solo_datos(fig):
+    # El layout y la plantilla ya llegaron al navegador con la figura inicial; en cada
+    # actualización solo se reemplazan las trazas
+    cambio = Patch()
+    cambio['data'] = fig.to_dict()['data']
+    return cambio
+
+
+def opciones_sector(df):
+    return [{"label": f"🏢 {s}", "value": s} for s in sorted(df["SectorProductivo"].dropna().unique())]
+
+
+def opciones_municipio(df):
+    return [{"label": f"📍 {m}", "value": m} for m in sorted(df["Municipio"].dropna().unique())]
+
 
-        # Filtro por Municipio
+def barra_avance(id_barra):
+    # Barra y texto de avance de un callback en segundo plano; solo se ve mientras corre
+    return html.Div([
+        html.Progress(id=f'{id_barra}-barra', value=0, max=1, style={'width': '100%', 'accentColor': COLORS['primary']}),
+        html.Div(id=f'{id_barra}-texto', style={'color': COLORS['text_secondary'], 'fontSize': '13px'})
+    ], id=id_barra, style={'display': 'none'})
+
+
+def marcas_slider(minimo, maximo):
+    return {
+        valor: {
+            'label': f'${valor}M',
+            'style': {'color': COLORS['accent'], 'fontWeight': '600', 'fontSize': '12px'}
+        }
+        for valor in (minimo, maximo)
+    }
+
+
+# Columnas que se muestran en la tabla de datos
+COLUMNAS_TABLA = list(df.columns[:8])
+
+# Estilos de la dispersión y la tabla; mientras se recalculan se atenúan
+ESTILO_DISPERSION = {'height': '550px'}
+ESTILO_TABLA = {'overflowX': 'auto', 'borderRadius': '8px'}
+ATENUADO = {'opacity': 0.5, 'transition': 'opacity 0.2s'}
+
+
+def armar_layout(datos):
+    # Filtros, límites del slider, stores y gráficos iniciales de la versión dada
+    df = datos['df']
+    ventas_min, ventas_max = datos['limites']
+    return html.Div([
+        # Versión de los datos que muestra la página; se revisa periódicamente para
+        # actualizar filtros y gráficos cuando se publica un archivo limpio nuevo
+        dcc.Store(id='version-datos', data=datos['version']),
+        dcc.Interval(id='revision-datos', interval=int(INTERVALO_REVISION * 1000), disabled=INTERVALO_REVISION <= 0),
+
+        # Filtros aplicados: los controles los copian aquí tras una pausa y de ellos dependen
+        # los callbacks del servidor. El cubo compacto sirve para los KPIs en el navegador
+        dcc.Store(id='filtro-sector', data=None),
+        dcc.Store(id='filtro-municipios', data=None),
+        dcc.Store(id='filtro-ventas', data=[ventas_min, ventas_max]),
+        dcc.Store(id='retardo-filtros', data=RETARDO_FILTROS_MS),
+        dcc.Store(id='cubo-cliente', data=datos['cubo_cliente']),
+
+        # Header principal
         html.Div([
-            html.Label("Filtrar por Municipio:", 
-                      style={
-                          'color': COLORS['text'], 
-                          'fontWeight': '600', 
-                          'fontSize': '16px',
-                          'marginBottom': '8px',
-                          'display': 'block',
-                          'fontFamily': 'Inter, sans-serif'
-                      }),
-            dcc.Dropdown(
-                id='municipio-dropdown',
-                options=[{"label": f"📍 {m}", "value": m} for m in sorted(df["Municipio"].dropna().unique())],
-                value=None,
-                placeholder="Selecciona municipios",
-                clearable=True,
-                multi=True,
-                style={
-                    'fontFamily': 'Inter, sans-serif'
-                },
-                className='custom-dropdown'
-            )
+            html.H1("📊 DASHBOARD EMPRESAS BOYACÁ", 
+                    style={
+                        'textAlign': 'center',
+                        'color': COLORS['primary'],
+                        'fontSize': '42px',
+                        'fontWeight': '700',
+                        'margin': '20px 0 10px 0',
+                        'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif',
+                        'letterSpacing': '-0.5px'
+                    }),
+            html.P("Análisis Estratégico de Empresas - Departamento de Boyacá",
+                   style={
+                       'textAlign': 'center',
+                       'color': COLORS['text_secondary'],
+                       'fontSize': '18px',
+                       'marginBottom': '30px',
+                       'fontWeight': '400',
+                       'fontFamily': 'Inter, sans-serif'
+                   })
         ], style={
-            'width': '28%', 
-            'display': 'inline-block', 
-            'marginRight': '2%',
-            'padding': '20px',
-            'backgroundColor': COLORS['surface'],
-            'borderRadius': '12px',
-            'border': f'1px solid {COLORS["border"]}',
-            'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
-            'verticalAlign': 'top'
+            'background': f'linear-gradient(135deg, {COLORS["surface"]} 0%, #f1f5f9 100%)',
+            'padding': '40px 30px',
+            'borderRadius': '16px',
+            'margin': '20px',
+            'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
+            'border': f'1px solid {COLORS["border"]}'
         }),
 
-        # Filtro por Ventas
+        # Sección de filtros - TODOS EN UNA LÍNEA
         html.Div([
-            html.Label("Rango de Ventas (Millones):", 
-                      style={
-                          'color': COLORS['text'], 
-                          'fontWeight': '600', 
-                          'fontSize': '16px',
-                          'marginBottom': '15px',
-                          'display': 'block',
-                          'fontFamily': 'Inter, sans-serif'
-                      }),
-            dcc.RangeSlider(
-                id='ventas-slider',
-                min=int(df['Ventas mensuales (Millones)'].min()) if not df['Ventas mensuales (Millones)'].isna().all() else 0,
-                max=int(df['Ventas mensuales (Millones)'].max()) if not df['Ventas mensuales (Millones)'].isna().all() else 100,
-                step=1,
-                marks={
-                    int(df['Ventas mensuales (Millones)'].min()) if not df['Ventas mensuales (Millones)'].isna().all() else 0: {
-                        'label': f'${int(df["Ventas mensuales (Millones)"].min()) if not df["Ventas mensuales (Millones)"].isna().all() else 0}M',
-                        'style': {'color': COLORS['accent'], 'fontWeight': '600', 'fontSize': '12px'}
+            # Filtro por Sector
+            html.Div([
+                html.Label("Filtrar por Sector:", 
+                          style={
+                              'color': COLORS['text'], 
+                              'fontWeight': '600', 
+                              'fontSize': '16px',
+                              'marginBottom': '8px',
+                              'display': 'block',
+                              'fontFamily': 'Inter, sans-serif'
+                          }),
+                dcc.Dropdown(
+                    id='sector-dropdown',
+                    options=opciones_sector(df),
+                    value=None,
+                    placeholder="Selecciona un sector",
+                    clearable=True,
+                    style={
+                        'fontFamily': 'Inter, sans-serif'
                     },
-                    int(df['Ventas mensuales (Millones)'].max()) if not df['Ventas mensuales (Millones)'].isna().all() else 100: {
-                        'label': f'${int(df["Ventas mensuales (Millones)"].max()) if not df["Ventas mensuales (Millones)"].isna().all() else 100}M',
-                        'style': {'color': COLORS['accent'], 'fontWeight': '600', 'fontSize': '12px'}
-                    }
-                },
-                value=[
-                    int(df['Ventas mensuales (Millones)'].min()) if not df['Ventas mensuales (Millones)'].isna().all() else 0,
-                    int(df['Ventas mensuales (Millones)'].max()) if not df['Ventas mensuales (Millones)'].isna().all() else 100
-                ],
-                tooltip={"placement": "bottom", "always_visible": False},
-                className='custom-slider'
-            )
+                    className='custom-dropdown'
+                )
+            ], style={
+                'width': '28%', 
+                'display': 'inline-block', 
+                'marginRight': '2%',
+                'padding': '20px',
+                'backgroundColor': COLORS['surface'],
+                'borderRadius': '12px',
+                'border': f'1px solid {COLORS["border"]}',
+                'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
+                'verticalAlign': 'top'
+            }),
+
+            # Filtro por Municipio
+            html.Div([
+                html.Label("Filtrar por Municipio:", 
+                          style={
+                              'color': COLORS['text'], 
+                              'fontWeight': '600', 
+                              'fontSize': '16px',
+                              'marginBottom': '8px',
+                              'display': 'block',
+                              'fontFamily': 'Inter, sans-serif'
+                          }),
+                dcc.Dropdown(
+                    id='municipio-dropdown',
+                    options=opciones_municipio(df),
+                    value=None,
+                    placeholder="Selecciona municipios",
+                    clearable=True,
+                    multi=True,
+                    style={
+                        'fontFamily': 'Inter, sans-serif'
+                    },
+                    className='custom-dropdown'
+                )
+            ], style={
+                'width': '28%', 
+                'display': 'inline-block', 
+                'marginRight': '2%',
+                'padding': '20px',
+                'backgroundColor': COLORS['surface'],
+                'borderRadius': '12px',
+                'border': f'1px solid {COLORS["border"]}',
+                'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
+                'verticalAlign': 'top'
+            }),
+
+            # Filtro por Ventas
+            html.Div([
+                html.Label("Rango de Ventas (Millones):", 
+                          style={
+                              'color': COLORS['text'], 
+                              'fontWeight': '600', 
+                              'fontSize': '16px',
+                              'marginBottom': '15px',
+                              'display': 'block',
+                              'fontFamily': 'Inter, sans-serif'
+                          }),
+                dcc.RangeSlider(
+                    id='ventas-slider',
+                    min=ventas_min,
+                    max=ventas_max,
+                    step=1,
+                    marks=marcas_slider(ventas_min, ventas_max),
+                    value=[ventas_min, ventas_max],
+                    # Solo al soltar; mientras se arrastra, drag_value alimenta la vista previa
+                    updatemode='mouseup',
+                    tooltip={"placement": "bottom", "always_visible": False},
+                    className='custom-slider'
+                )
+            ], style={
+                'width': '29%', 
+                'display': 'inline-block',
+                'padding': '20px',
+                'backgroundColor': COLORS['surface'],
+                'borderRadius': '12px',
+                'border': f'1px solid {COLORS["border"]}',
+                'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
+                'verticalAlign': 'top'
+            })
         ], style={
-            'width': '29%', 
-            'display': 'inline-block',
-            'padding': '20px',
-            'backgroundColor': COLORS['surface'],
-            'borderRadius': '12px',
-            'border': f'1px solid {COLORS["border"]}',
-            'boxShadow': f'0 2px 8px {COLORS["shadow"]}',
-            'verticalAlign': 'top'
-        })
-    ], style={
-        'backgroundColor': COLORS['background'],
-        'padding': '25px',
-        'borderRadius': '16px',
-        'margin': '20px',
-        'boxShadow': f'0 4px 16px {COLORS["shadow"]}',
-        'border': f'1px solid {COLORS["border"]}'
-    }),
+            'backgroundColor': COLORS['background'],
+            'padding': '25px',
+            'borderRadius': '16px',
+            'margin': '20px',
+            'boxShadow': f'0 4px 16px {COLORS["shadow"]}',
+            'border': f'1px solid {COLORS["border"]}'
+        }),
 
-    # KPIs principales
-    html.Div(id='kpis-container', style={'margin': '20px'}),
+        # KPIs principales (tarjetas fijas, el callback solo cambia los valores)
+        html.Div(id='kpis-container', children=html.Div([
+            tarjeta_kpi('kpi-empresas', 'fa-building', 'primary', "Empresas Registradas"),
+            tarjeta_kpi('kpi-ventas-promedio', 'fa-dollar-sign', 'accent', "Ventas Promedio"),
+            tarjeta_kpi('kpi-empleados', 'fa-users', 'secondary', "Total Empleados"),
+            tarjeta_kpi('kpi-sectores', 'fa-chart-pie', 'warning', "Sectores Activos")
+        ], style={
+            'display': 'flex',
+            'justifyContent': 'center',
+            'gap': '20px',
+            'flexWrap': 'wrap'
+        }), style={'margin': '20px'}),
 
-    # KPIs adicionales del documento
-    html.Div(id='kpis-adicionales', style={'margin': '20px'}),
+        # KPIs adicionales del documento
+        html.Div(id='kpis-adicionales', children=html.Div([
+            html.H3("📈 KPIs ESTRATÉGICOS ADICIONALES", 
+                    style={
+                        'color': COLORS['text'], 
+                        'textAlign': 'center', 
+                        'marginBottom': '25px',
+                        'fontSize': '24px',
+                        'fontWeight': '600',
+                        'fontFamily': 'Inter, sans-serif'
+                    }),
+            
+            html.Div([
+                tarjeta_kpi_adicional('kpi-ratio', 'fa-chart-line', 'primary', "Ratio Ventas/Empleado"),
+                tarjeta_kpi_adicional('kpi-ventas-maximas', 'fa-arrow-up', 'accent', "Ventas Máximas"),
+                tarjeta_kpi_adicional('kpi-empleados-promedio', 'fa-user-friends', 'warning', "Empleados Promedio")
+            ], style={
+                'display': 'flex',
+                'justifyContent': 'center',
+                'gap': '15px',
+                'flexWrap': 'wrap'
+            })
+        ], style={
+            'backgroundColor': COLORS['surface'],
+            'padding': '25px',
+            'borderRadius': '16px',
+            'margin': '20px',
+            'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
+            'border': f'1px solid {COLORS["border"]}'
+        }), style={'margin': '20px'}),
 
-    # Gráficos superiores
-    html.Div([
+        # Gráficos superiores
         html.Div([
-            dcc.Graph(id='histograma', style={'height': '320px'})
-        ], style={
-            'width': '48%',
-            'display': 'inline-block',
-            'padding': '8px',
-            'verticalAlign': 'top'
-        }),
-        
+            html.Div([
+                dcc.Graph(id='histograma', figure=figura_histograma(df), style={'height': '320px'})
+            ], style={
+                'width': '48%',
+                'display': 'inline-block',
+                'padding': '8px',
+                'verticalAlign': 'top'
+            }),
+            
+            html.Div([
+                dcc.Graph(id='piechart', figure=figura_pastel(conteo_por(datos['cubo'], 'Genero responsable')), style={'height': '320px'})
+            ], style={
+                'width': '48%',
+                'display': 'inline-block',
+                'padding': '8px',
+                'verticalAlign': 'top'
+            })
+        ], style={'margin': '10px 0'}),
+
         html.Div([
-            dcc.Graph(id='piechart', style={'height': '320px'})
-        ], style={
-            'width': '48%',
-            'display': 'inline-block',
-            'padding': '8px',
-            'verticalAlign': 'top'
-        })
-    ], style={'margin': '10px 0'}),
+            html.Div([
+                dcc.Graph(id='boxplot', figure=figura_boxplot(df), style={'height': '320px'})
+            ], style={
+                'width': '48%',
+                'display': 'inline-block',
+                'padding': '8px',
+                'verticalAlign': 'top'
+            }),
+            
+            html.Div([
+                dcc.Graph(id='barchart', figure=figura_barras(conteo_por(datos['cubo'], 'Municipio').nlargest(10)), style={'height': '320px'})
+            ], style={
+                'width': '48%',
+                'display': 'inline-block',
+                'padding': '8px',
+                'verticalAlign': 'top'
+            })
+        ], style={'margin': '10px 0'}),
 
-    html.Div([
+        # Scatter plot
         html.Div([
-            dcc.Graph(id='boxplot', style={'height': '320px'})
-        ], style={
-            'width': '48%',
-            'display': 'inline-block',
-            'padding': '8px',
-            'verticalAlign': 'top'
-        }),
-        
+            barra_avance('avance-dispersion'),
+            dcc.Graph(id='scatterplot', figure=figura_dispersion(df.dropna(subset=['Ventas mensuales (Millones)'])), style=ESTILO_DISPERSION)
+        ], style={'padding': '20px'}),
+
+        # Correlaciones
         html.Div([
-            dcc.Graph(id='barchart', style={'height': '320px'})
-        ], style={
-            'width': '48%',
-            'display': 'inline-block',
-            'padding': '8px',
-            'verticalAlign': 'top'
-        })
-    ], style={'margin': '10px 0'}),
-
-    # Scatter plot
-    html.Div([
-        dcc.Graph(id='scatterplot', style={'height': '550px'})
-    ], style={'padding': '20px'}),
-
-    # Tabla de datos
-    html.Div([
-        html.H3("📋 TABLA DE DATOS FILTRADOS", 
-                style={
-                    'color': COLORS['text'], 
-                    'textAlign': 'center', 
-                    'marginBottom': '25px',
-                    'fontSize': '24px',
+            dcc.Graph(id='correlacion', figure=figura_correlacion(combinar(datos['momentos'])), style={'height': '450px'})
+        ], style={'padding': '20px'}),
+
+        # Tabla de datos
+        html.Div([
+            html.H3("📋 TABLA DE DATOS FILTRADOS", 
+                    style={
+                        'color': COLORS['text'], 
+                        'textAlign': 'center', 
+                        'marginBottom': '25px',
+                        'fontSize': '24px',
+                        'fontWeight': '600',
+                        'fontFamily': 'Inter, sans-serif'
+                    }),
+            barra_avance('avance-tabla'),
+            dash_table.DataTable(
+                id='data-table',
+                columns=[
+                    {"name": c, "id": c, "type": "numeric" if pd.api.types.is_numeric_dtype(df[c]) else "text"}
+                    for c in COLUMNAS_TABLA
+                ],
+                style_cell={
+                    'backgroundColor': COLORS['surface'],
+                    'color': COLORS['text'],
+                    'border': f'1px solid {COLORS["border"]}',
+                    'textAlign': 'left',
+                    'fontFamily': 'Inter, sans-serif',
+                    'fontSize': '14px',
+                    'padding': '12px'
+                },
+                style_header={
+                    'backgroundColor': COLORS['primary'],
+                    'color': 'white',
                     'fontWeight': '600',
+                    'fontSize': '14px',
+                    'textAlign': 'center',
                     'fontFamily': 'Inter, sans-serif'
-                }),
-        html.Div(id='data-table')
+                },
+                style_data_conditional=[
+                    {
+                        'if': {'row_index': 'odd'},
+                        'backgroundColor': '#f8fafc'
+                    }
+                ],
+                # Paginación, orden y filtros se resuelven en el servidor sobre todas las filas
+                page_current=0,
+                page_size=10,
+                page_action="custom",
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
+                filter_action="custom",
+                filter_query="",
+                filter_options={'case': 'insensitive'},
+                style_table=ESTILO_TABLA
+            )
+        ], style={
+            'backgroundColor': COLORS['surface'],
+            'padding': '30px',
+            'borderRadius': '16px',
+            'margin': '20px',
+            'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
+            'border': f'1px solid {COLORS["border"]}'
+        })
+
     ], style={
-        'backgroundColor': COLORS['surface'],
-        'padding': '30px',
-        'borderRadius': '16px',
-        'margin': '20px',
-        'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
-        'border': f'1px solid {COLORS["border"]}'
+        'backgroundColor': COLORS['background'],
+        'minHeight': '100vh',
+        'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif'
     })
 
-], style={
-    'backgroundColor': COLORS['background'],
-    'minHeight': '100vh',
-    'fontFamily': 'Inter, -apple-system, BlinkMacSystemFont, sans-serif'
-})
+# Cada página nueva se arma con la versión vigente de los datos, no con la que había al
+# importar el módulo; se guarda la última armada para no rehacer las figuras iniciales
+# en cada visita. Dash llama a la función al asignarla, también en el proceso maestro con
+# --preload: fuera de una petición se lee vigilante.datos sin arrancar el hilo de revisión
+ultimo_layout = (None, None)
+
+
+def layout_pagina():
+    global ultimo_layout
+    datos = datos_actuales() if flask.has_request_context() else vigilante.datos
+    version, layout = ultimo_layout
+    if version != datos['version']:
+        layout = armar_layout(datos)
+        ultimo_layout = (datos['version'], layout)
+    return layout
+
+
+app.layout = layout_pagina
 
 # CSS personalizado para dropdowns y sliders
 app.index_string = '''
@@ -329,490 +840,281 @@ app.index_string = '''
 </html>
 '''
 
-@app.callback(
-    Output('histograma', 'figure'),
-    Output('boxplot', 'figure'),
-    Output('piechart', 'figure'),
-    Output('barchart', 'figure'),
-    Output('scatterplot', 'figure'),
-    Output('kpis-container', 'children'),
-    Output('kpis-adicionales', 'children'),
-    Output('data-table', 'children'),
+# Todas las salidas dependen de los mismos tres filtros, ya aplicados
+FILTROS = [
+    Input('filtro-sector', 'data'),
+    Input('filtro-municipios', 'data'),
+    Input('filtro-ventas', 'data')
+]
+
+# Los controles pasan a los filtros aplicados en el navegador, después de RETARDO_FILTROS_MS
+# sin cambios: varios clics seguidos en los municipios hacen una sola ronda de callbacks.
+# No corre al cargar la página porque los stores ya parten con los valores iniciales
+app.clientside_callback(
+    ClientsideFunction(namespace='filtros', function_name='aplicar'),
+    Output('filtro-sector', 'data'),
+    Output('filtro-municipios', 'data'),
+    Output('filtro-ventas', 'data'),
     Input('sector-dropdown', 'value'),
     Input('municipio-dropdown', 'value'),
-    Input('ventas-slider', 'value')
+    Input('ventas-slider', 'value'),
+    State('retardo-filtros', 'data'),
+    prevent_initial_call=True
 )
-def update_dashboard(sector, municipios, ventas_range):
-    filtered_df = df.copy()
-    
-    if sector:
-        filtered_df = filtered_df[filtered_df["SectorProductivo"] == sector]
-    
-    if municipios:
-        filtered_df = filtered_df[filtered_df["Municipio"].isin(municipios)]
-    
-    if ventas_range:
-        filtered_df = filtered_df[
-            (filtered_df['Ventas mensuales (Millones)'] >= ventas_range[0]) &
-            (filtered_df['Ventas mensuales (Millones)'] <= ventas_range[1])
-        ]
-
-    # Cálculo de KPIs básicos
-    total_empresas = len(filtered_df)
-    promedio_ventas = filtered_df['Ventas mensuales (Millones)'].mean() if not filtered_df['Ventas mensuales (Millones)'].isna().all() else 0
-    total_empleados = filtered_df['Numero empleados'].sum() if not filtered_df['Numero empleados'].isna().all() else 0
-    sectores_activos = filtered_df['SectorProductivo'].nunique()
-
-    # Cálculo de KPIs adicionales - solo los que tienen datos reales
-    try:
-        # 1. Ratio de ventas por empleado promedio (este sí funciona)
-        if 'Numero empleados' in filtered_df.columns and 'Ventas mensuales (Millones)' in filtered_df.columns:
-            # Crear una copia para evitar warnings
-            ratio_calc = filtered_df[['Ventas mensuales (Millones)', 'Numero empleados']].copy()
-            ratio_calc = ratio_calc.dropna()
-            ratio_calc = ratio_calc[ratio_calc['Numero empleados'] > 0]
-            
-            if len(ratio_calc) > 0:
-                ratio_calc['ratio'] = ratio_calc['Ventas mensuales (Millones)'] / ratio_calc['Numero empleados']
-                ratio_promedio = ratio_calc['ratio'].mean()
-            else:
-                ratio_promedio = 0
-        else:
-            ratio_promedio = 0
-            
-        # 2. Ventas máximas y mínimas del grupo filtrado
-        ventas_maxima = filtered_df['Ventas mensuales (Millones)'].max() if not filtered_df['Ventas mensuales (Millones)'].isna().all() else 0
-        ventas_minima = filtered_df['Ventas mensuales (Millones)'].min() if not filtered_df['Ventas mensuales (Millones)'].isna().all() else 0
-        
-        # 3. Promedio de empleados
-        promedio_empleados = filtered_df['Numero empleados'].mean() if not filtered_df['Numero empleados'].isna().all() else 0
-    
-    except Exception as e:
-        print(f"Error calculando KPIs: {e}")
-        ratio_promedio = 0
-        ventas_maxima = 0
-        ventas_minima = 0
-        promedio_empleados = 0
-
-    # KPIs principales con diseño corporativo
-    kpis = html.Div([
-        html.Div([
-            html.Div([
-                html.I(className="fas fa-building", style={'fontSize': '24px', 'color': COLORS['primary'], 'marginBottom': '10px'}),
-                html.H2(f"{total_empresas:,}", 
-                       style={
-                           'color': COLORS['primary'], 
-                           'fontSize': '36px', 
-                           'margin': '0',
-                           'fontWeight': '700',
-                           'fontFamily': 'Inter, sans-serif'
-                       }),
-                html.P("Empresas Registradas", 
-                      style={
-                          'color': COLORS['text_secondary'], 
-                          'fontSize': '14px', 
-                          'margin': '5px 0 0 0',
-                          'fontWeight': '500',
-                          'fontFamily': 'Inter, sans-serif'
-                      })
-            ], style={'textAlign': 'center'})
-        ], style={
-            'backgroundColor': COLORS['surface'], 
-            'padding': '30px 20px', 
-            'borderRadius': '12px', 
-            'width': '18%', 
-            'display': 'inline-block', 
-            'margin': '1%',
-            'boxShadow': f'0 4px 12px {COLORS["shadow"]}',
-            'border': f'2px solid {COLORS["primary"]}',
-            'borderTop': f'4px solid {COLORS["primary"]}',
-            'transition': 'transform 0.2s ease'
-        }),
-        
-        html.Div([
-            html.Div([
-                html.I(className="fas fa-dollar-sign", style={'fontSize': '24px', 'color': COLORS['accent'], 'marginBottom': '10px'}),
-                html.H2(f"${promedio_ventas:.1f}M", 
-                       style={
-                           'color': COLORS['accent'], 
-                           'fontSize': '36px', 
-                           'margin': '0',
-                           'fontWeight': '700',
-                           'fontFamily': 'Inter, sans-serif'
-                       }),
-                html.P("Ventas Promedio", 
-                      style={
-                          'color': COLORS['text_secondary'], 
-                          'fontSize': '14px', 
-                          'margin': '5px 0 0 0',
-                          'fontWeight': '500',
-                          'fontFamily': 'Inter, sans-serif'
-                      })
-            ], style={'textAlign': 'center'})
-        ], style={
-            'backgroundColor': COLORS['surface'], 
-            'padding': '30px 20px', 
-            'borderRadius': '12px', 
-            'width': '18%', 
-            'display': 'inline-block', 
-            'margin': '1%',
-            'boxShadow': f'0 4px 12px {COLORS["shadow"]}',
-            'border': f'2px solid {COLORS["accent"]}',
-            'borderTop': f'4px solid {COLORS["accent"]}'
-        }),
-        
-        html.Div([
-            html.Div([
-                html.I(className="fas fa-users", style={'fontSize': '24px', 'color': COLORS['secondary'], 'marginBottom': '10px'}),
-                html.H2(f"{total_empleados:,}", 
-                       style={
-                           'color': COLORS['secondary'], 
-                           'fontSize': '36px', 
-                           'margin': '0',
-                           'fontWeight': '700',
-                           'fontFamily': 'Inter, sans-serif'
-                       }),
-                html.P("Total Empleados", 
-                      style={
-                          'color': COLORS['text_secondary'], 
-                          'fontSize': '14px', 
-                          'margin': '5px 0 0 0',
-                          'fontWeight': '500',
-                          'fontFamily': 'Inter, sans-serif'
-                      })
-            ], style={'textAlign': 'center'})
-        ], style={
-            'backgroundColor': COLORS['surface'], 
-            'padding': '30px 20px', 
-            'borderRadius': '12px', 
-            'width': '18%', 
-            'display': 'inline-block', 
-            'margin': '1%',
-            'boxShadow': f'0 4px 12px {COLORS["shadow"]}',
-            'border': f'2px solid {COLORS["secondary"]}',
-            'borderTop': f'4px solid {COLORS["secondary"]}'
-        }),
-        
-        html.Div([
-            html.Div([
-                html.I(className="fas fa-chart-pie", style={'fontSize': '24px', 'color': COLORS['warning'], 'marginBottom': '10px'}),
-                html.H2(f"{sectores_activos}", 
-                       style={
-                           'color': COLORS['warning'], 
-                           'fontSize': '36px', 
-                           'margin': '0',
-                           'fontWeight': '700',
-                           'fontFamily': 'Inter, sans-serif'
-                       }),
-                html.P("Sectores Activos", 
-                      style={
-                          'color': COLORS['text_secondary'], 
-                          'fontSize': '14px', 
-                          'margin': '5px 0 0 0',
-                          'fontWeight': '500',
-                          'fontFamily': 'Inter, sans-serif'
-                      })
-            ], style={'textAlign': 'center'})
-        ], style={
-            'backgroundColor': COLORS['surface'], 
-            'padding': '30px 20px', 
-            'borderRadius': '12px', 
-            'width': '18%', 
-            'display': 'inline-block', 
-            'margin': '1%',
-            'boxShadow': f'0 4px 12px {COLORS["shadow"]}',
-            'border': f'2px solid {COLORS["warning"]}',
-            'borderTop': f'4px solid {COLORS["warning"]}'
-        })
-    ], style={
-        'display': 'flex',
-        'justifyContent': 'center',
-        'gap': '20px',
-        'flexWrap': 'wrap'
-    })
 
-    # KPIs adicionales con datos reales
-    kpis_adicionales = html.Div([
-        html.H3("📈 KPIs ESTRATÉGICOS ADICIONALES", 
-                style={
-                    'color': COLORS['text'], 
-                    'textAlign': 'center', 
-                    'marginBottom': '25px',
-                    'fontSize': '24px',
-                    'fontWeight': '600',
-                    'fontFamily': 'Inter, sans-serif'
-                }),
-        
-        html.Div([
-            # Ratio Ventas por Empleado
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-chart-line", style={'fontSize': '20px', 'color': COLORS['primary'], 'marginBottom': '8px'}),
-                    html.H3(f"${ratio_promedio:.2f}M", 
-                           style={
-                               'color': COLORS['primary'], 
-                               'fontSize': '28px', 
-                               'margin': '0',
-                               'fontWeight': '700',
-                               'fontFamily': 'Inter, sans-serif'
-                           }),
-                    html.P("Ratio Ventas/Empleado", 
-                          style={
-                              'color': COLORS['text_secondary'], 
-                              'fontSize': '12px', 
-                              'margin': '5px 0 0 0',
-                              'fontWeight': '500',
-                              'fontFamily': 'Inter, sans-serif'
-                          })
-                ], style={'textAlign': 'center'})
-            ], style={
-                'backgroundColor': COLORS['surface'], 
-                'padding': '20px 15px', 
-                'borderRadius': '10px', 
-                'width': '30%', 
-                'display': 'inline-block', 
-                'margin': '1.5%',
-                'boxShadow': f'0 3px 10px {COLORS["shadow"]}',
-                'border': f'1px solid {COLORS["primary"]}',
-                'borderLeft': f'4px solid {COLORS["primary"]}'
-            }),
-            
-            # Ventas Máximas
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-arrow-up", style={'fontSize': '20px', 'color': COLORS['accent'], 'marginBottom': '8px'}),
-                    html.H3(f"${ventas_maxima:.1f}M", 
-                           style={
-                               'color': COLORS['accent'], 
-                               'fontSize': '28px', 
-                               'margin': '0',
-                               'fontWeight': '700',
-                               'fontFamily': 'Inter, sans-serif'
-                           }),
-                    html.P("Ventas Máximas", 
-                          style={
-                              'color': COLORS['text_secondary'], 
-                              'fontSize': '12px', 
-                              'margin': '5px 0 0 0',
-                              'fontWeight': '500',
-                              'fontFamily': 'Inter, sans-serif'
-                          })
-                ], style={'textAlign': 'center'})
-            ], style={
-                'backgroundColor': COLORS['surface'], 
-                'padding': '20px 15px', 
-                'borderRadius': '10px', 
-                'width': '30%', 
-                'display': 'inline-block', 
-                'margin': '1.5%',
-                'boxShadow': f'0 3px 10px {COLORS["shadow"]}',
-                'border': f'1px solid {COLORS["accent"]}',
-                'borderLeft': f'4px solid {COLORS["accent"]}'
-            }),
-            
-            # Promedio de Empleados
-            html.Div([
-                html.Div([
-                    html.I(className="fas fa-user-friends", style={'fontSize': '20px', 'color': COLORS['warning'], 'marginBottom': '8px'}),
-                    html.H3(f"{promedio_empleados:.0f}", 
-                           style={
-                               'color': COLORS['warning'], 
-                               'fontSize': '28px', 
-                               'margin': '0',
-                               'fontWeight': '700',
-                               'fontFamily': 'Inter, sans-serif'
-                           }),
-                    html.P("Empleados Promedio", 
-                          style={
-                              'color': COLORS['text_secondary'], 
-                              'fontSize': '12px', 
-                              'margin': '5px 0 0 0',
-                              'fontWeight': '500',
-                              'fontFamily': 'Inter, sans-serif'
-                          })
-                ], style={'textAlign': 'center'})
-            ], style={
-                'backgroundColor': COLORS['surface'], 
-                'padding': '20px 15px', 
-                'borderRadius': '10px', 
-                'width': '30%', 
-                'display': 'inline-block', 
-                'margin': '1.5%',
-                'boxShadow': f'0 3px 10px {COLORS["shadow"]}',
-                'border': f'1px solid {COLORS["warning"]}',
-                'borderLeft': f'4px solid {COLORS["warning"]}'
-            })
-        ], style={
-            'display': 'flex',
-            'justifyContent': 'center',
-            'gap': '15px',
-            'flexWrap': 'wrap'
-        })
-    ], style={
-        'backgroundColor': COLORS['surface'],
-        'padding': '25px',
-        'borderRadius': '16px',
-        'margin': '20px',
-        'boxShadow': f'0 4px 20px {COLORS["shadow"]}',
-        'border': f'1px solid {COLORS["border"]}'
-    })
 
-    # Template limpio para gráficos
-    template = "plotly_white"
-    
-    # Paleta de colores mejorada para gráficos (sin amarillo suave)
-    colores_graficos = [COLORS['primary'], COLORS['accent'], COLORS['warning'], COLORS['secondary'], COLORS['danger'], '#8b5cf6', '#06b6d4', '#84cc16']
-    
-    # Histograma
-    fig_hist = px.histogram(
-        filtered_df, x="Ventas mensuales (Millones)",
-        nbins=25, title="📊 Distribución de Ventas Mensuales",
-        color_discrete_sequence=[COLORS['primary']],
-        template=template,
-        labels={'count': 'Número de empresas'}
-    )
-    fig_hist.update_layout(
-        plot_bgcolor=COLORS['surface'],
-        paper_bgcolor=COLORS['surface'],
-        font_color=COLORS['text'],
-        title_x=0.5,
-        showlegend=False,
-        title_font_size=18,
-        title_font_color=COLORS['text'],
-        title_font_family='Inter',
-        font_family='Inter',
-        yaxis_title="Número de empresas",  # Asegurar el título del eje Y
-        xaxis_title="Ventas mensuales (Millones)"
-    )
-    fig_hist.update_traces(opacity=0.8, marker_line_width=1, marker_line_color='white')
+def filtrar_datos(sector, municipios, ventas_range):
+    # Paso de filtrado compartido: cada callback lo pide por su cuenta y la caché
+    # hace que una misma combinación de filtros se calcule una sola vez.
+    # El resultado es compartido, los callbacks no deben modificarlo.
+    with etapa('filtro'):
+        return datos_actuales()['filtrar_filas'](
+            sector,
+            tuple(sorted(municipios)) if municipios else None,
+            tuple(ventas_range) if ventas_range else None
+        )
 
-    # Boxplot
-    fig_box = px.box(
-        filtered_df, x="SectorProductivo", y="Ventas mensuales (Millones)",
-        title="📈 Análisis de Ventas por Sector Productivo",
-        color="SectorProductivo",
-        template=template,
-        color_discrete_sequence=colores_graficos
-    )
-    fig_box.update_layout(
-        plot_bgcolor=COLORS['surface'],
-        paper_bgcolor=COLORS['surface'],
-        font_color=COLORS['text'],
-        title_x=0.5,
-        showlegend=False,
-        title_font_size=18,
-        title_font_color=COLORS['text'],
-        title_font_family='Inter',
-        font_family='Inter'
-    )
-    fig_box.update_xaxes(tickangle=45)
 
-    # Pie chart
-    genero_counts = filtered_df['Genero responsable'].value_counts()
-    fig_pie = px.pie(
-        names=genero_counts.index, values=genero_counts.values,
-        title="👥 Distribución por Género del Responsable",
-        color_discrete_sequence=colores_graficos,
-        template=template
-    )
-    fig_pie.update_traces(
-        textposition='inside', 
-        textinfo='percent+label', 
-        textfont_size=14, 
-        marker=dict(line=dict(color='white', width=2)),
-        textfont_family='Inter'
-    )
-    fig_pie.update_layout(
-        plot_bgcolor=COLORS['surface'],
-        paper_bgcolor=COLORS['surface'],
-        font_color=COLORS['text'],
-        title_x=0.5,
-        title_font_size=18,
-        title_font_color=COLORS['text'],
-        title_font_family='Inter',
-        font_family='Inter'
-    )
+def tipo_filtros(sector, municipios, ventas_range):
+    # Etiqueta de pocos valores para las métricas: qué filtros están activos
+    minimo, maximo = datos_actuales()['limites']
+    activos = [nombre for nombre, activo in (
+        ('sector', sector),
+        ('municipios', municipios),
+        ('ventas', ventas_range and (ventas_range[0] > minimo or ventas_range[1] < maximo)),
+    ) if activo]
+    return "+".join(activos) or "ninguno"
 
-    # Bar chart
-    top_municipios = filtered_df['Municipio'].value_counts().nlargest(10)
-    fig_bar = px.bar(
-        x=top_municipios.values, y=top_municipios.index,
-        orientation='h', title="🏛️ Top 10 Municipios por Número de Empresas",
-        color=top_municipios.values,
-        color_continuous_scale=[[0, COLORS['primary']], [0.5, COLORS['accent']], [1, COLORS['warning']]],
-        template=template
-    )
-    fig_bar.update_layout(
-        plot_bgcolor=COLORS['surface'],
-        paper_bgcolor=COLORS['surface'],
-        font_color=COLORS['text'],
-        title_x=0.5,
-        showlegend=False,
-        coloraxis_showscale=False,
-        title_font_size=18,
-        title_font_color=COLORS['text'],
-        title_font_family='Inter',
-        font_family='Inter'
-    )
 
-    # Scatter plot
-    fig_scatter = px.scatter(
-        filtered_df, x="Numero empleados", y="Ventas mensuales (Millones)",
-        color="SectorProductivo", size="Ventas mensuales (Millones)",
-        hover_name="NombreEmpresa",
-        title="🔍 Relación Empleados vs Ventas por Sector",
-        size_max=25,
-        template=template,
-        opacity=0.7,
-        color_discrete_sequence=colores_graficos
-    )
-    fig_scatter.update_layout(
-        plot_bgcolor=COLORS['surface'],
-        paper_bgcolor=COLORS['surface'],
-        font_color=COLORS['text'],
-        title_x=0.5,
-        title_font_size=18,
-        title_font_color=COLORS['text'],
-        title_font_family='Inter',
-        font_family='Inter'
+def medido(nombre):
+    return medir_callback(nombre, tipo_filtros, clave_filtros)
+
+
+# Tras una recarga de datos se actualizan las opciones de los filtros y los límites
+# del slider; al cambiar su valor se vuelven a calcular todos los gráficos
+@app.callback(
+    Output('version-datos', 'data'),
+    Output('sector-dropdown', 'options'),
+    Output('municipio-dropdown', 'options'),
+    Output('ventas-slider', 'min'),
+    Output('ventas-slider', 'max'),
+    Output('ventas-slider', 'marks'),
+    Output('ventas-slider', 'value'),
+    Output('cubo-cliente', 'data'),
+    Input('revision-datos', 'n_intervals'),
+    State('version-datos', 'data'),
+    State('ventas-slider', 'value')
+)
+def actualizar_filtros(n_intervals, version_pagina, ventas_range):
+    datos = datos_actuales()
+    # Solo se avanza: un worker que todavía no recargó tiene una versión anterior a la
+    # de la página y no debe devolverle los datos viejos
+    if orden_version(datos['version']) <= orden_version(version_pagina):
+        return (no_update,) * 8
+
+    minimo, maximo = datos['limites']
+    if ventas_range:
+        # Se conserva el rango elegido, recortado a los nuevos límites
+        ventas_range = [min(max(ventas_range[0], minimo), maximo), max(min(ventas_range[1], maximo), minimo)]
+    else:
+        ventas_range = [minimo, maximo]
+
+    return (
+        datos['version'],
+        opciones_sector(datos['df']),
+        opciones_municipio(datos['df']),
+        minimo,
+        maximo,
+        marcas_slider(minimo, maximo),
+        ventas_range,
+        datos['cubo_cliente']
     )
 
-    # Tabla
-    table = dash_table.DataTable(
-        data=filtered_df.head(20).to_dict('records'),
-        columns=[{"name": i, "id": i} for i in filtered_df.columns[:8]],
-        style_cell={
-            'backgroundColor': COLORS['surface'],
-            'color': COLORS['text'],
-            'border': f'1px solid {COLORS["border"]}',
-            'textAlign': 'left',
-            'fontFamily': 'Inter, sans-serif',
-            'fontSize': '14px',
-            'padding': '12px'
-        },
-        style_header={
-            'backgroundColor': COLORS['primary'],
-            'color': 'white',
-            'fontWeight': '600',
-            'fontSize': '14px',
-            'textAlign': 'center',
-            'fontFamily': 'Inter, sans-serif'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8fafc'
-            }
-        ],
-        page_size=10,
-        sort_action="native",
-        filter_action="native",
-        style_table={'overflowX': 'auto', 'borderRadius': '8px'}
+
+# Cada salida tiene su propio callback: los KPIs, que solo consultan el cubo,
+# llegan al navegador sin esperar a los gráficos que recorren filas
+@app.callback(
+    Output('kpi-empresas', 'children'),
+    Output('kpi-ventas-promedio', 'children'),
+    Output('kpi-empleados', 'children'),
+    Output('kpi-sectores', 'children'),
+    Output('kpi-ratio', 'children'),
+    Output('kpi-ventas-maximas', 'children'),
+    Output('kpi-empleados-promedio', 'children'),
+    *FILTROS
+)
+@medido('kpis')
+@cachear_resultado('kpis', version_datos)
+def actualizar_kpis(sector, municipios, ventas_range):
+    # Los KPIs salen del cubo de agregados, sin recorrer filas; las tarjetas ya están
+    # en el layout y solo se envían los textos
+    with etapa('kpis.cubo'):
+        celdas = consultar_cubo(datos_actuales()['cubo'], sector, municipios, ventas_range)
+    with etapa('kpis.resumen'):
+        resumen = resumen_kpis(celdas)
+
+    return (
+        f"{resumen['total_empresas']:,}",
+        f"${resumen['promedio_ventas']:.1f}M",
+        f"{resumen['total_empleados']:,}",
+        f"{resumen['sectores_activos']}",
+        f"${resumen['ratio_promedio']:.2f}M",
+        f"${resumen['ventas_maxima']:.1f}M",
+        f"{resumen['promedio_empleados']:.0f}"
     )
 
-    return fig_hist, fig_box, fig_pie, fig_bar, fig_scatter, kpis, kpis_adicionales, table
+
+# Vista previa de los KPIs en el navegador con el cubo compacto, al instante y también
+# mientras se arrastra el slider; actualizar_kpis la reemplaza al aplicarse los filtros
+app.clientside_callback(
+    ClientsideFunction(namespace='filtros', function_name='vista_previa'),
+    Output('kpi-empresas', 'children', allow_duplicate=True),
+    Output('kpi-ventas-promedio', 'children', allow_duplicate=True),
+    Output('kpi-empleados', 'children', allow_duplicate=True),
+    Output('kpi-sectores', 'children', allow_duplicate=True),
+    Output('kpi-ratio', 'children', allow_duplicate=True),
+    Output('kpi-ventas-maximas', 'children', allow_duplicate=True),
+    Output('kpi-empleados-promedio', 'children', allow_duplicate=True),
+    Input('sector-dropdown', 'value'),
+    Input('municipio-dropdown', 'value'),
+    Input('ventas-slider', 'drag_value'),
+    State('ventas-slider', 'value'),
+    State('cubo-cliente', 'data'),
+    prevent_initial_call=True
+)
+
+
+@app.callback(Output('histograma', 'figure'), *FILTROS)
+@medido('histograma')
+@cachear_resultado('histograma', version_datos)
+def actualizar_histograma(sector, municipios, ventas_range):
+    filtered_df = filtrar_datos(sector, municipios, ventas_range)
+    with etapa('figura.histograma'):
+        return solo_datos(figura_histograma(filtered_df))
+
+
+@app.callback(Output('boxplot', 'figure'), *FILTROS)
+@medido('boxplot')
+@cachear_resultado('boxplot', version_datos)
+def actualizar_boxplot(sector, municipios, ventas_range):
+    filtered_df = filtrar_datos(sector, municipios, ventas_range)
+    with etapa('figura.boxplot'):
+        return solo_datos(figura_boxplot(filtered_df))
+
+
+@app.callback(Output('piechart', 'figure'), *FILTROS)
+@medido('piechart')
+@cachear_resultado('piechart', version_datos)
+def actualizar_piechart(sector, municipios, ventas_range):
+    with etapa('figura.piechart'):
+        genero_counts = conteo_por(consultar_cubo(datos_actuales()['cubo'], sector, municipios, ventas_range), 'Genero responsable')
+        return solo_datos(figura_pastel(genero_counts))
+
+
+@app.callback(Output('barchart', 'figure'), *FILTROS)
+@medido('barchart')
+@cachear_resultado('barchart', version_datos)
+def actualizar_barchart(sector, municipios, ventas_range):
+    with etapa('figura.barchart'):
+        top_municipios = conteo_por(consultar_cubo(datos_actuales()['cubo'], sector, municipios, ventas_range), 'Municipio').nlargest(10)
+        return solo_datos(figura_barras(top_municipios))
+
+
+def salidas_avance(id_barra):
+    return [Output(f'{id_barra}-barra', 'value'), Output(f'{id_barra}-barra', 'max'), Output(f'{id_barra}-texto', 'children')]
+
+
+def mientras_corre(id_barra, salida, estilo):
+    # Mientras corre el proceso: barra de avance visible y la salida atenuada
+    return [
+        (Output(id_barra, 'style'), {'display': 'block'}, {'display': 'none'}),
+        (salida, {**estilo, **ATENUADO}, estilo),
+    ]
+
+
+# En segundo plano (ver gestor_segundo_plano), con la caché de resultados del gestor en
+# lugar de cachear_resultado. En el proceso del trabajo no se miden etapas, así que en
+# /metrics de estos dos callbacks solo aparecen las peticiones
+@app.callback(
+    Output('scatterplot', 'figure'),
+    *FILTROS,
+    background=True,
+    progress=salidas_avance('avance-dispersion'),
+    progress_default=[0, 1, ""],
+    running=mientras_corre('avance-dispersion', Output('scatterplot', 'style'), ESTILO_DISPERSION),
+    interval=INTERVALO_AVANCE_MS
+)
+def actualizar_scatterplot(set_progress, sector, municipios, ventas_range):
+    set_progress((0, 2, "Filtrando empresas..."))
+    filtered_df = filtrar_datos(sector, municipios, ventas_range)
+    set_progress((1, 2, f"Construyendo el gráfico con {len(filtered_df):,} empresas..."))
+    with etapa('figura.scatterplot'):
+        return solo_datos(figura_dispersion(filtered_df))
+
+
+@app.callback(Output('correlacion', 'figure'), *FILTROS)
+@medido('correlacion')
+@cachear_resultado('correlacion', version_datos)
+def actualizar_correlacion(sector, municipios, ventas_range):
+    # Se suman los momentos de las celdas del cubo que forman la selección, sin recorrer filas
+    datos = datos_actuales()
+    with etapa('figura.correlacion'):
+        celdas = consultar_cubo(datos['cubo'], sector, municipios, ventas_range)
+        return solo_datos(figura_correlacion(combinar(datos['momentos'], celdas.index.to_numpy())))
+
+
+# Al cambiar los filtros o el filtro de la tabla se vuelve a la primera página en la misma
+# consulta, sin un callback aparte que cambie page_current y la dispare otra vez
+REINICIAN_PAGINA = [f"{entrada.component_id}.{entrada.component_property}" for entrada in FILTROS]
+REINICIAN_PAGINA.append('data-table.filter_query')
+
+
+def pagina_tabla(set_progress, sector, municipios, ventas_range, page_current, page_size, sort_by, filter_query):
+    set_progress((0, 2, "Filtrando empresas..."))
+    filtered_df = filtrar_datos(sector, municipios, ventas_range)
+    set_progress((1, 2, f"Consultando {len(filtered_df):,} filas..."))
+
+    # Solo viaja al navegador la página visible
+    with etapa('tabla'):
+        return consultar_tabla(filtered_df, filter_query, sort_by, page_current, page_size, COLUMNAS_TABLA)
+
+
+@app.callback(
+    Output('data-table', 'data'),
+    Output('data-table', 'page_count'),
+    Output('data-table', 'page_current'),
+    *FILTROS,
+    Input('data-table', 'page_current'),
+    Input('data-table', 'page_size'),
+    Input('data-table', 'sort_by'),
+    Input('data-table', 'filter_query'),
+    background=True,
+    progress=salidas_avance('avance-tabla'),
+    progress_default=[0, 1, ""],
+    running=mientras_corre('avance-tabla', Output('data-table', 'style_table'), ESTILO_TABLA),
+    interval=INTERVALO_AVANCE_MS,
+    # La página que se devuelve depende de qué cambió, así que entra en la clave de la caché
+    cache_ignore_triggered=False
+)
+def actualizar_tabla(set_progress, sector, municipios, ventas_range, page_current, page_size, sort_by, filter_query):
+    reiniciar = any(prop in ctx.triggered_prop_ids for prop in REINICIAN_PAGINA)
+    if reiniciar:
+        page_current = 0
+    data, page_count = pagina_tabla(set_progress, sector, municipios, ventas_range,
+                                    page_current, page_size, sort_by, filter_query)
+    return data, page_count, 0 if reiniciar else no_update
+
+# Con gunicorn --preload (ver Procfile) este módulo se ejecuta una sola vez en el
+# proceso maestro y los workers heredan los datos al hacer fork, sin volver a leerlos.
+# gc.freeze() deja estos objetos fuera del recolector de basura para que recorrerlos
+# no escriba en sus páginas y cada worker no termine con su propia copia.
+#
+# Solo se comparte la versión cargada al arrancar: cada recarga (ver recarga_datos) la
+# arma cada worker por su cuenta, así que tras cambiar el archivo limpio cada worker
+# tiene su propia copia de los datos (una por worker, en lugar de una para todos)
+# hasta que gunicorn se reinicia y el maestro vuelve a cargarlos
+gc.freeze()
 
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get("PORT", 10000))
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+# Estadísticas a partir de momentos combinables: para cada par de columnas (i, j) se
+# guardan, sobre las filas donde ambas tienen dato, el conteo, las sumas, las sumas de
+# cuadrados y los productos cruzados. Los momentos de dos particiones se combinan
+# sumándolos, así la correlación de una selección sale de sumar los momentos de las
+# celdas del cubo que la forman, sin volver a recorrer filas. Con los conteos por par
+# el resultado coincide con DataFrame.corr()/cov(), que usan observaciones por pares.
+
+COLUMNAS_ESTADISTICAS = ['Numero empleados', 'Ventas mensuales (Millones)', 'Edad responsable', 'Antiguedad empresa']
+
+
+def _preparar(valores):
+    valores = np.asarray(valores, dtype=float)
+    validos = ~np.isnan(valores)
+    return np.where(validos, valores, 0.0), validos.astype(float)
+
+
+def momentos(valores):
+    # valores: matriz filas x columnas (NaN = sin dato)
+    x, m = _preparar(valores)
+    return {
+        'n': m.T @ m,
+        'suma': x.T @ m,              # suma[i, j]: suma de la columna i donde j también tiene dato
+        'suma2': (x * x).T @ m,
+        'productos': x.T @ x,
+        'minimo': np.where(m > 0, x, np.inf).min(axis=0, initial=np.inf),
+        'maximo': np.where(m > 0, x, -np.inf).max(axis=0, initial=-np.inf),
+    }
+
+
+def momentos_por_grupo(valores, grupos, n_grupos):
+    # Los mismos momentos para cada grupo (por ejemplo, cada celda del cubo): arreglos
+    # con un eje inicial de tamaño n_grupos, calculados con bincount en una sola pasada
+    x, m = _preparar(valores)
+    grupos = np.asarray(grupos)
+    columnas = x.shape[1]
+    resultado = {clave: np.zeros((n_grupos, columnas, columnas)) for clave in ('n', 'suma', 'suma2', 'productos')}
+    for i in range(columnas):
+        for j in range(columnas):
+            resultado['n'][:, i, j] = np.bincount(grupos, m[:, i] * m[:, j], minlength=n_grupos)
+            resultado['suma'][:, i, j] = np.bincount(grupos, x[:, i] * m[:, j], minlength=n_grupos)
+            resultado['suma2'][:, i, j] = np.bincount(grupos, x[:, i] ** 2 * m[:, j], minlength=n_grupos)
+            resultado['productos'][:, i, j] = np.bincount(grupos, x[:, i] * x[:, j], minlength=n_grupos)
+
+    extremos = pd.DataFrame(np.where(m > 0, x, np.nan)).groupby(grupos)
+    resultado['minimo'] = extremos.min().reindex(range(n_grupos)).fillna(np.inf).to_numpy()
+    resultado['maximo'] = extremos.max().reindex(range(n_grupos)).fillna(-np.inf).to_numpy()
+    return resultado
+
+
+def combinar(momentos_grupos, seleccion=None):
+    # Suma los momentos de los grupos seleccionados (posiciones); sin selección, todos
+    if seleccion is not None:
+        momentos_grupos = {clave: valor[seleccion] for clave, valor in momentos_grupos.items()}
+    combinados = {clave: momentos_grupos[clave].sum(axis=0) for clave in ('n', 'suma', 'suma2', 'productos')}
+    combinados['minimo'] = momentos_grupos['minimo'].min(axis=0, initial=np.inf)
+    combinados['maximo'] = momentos_grupos['maximo'].max(axis=0, initial=-np.inf)
+    return combinados
+
+
+def _centrados(m):
+    # Sumas de cuadrados y productos centrados por par; NaN donde no hay datos suficientes
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = np.where(m['n'] > 0, m['n'], np.nan)
+        productos = m['productos'] - m['suma'] * m['suma'].T / n
+        cuadrados = m['suma2'] - m['suma'] ** 2 / n
+    return n, productos, np.maximum(cuadrados, 0)
+
+
+def covarianza(m):
+    n, productos, _ = _centrados(m)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 1, productos / (n - 1), np.nan)
+
+
+def correlacion(m):
+    # Pearson por pares; una columna constante da NaN, igual que pandas
+    n, productos, cuadrados = _centrados(m)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = productos / np.sqrt(cuadrados * cuadrados.T)
+    r = np.where((n > 1) & (cuadrados > 0) & (cuadrados.T > 0), r, np.nan)
+    return np.clip(r, -1, 1)
+
+
+def descriptivos(m, columnas=None):
+    conteo = np.diag(m['n'])
+    suma = np.diag(m['suma'])
+    _, _, cuadrados = _centrados(m)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(conteo > 0, suma / conteo, np.nan)
+        desviacion = np.where(conteo > 1, np.sqrt(np.diag(cuadrados) / (conteo - 1)), np.nan)
+    return pd.DataFrame({
+        'count': conteo,
+        'mean': media,
+        'std': desviacion,
+        'min': np.where(conteo > 0, m['minimo'], np.nan),
+        'max': np.where(conteo > 0, m['maximo'], np.nan),
+    }, index=columnas)
+
+
+def _rangos(valores):
+    # Rangos promedio (empates con el mismo rango), como rank() de pandas
+    return pd.Series(valores).rank().to_numpy()
+
+
+def spearman(valores):
+    # Spearman es Pearson sobre rangos y los rangos dependen de la selección completa,
+    # así que no se combina por particiones: se calcula sobre las filas de la selección.
+    # Las columnas sin faltantes se ordenan una sola vez; solo los pares con faltantes
+    # se vuelven a ordenar sobre sus filas comunes
+    valores = np.asarray(valores, dtype=float)
+    validos = ~np.isnan(valores)
+    columnas = valores.shape[1]
+    completas = validos.all(axis=0)
+    rangos = np.column_stack([_rangos(valores[:, i]) for i in range(columnas)]) if len(valores) else valores
+
+    resultado = correlacion(momentos(rangos))
+    for i in range(columnas):
+        for j in range(i + 1, columnas):
+            if completas[i] and completas[j]:
+                continue
+            filas = validos[:, i] & validos[:, j]
+            par = np.column_stack((_rangos(valores[filas, i]), _rangos(valores[filas, j])))
+            resultado[i, j] = resultado[j, i] = correlacion(momentos(par))[0, 1]
+    return resultado
+
+
+def matriz(valores, columnas):
+    return pd.DataFrame(valores, index=columnas, columns=columnas)
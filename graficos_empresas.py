@@ -1,174 +1,433 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from matplotlib.colors import LinearSegmentedColormap
 import numpy as np
 
-# Cargar el archivo limpio
-df = pd.read_excel("PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx")
+from estadisticas import correlacion, matriz, momentos
+from resumenes_graficos import densidad_kde
+
+ARCHIVO_LIMPIO = "PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx"
+
+# Manifiesto del modo por lotes: huella de los datos y del código de cada gráfico ya generado
+MANIFIESTO = ".graficos_manifiesto.json"
+
+# Reportes por grupo: un juego de gráficos por cada valor de estas columnas
+DIMENSIONES_REPORTE = ['SectorProductivo', 'Municipio']
+GRAFICOS_REPORTE = [
+    'grafico_histograma_mejorado', 'grafico_caja_mejorado', 'grafico_pastel_mejorado',
+    'grafico_barras_mejorado', 'grafico_dispersion_mejorado',
+]
+MANIFIESTO_REPORTES = ".reportes_manifiesto.json"
 
 # Configuración del estilo de los gráficos
-plt.style.use('dark_background')
-sns.set_palette("husl")
+ESTILO = 'dark_background'
+PALETA = "husl"
+DPI = 300
 
-# Colores 
+# Ancho de banda de la curva de densidad del histograma: 'scott', 'silverman' o un factor
+ANCHO_BANDA_KDE = 'scott'
+
+# Colores
 colores_gradiente = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
 colores_neon = ['#00f5ff', '#ff073a', '#39ff14', '#ff9500', '#bf00ff', '#ffff00']
 
-# 1. HISTOGRAMA 
-plt.figure(figsize=(12, 7))
-plt.gca().set_facecolor('#1a1a1a')
 
+def aplicar_estilo():
+    plt.style.use(ESTILO)
+    sns.set_palette(PALETA)
 
-n, bins, patches = plt.hist(df['Ventas mensuales (Millones)'].dropna(), 
-                           bins=30, alpha=0.8, edgecolor='white', linewidth=0.8)
 
+# 1. HISTOGRAMA
+def grafico_histograma(df, num=None):
+    plt.figure(num, figsize=(12, 7))
+    plt.gca().set_facecolor('#1a1a1a')
 
-cm = plt.cm.get_cmap('plasma')
-for i, p in enumerate(patches):
-    p.set_facecolor(cm(i / len(patches)))
 
-#  KDE 
-kde_data = df['Ventas mensuales (Millones)'].dropna()
-from scipy.stats import gaussian_kde
-kde = gaussian_kde(kde_data)
-x_range = np.linspace(kde_data.min(), kde_data.max(), 200)
-plt.plot(x_range, kde(x_range) * len(kde_data) * (bins[1] - bins[0]), 
-         color='#00f5ff', linewidth=3, label='Densidad')
+    n, bins, patches = plt.hist(df['Ventas mensuales (Millones)'].dropna(),
+                               bins=30, alpha=0.8, edgecolor='white', linewidth=0.8)
 
-plt.title(" Distribución de Ventas Mensuales", fontsize=18, fontweight='bold', color='white', pad=20)
-plt.xlabel("Ventas mensuales (Millones)", fontsize=14, color='white')
-plt.ylabel("Número de empresas", fontsize=14, color='white')
-plt.grid(True, alpha=0.3, color='gray')
-plt.legend()
-plt.tight_layout()
-plt.savefig("grafico_histograma_mejorado.png", dpi=300, bbox_inches='tight', facecolor='#1a1a1a')
-plt.show()
 
-# 2. GRÁFICO DE CAJA 
-plt.figure(figsize=(14, 8))
-plt.gca().set_facecolor('#0f0f0f')
+    cm = plt.cm.get_cmap('plasma')
+    for i, p in enumerate(patches):
+        p.set_facecolor(cm(i / len(patches)))
 
-# 
-box_plot = sns.boxplot(data=df, x="SectorProductivo", y="Ventas mensuales (Millones)", 
-                       palette=colores_gradiente, linewidth=2)
+    #  KDE (binning + FFT, mismo resultado que gaussian_kde sin recorrer todos los datos por punto)
+    kde_data = df['Ventas mensuales (Millones)'].dropna()
+    x_range = np.linspace(kde_data.min(), kde_data.max(), 200)
+    plt.plot(x_range, densidad_kde(kde_data, x_range, ANCHO_BANDA_KDE) * len(kde_data) * (bins[1] - bins[0]),
+             color='#00f5ff', linewidth=3, label='Densidad')
 
-# Personalizar cajas
-for patch in box_plot.artists:
-    patch.set_alpha(0.8)
-    patch.set_edgecolor('white')
-    patch.set_linewidth(2)
+    plt.title(" Distribución de Ventas Mensuales", fontsize=18, fontweight='bold', color='white', pad=20)
+    plt.xlabel("Ventas mensuales (Millones)", fontsize=14, color='white')
+    plt.ylabel("Número de empresas", fontsize=14, color='white')
+    plt.grid(True, alpha=0.3, color='gray')
+    plt.legend()
+    plt.tight_layout()
 
-plt.title(" Ventas Mensuales por Sector Productivo", fontsize=18, fontweight='bold', color='white', pad=20)
-plt.xlabel("Sector Productivo", fontsize=14, color='white')
-plt.ylabel("Ventas mensuales (Millones)", fontsize=14, color='white')
-plt.xticks(rotation=45, ha='right', color='white')
-plt.yticks(color='white')
-plt.grid(True, alpha=0.2, color='gray')
-plt.tight_layout()
-plt.savefig("grafico_caja_mejorado.png", dpi=300, bbox_inches='tight', facecolor='#0f0f0f')
-plt.show()
 
-# 3. GRÁFICO DE PASTEL 
-plt.figure(figsize=(10, 10))
-plt.gca().set_facecolor('#1a1a1a')
+# 2. GRÁFICO DE CAJA
+def grafico_caja(df, num=None):
+    plt.figure(num, figsize=(14, 8))
+    plt.gca().set_facecolor('#0f0f0f')
 
-genero_counts = df['Genero responsable'].value_counts()
+    # Solo filas con ventas: un grupo sin ninguna hace fallar a sns.boxplot
+    df = df.dropna(subset=["Ventas mensuales (Millones)"])
+    box_plot = sns.boxplot(data=df, x="SectorProductivo", y="Ventas mensuales (Millones)",
+                           palette=colores_gradiente, linewidth=2)
 
-# Colores 
-colors_pie = ['#ff073a', '#39ff14', '#00f5ff', '#ff9500']
+    # Personalizar cajas
+    for patch in box_plot.artists:
+        patch.set_alpha(0.8)
+        patch.set_edgecolor('white')
+        patch.set_linewidth(2)
 
+    plt.title(" Ventas Mensuales por Sector Productivo", fontsize=18, fontweight='bold', color='white', pad=20)
+    plt.xlabel("Sector Productivo", fontsize=14, color='white')
+    plt.ylabel("Ventas mensuales (Millones)", fontsize=14, color='white')
+    plt.xticks(rotation=45, ha='right', color='white')
+    plt.yticks(color='white')
+    plt.grid(True, alpha=0.2, color='gray')
+    plt.tight_layout()
 
-explode = (0.05, 0.05, 0.05, 0.05)[:len(genero_counts)]
 
-wedges, texts, autotexts = plt.pie(genero_counts, labels=genero_counts.index, 
-                                   autopct='%1.1f%%', startangle=90, 
-                                   colors=colors_pie[:len(genero_counts)],
-                                   explode=explode, shadow=True,
-                                   textprops={'fontsize': 12, 'fontweight': 'bold', 'color': 'white'})
+# 3. GRÁFICO DE PASTEL
+def grafico_pastel(df, num=None):
+    plt.figure(num, figsize=(10, 10))
+    plt.gca().set_facecolor('#1a1a1a')
 
+    genero_counts = df['Genero responsable'].value_counts()
 
-for autotext in autotexts:
-    autotext.set_color('black')
-    autotext.set_fontweight('bold')
-    autotext.set_fontsize(14)
+    # Colores
+    colors_pie = ['#ff073a', '#39ff14', '#00f5ff', '#ff9500']
 
-plt.title(" Distribución por Género del Responsable", fontsize=18, fontweight='bold', color='white', pad=30)
-plt.tight_layout()
-plt.savefig("grafico_pastel_mejorado.png", dpi=300, bbox_inches='tight', facecolor='#1a1a1a')
-plt.show()
 
-# 4. GRÁFICO DE BARRAS HORIZONTAL 
-plt.figure(figsize=(12, 8))
-plt.gca().set_facecolor('#0d1117')
+    explode = (0.05, 0.05, 0.05, 0.05)[:len(genero_counts)]
 
-top_municipios = df['Municipio'].value_counts().nlargest(10)
+    wedges, texts, autotexts = plt.pie(genero_counts, labels=genero_counts.index,
+                                       autopct='%1.1f%%', startangle=90,
+                                       colors=colors_pie[:len(genero_counts)],
+                                       explode=explode, shadow=True,
+                                       textprops={'fontsize': 12, 'fontweight': 'bold', 'color': 'white'})
 
 
-bars = plt.barh(range(len(top_municipios)), top_municipios.values, 
-                color=colores_gradiente[:len(top_municipios)], 
-                edgecolor='white', linewidth=1.5, alpha=0.9)
+    for autotext in autotexts:
+        autotext.set_color('black')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(14)
 
+    plt.title(" Distribución por Género del Responsable", fontsize=18, fontweight='bold', color='white', pad=30)
+    plt.tight_layout()
 
-for i, bar in enumerate(bars):
-    bar.set_alpha(0.8)
-    # Agregar valor al final de cada barra
-    plt.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2, 
-             f'{int(bar.get_width())}', ha='left', va='center', 
-             color='white', fontweight='bold', fontsize=10)
-
-plt.yticks(range(len(top_municipios)), top_municipios.index, color='white', fontsize=11)
-plt.xticks(color='white')
-plt.title(" Top 10 Municipios con Más Empresas", fontsize=18, fontweight='bold', color='white', pad=20)
-plt.xlabel("Número de empresas", fontsize=14, color='white')
-plt.ylabel("Municipio", fontsize=14, color='white')
-plt.grid(True, alpha=0.2, axis='x', color='gray')
-plt.tight_layout()
-plt.savefig("grafico_barras_mejorado.png", dpi=300, bbox_inches='tight', facecolor='#0d1117')
-plt.show()
-
-# 5. GRÁFICO DE DISPERSIÓN 
-plt.figure(figsize=(14, 9))
-plt.gca().set_facecolor('#0a0a0a')
-
-
-scatter = sns.scatterplot(data=df, x="Numero empleados", y="Ventas mensuales (Millones)", 
-                         hue="SectorProductivo", size="Ventas mensuales (Millones)",
-                         sizes=(50, 400), alpha=0.8, palette='Set1', edgecolor='white', linewidth=0.5)
-
-
-plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', frameon=True, 
-           facecolor='#1a1a1a', edgecolor='white')
-for text in plt.gca().get_legend().get_texts():
-    text.set_color('white')
 
-plt.title("Empleados vs Ventas Mensuales por Sector", fontsize=18, fontweight='bold', color='white', pad=20)
-plt.xlabel("Número de empleados", fontsize=14, color='white')
-plt.ylabel("Ventas mensuales (Millones)", fontsize=14, color='white')
-plt.xticks(color='white')
-plt.yticks(color='white')
-plt.grid(True, alpha=0.2, color='gray')
-plt.tight_layout()
-plt.savefig("grafico_dispersion_mejorado.png", dpi=300, bbox_inches='tight', facecolor='#0a0a0a')
-plt.show()
+# 4. GRÁFICO DE BARRAS HORIZONTAL
+def grafico_barras(df, num=None):
+    plt.figure(num, figsize=(12, 8))
+    plt.gca().set_facecolor('#0d1117')
 
-# GRÁFICO DE CORRELACIÓN MODERNO
-plt.figure(figsize=(12, 10))
+    top_municipios = df['Municipio'].value_counts().nlargest(10)
+
+
+    bars = plt.barh(range(len(top_municipios)), top_municipios.values,
+                    color=colores_gradiente[:len(top_municipios)],
+                    edgecolor='white', linewidth=1.5, alpha=0.9)
 
-# Seleccionar solo columnas numéricas
-numeric_cols = df.select_dtypes(include=[np.number]).columns
-correlation_matrix = df[numeric_cols].corr()
 
+    for i, bar in enumerate(bars):
+        bar.set_alpha(0.8)
+        # Agregar valor al final de cada barra
+        plt.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2,
+                 f'{int(bar.get_width())}', ha='left', va='center',
+                 color='white', fontweight='bold', fontsize=10)
 
-mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
-sns.heatmap(correlation_matrix, mask=mask, annot=True, cmap='coolwarm', 
-            center=0, square=True, linewidths=0.5, cbar_kws={"shrink": .8},
-            fmt='.2f', annot_kws={'size': 10, 'weight': 'bold'})
+    plt.yticks(range(len(top_municipios)), top_municipios.index, color='white', fontsize=11)
+    plt.xticks(color='white')
+    plt.title(" Top 10 Municipios con Más Empresas", fontsize=18, fontweight='bold', color='white', pad=20)
+    plt.xlabel("Número de empresas", fontsize=14, color='white')
+    plt.ylabel("Municipio", fontsize=14, color='white')
+    plt.grid(True, alpha=0.2, axis='x', color='gray')
+    plt.tight_layout()
 
-plt.title("Matriz de Correlación - Variables Numéricas", fontsize=18, fontweight='bold', pad=20)
-plt.xticks(rotation=45, ha='right')
-plt.yticks(rotation=0)
-plt.tight_layout()
-plt.savefig("matriz_correlacion.png", dpi=300, bbox_inches='tight')
-plt.show()
 
+# 5. GRÁFICO DE DISPERSIÓN
+def grafico_dispersion(df, num=None):
+    plt.figure(num, figsize=(14, 9))
+    plt.gca().set_facecolor('#0a0a0a')
+
+
+    scatter = sns.scatterplot(data=df, x="Numero empleados", y="Ventas mensuales (Millones)",
+                             hue="SectorProductivo", size="Ventas mensuales (Millones)",
+                             sizes=(50, 400), alpha=0.8, palette='Set1', edgecolor='white', linewidth=0.5)
+
+
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left', frameon=True,
+               facecolor='#1a1a1a', edgecolor='white')
+    for text in plt.gca().get_legend().get_texts():
+        text.set_color('white')
+
+    plt.title("Empleados vs Ventas Mensuales por Sector", fontsize=18, fontweight='bold', color='white', pad=20)
+    plt.xlabel("Número de empleados", fontsize=14, color='white')
+    plt.ylabel("Ventas mensuales (Millones)", fontsize=14, color='white')
+    plt.xticks(color='white')
+    plt.yticks(color='white')
+    plt.grid(True, alpha=0.2, color='gray')
+    plt.tight_layout()
+
+
+# GRÁFICO DE CORRELACIÓN MODERNO
+def grafico_correlacion(df, num=None):
+    plt.figure(num, figsize=(12, 10))
+
+    # Seleccionar solo columnas numéricas
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    correlation_matrix = matriz(correlacion(momentos(df[numeric_cols].to_numpy(float))), numeric_cols)
+
+
+    mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
+    sns.heatmap(correlation_matrix, mask=mask, annot=True, cmap='coolwarm',
+                center=0, square=True, linewidths=0.5, cbar_kws={"shrink": .8},
+                fmt='.2f', annot_kws={'size': 10, 'weight': 'bold'})
+
+    plt.title("Matriz de Correlación - Variables Numéricas", fontsize=18, fontweight='bold', pad=20)
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+
+
+# Nombre del archivo -> (función, columnas que usa, color de fondo al guardar).
+# Columnas None: todas las numéricas
+GRAFICOS = {
+    'grafico_histograma_mejorado': (grafico_histograma, ['Ventas mensuales (Millones)'], '#1a1a1a'),
+    'grafico_caja_mejorado': (grafico_caja, ['SectorProductivo', 'Ventas mensuales (Millones)'], '#0f0f0f'),
+    'grafico_pastel_mejorado': (grafico_pastel, ['Genero responsable'], '#1a1a1a'),
+    'grafico_barras_mejorado': (grafico_barras, ['Municipio'], '#0d1117'),
+    'grafico_dispersion_mejorado': (grafico_dispersion,
+                                    ['Numero empleados', 'Ventas mensuales (Millones)', 'SectorProductivo'], '#0a0a0a'),
+    'matriz_correlacion': (grafico_correlacion, None, None),
+}
+
+
+def datos_grafico(df, nombre):
+    _, columnas, _ = GRAFICOS[nombre]
+    if columnas is None:
+        return df.select_dtypes(include=[np.number])
+    return df[columnas]
+
+
+def guardar(nombre, ruta):
+    _, _, fondo = GRAFICOS[nombre]
+    opciones = {'dpi': DPI, 'bbox_inches': 'tight'}
+    if fondo is not None:
+        opciones['facecolor'] = fondo
+    plt.savefig(ruta, **opciones)
+
+
+def huella_grafico(nombre, datos, formato):
+    # Cambia si cambian los datos que usa el gráfico, su código o la configuración de estilo
+    funcion, _, fondo = GRAFICOS[nombre]
+    sha = hashlib.sha256()
+    sha.update(pd.util.hash_pandas_object(datos, index=False).to_numpy().tobytes())
+    sha.update(json.dumps([list(map(str, datos.columns)), list(map(str, datos.dtypes))]).encode())
+    sha.update(inspect.getsource(funcion).encode())
+    sha.update(json.dumps([ESTILO, PALETA, DPI, ANCHO_BANDA_KDE, fondo, formato, colores_gradiente, colores_neon]).encode())
+    return sha.hexdigest()
+
+
+def renderizar(nombre, datos, salida, formatos):
+    # Se ejecuta en un proceso del pool con el backend Agg (sin ventanas)
+    inicio = time.perf_counter()
+    aplicar_estilo()
+    funcion, _, _ = GRAFICOS[nombre]
+    funcion(datos)
+    for formato in formatos:
+        guardar(nombre, os.path.join(salida, f"{nombre}.{formato}"))
+    plt.close('all')
+    return time.perf_counter() - inicio
+
+
+def _leer_manifiesto(salida, archivo=MANIFIESTO):
+    try:
+        with open(os.path.join(salida, archivo), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_manifiesto(salida, manifiesto, archivo=MANIFIESTO):
+    ruta = os.path.join(salida, archivo)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True)
+    os.replace(temporal, ruta)
+
+
+def renderizar_lote(df, salida=".", formatos=("png",), procesos=None, forzar=False):
+    # Modo por lotes: sin ventanas, un gráfico por proceso y sin volver a generar los
+    # archivos cuyos datos y estilo no cambiaron desde la última corrida
+    plt.switch_backend('Agg')
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = _leer_manifiesto(salida)
+    inicio = time.perf_counter()
+
+    pendientes = {}
+    for nombre in GRAFICOS:
+        datos = datos_grafico(df, nombre)
+        huellas = {formato: huella_grafico(nombre, datos, formato) for formato in formatos}
+        faltan = [formato for formato in formatos
+                  if forzar
+                  or manifiesto.get(f"{nombre}.{formato}") != huellas[formato]
+                  or not os.path.exists(os.path.join(salida, f"{nombre}.{formato}"))]
+        if faltan:
+            pendientes[nombre] = (datos, faltan, huellas)
+        else:
+            print(f" {nombre}: sin cambios, se omite")
+
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos or min(len(pendientes), os.cpu_count())) as pool:
+            futuros = {pool.submit(renderizar, nombre, datos, salida, faltan): nombre
+                       for nombre, (datos, faltan, _) in pendientes.items()}
+            for futuro in as_completed(futuros):
+                nombre = futuros[futuro]
+                _, faltan, huellas = pendientes[nombre]
+                try:
+                    segundos = futuro.result()
+                except Exception as e:
+                    print(f" {nombre}: error - {type(e).__name__}: {e}")
+                    continue
+                for formato in faltan:
+                    manifiesto[f"{nombre}.{formato}"] = huellas[formato]
+                print(f" {nombre} ({', '.join(faltan)}): {segundos:.1f} s")
+        _guardar_manifiesto(salida, manifiesto)
+
+    print(f" Gráficos listos en {salida} ({len(pendientes)} generados, "
+          f"{len(GRAFICOS) - len(pendientes)} sin cambios) en {time.perf_counter() - inicio:.1f} s")
+
+
+def _carpeta_grupo(valor):
+    return re.sub(r'[\\/:*?"<>|]', '_', str(valor)).strip() or "_"
+
+
+def huella_reporte(datos, formatos):
+    sha = hashlib.sha256()
+    sha.update(pd.util.hash_pandas_object(datos, index=False).to_numpy().tobytes())
+    sha.update(json.dumps([list(map(str, datos.columns)), list(map(str, datos.dtypes))]).encode())
+    for nombre in GRAFICOS_REPORTE:
+        sha.update(inspect.getsource(GRAFICOS[nombre][0]).encode())
+    sha.update(json.dumps([ESTILO, PALETA, DPI, ANCHO_BANDA_KDE, sorted(formatos),
+                           colores_gradiente, colores_neon]).encode())
+    return sha.hexdigest()
+
+
+def _limpiar_figura(figura):
+    # clf() no devuelve los márgenes que dejó tight_layout(); sin esto el siguiente
+    # gráfico partiría de otros márgenes y no saldría igual que en una figura nueva
+    figura.clf()
+    figura.subplots_adjust(**{parametro: plt.rcParams[f'figure.subplot.{parametro}']
+                              for parametro in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+
+
+def renderizar_reporte(datos, carpeta, formatos):
+    # Se ejecuta en un proceso del pool. Cada gráfico usa siempre la misma figura del
+    # proceso (identificada por su nombre), que se limpia en lugar de crear otra
+    inicio = time.perf_counter()
+    aplicar_estilo()
+    os.makedirs(carpeta, exist_ok=True)
+    for nombre in GRAFICOS_REPORTE:
+        if plt.fignum_exists(nombre):
+            _limpiar_figura(plt.figure(nombre))
+        GRAFICOS[nombre][0](datos, num=nombre)
+        for formato in formatos:
+            guardar(nombre, os.path.join(carpeta, f"{nombre}.{formato}"))
+    return time.perf_counter() - inicio
+
+
+def reportes_por_grupo(df, salida="reportes", formatos=("png",), procesos=None, forzar=False,
+                       dimensiones=DIMENSIONES_REPORTE):
+    # Un reporte (juego de gráficos) por cada sector y cada municipio. Los grupos salen
+    # de un único groupby por dimensión, sin volver a filtrar el DataFrame por grupo, y
+    # los que no cambiaron desde la última corrida se omiten
+    plt.switch_backend('Agg')
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = _leer_manifiesto(salida, MANIFIESTO_REPORTES)
+    inicio = time.perf_counter()
+
+    columnas = sorted({columna for nombre in GRAFICOS_REPORTE for columna in GRAFICOS[nombre][1]})
+    pendientes = {}
+    omitidos = 0
+    for dimension in dimensiones:
+        for valor, datos in df[columnas].groupby(df[dimension], sort=True, observed=True):
+            clave = f"{dimension}/{_carpeta_grupo(valor)}"
+            carpeta = os.path.join(salida, dimension, _carpeta_grupo(valor))
+            huella = huella_reporte(datos, formatos)
+            completo = all(os.path.exists(os.path.join(carpeta, f"{nombre}.{formato}"))
+                           for nombre in GRAFICOS_REPORTE for formato in formatos)
+            if not forzar and completo and manifiesto.get(clave) == huella:
+                omitidos += 1
+            else:
+                pendientes[clave] = (datos, carpeta, huella)
+
+    errores = 0
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+            futuros = {pool.submit(renderizar_reporte, datos, carpeta, formatos): clave
+                       for clave, (datos, carpeta, _) in pendientes.items()}
+            for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                clave = futuros[futuro]
+                try:
+                    segundos = futuro.result()
+                except Exception as e:
+                    errores += 1
+                    print(f" [{hechos}/{len(pendientes)}] {clave}: error - {type(e).__name__}: {e}")
+                    continue
+                manifiesto[clave] = pendientes[clave][2]
+                print(f" [{hechos}/{len(pendientes)}] {clave}: {segundos:.1f} s")
+        _guardar_manifiesto(salida, manifiesto, MANIFIESTO_REPORTES)
+
+    print(f" Reportes listos en {salida}: {len(pendientes) - errores} generados, {omitidos} sin cambios, "
+          f"{errores} con error, en {time.perf_counter() - inicio:.1f} s")
+    return errores
+
+
+def mostrar_todos(df):
+    # Modo interactivo original: cada gráfico se guarda en PNG y se muestra en pantalla
+    aplicar_estilo()
+    for nombre, (funcion, _, _) in GRAFICOS.items():
+        funcion(df)
+        guardar(nombre, f"{nombre}.png")
+        plt.show()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gráficos de las empresas de Boyacá")
+    parser.add_argument('--entrada', default=ARCHIVO_LIMPIO, help="Archivo limpio")
+    parser.add_argument('--lote', action='store_true',
+                        help="Generar los gráficos sin ventanas, en paralelo y omitiendo los que no cambiaron")
+    parser.add_argument('--salida', help="Carpeta de salida (por defecto '.' en modo por lotes y 'reportes' por grupo)")
+    parser.add_argument('--formatos', default="png", help="Formatos separados por comas: png, svg, webp")
+    parser.add_argument('--procesos', type=int, help="Procesos del modo por lotes (por defecto, uno por gráfico)")
+    parser.add_argument('--forzar', action='store_true', help="Volver a generar todos los gráficos")
+    parser.add_argument('--por-grupo', action='store_true',
+                        help="Generar un reporte por cada sector y municipio (en --salida, por defecto 'reportes')")
+    args = parser.parse_args()
+
+    # Cargar el archivo limpio
+    df = pd.read_excel(args.entrada)
+
+    if args.por_grupo:
+        formatos = [formato.strip().lower() for formato in args.formatos.split(',') if formato.strip()]
+        errores = reportes_por_grupo(df, args.salida or "reportes", formatos, args.procesos, args.forzar)
+        raise SystemExit(1 if errores else 0)
+    elif args.lote:
+        formatos = [formato.strip().lower() for formato in args.formatos.split(',') if formato.strip()]
+        renderizar_lote(df, args.salida or ".", formatos, args.procesos, args.forzar)
+    else:
+        mostrar_todos(df)
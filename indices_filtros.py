@@ -0,0 +1,102 @@
+import numpy as np
+
+# Índice invertido sobre las columnas de los filtros: para cada sector y cada
+# municipio se guarda un bitmap (un bit por fila) calculado una sola vez al cargar
+# los datos. Filtrar pasa a ser una unión/intersección de bitmaps, sin copiar el
+# DataFrame ni comparar la columna completa en cada callback.
+# Las ventas se indexan aparte con una permutación ordenada, así el rango del
+# slider se resuelve con dos búsquedas binarias.
+
+COLUMNAS_INDEXADAS = ['SectorProductivo', 'Municipio']
+VENTAS = 'Ventas mensuales (Millones)'
+
+
+def _bitmaps_columna(columna):
+    codigos, valores = columna.factorize()
+    bitmaps = {}
+    for codigo, valor in enumerate(valores):
+        bitmaps[valor] = np.packbits(codigos == codigo)
+    return bitmaps
+
+
+def _indice_ventas(ventas):
+    valores = ventas.to_numpy(dtype=float)
+    con_ventas = np.flatnonzero(~np.isnan(valores))
+    orden = con_ventas[np.argsort(valores[con_ventas], kind='stable')]
+
+    # Posición de cada fila dentro del orden; las filas sin ventas quedan al final
+    # y nunca caen dentro de un rango
+    rangos = np.full(len(valores), len(orden), dtype=np.int64)
+    rangos[orden] = np.arange(len(orden))
+
+    return {
+        'orden': orden,
+        'valores': valores[orden],
+        'rangos': rangos,
+    }
+
+
+def construir_indice(df, columnas=COLUMNAS_INDEXADAS):
+    return {
+        'filas': len(df),
+        'columnas': {columna: _bitmaps_columna(df[columna]) for columna in columnas},
+        'ventas': _indice_ventas(df[VENTAS]),
+    }
+
+
+def _bitmap_vacio(indice):
+    return np.zeros((indice['filas'] + 7) // 8, dtype=np.uint8)
+
+
+def bitmap_valores(indice, columna, valores):
+    # Unión de los bitmaps de varios valores (por ejemplo, varios municipios)
+    bitmaps = indice['columnas'][columna]
+    resultado = _bitmap_vacio(indice)
+    for valor in valores:
+        if valor in bitmaps:
+            np.bitwise_or(resultado, bitmaps[valor], out=resultado)
+    return resultado
+
+
+def limites_ventas(indice, minimo, maximo):
+    # Tramo [inicio, fin) del orden por ventas con minimo <= ventas <= maximo
+    valores = indice['ventas']['valores']
+    inicio = np.searchsorted(valores, minimo, side='left')
+    fin = np.searchsorted(valores, maximo, side='right')
+    return int(inicio), int(max(inicio, fin))
+
+
+def mascara_ventas(indice, inicio, fin):
+    # Máscara de las filas dentro del tramo [inicio, fin) del orden por ventas. Se arma en
+    # cada llamada, sin estado compartido entre peticiones ni locks
+    mascara = np.zeros(indice['filas'], dtype=bool)
+    mascara[indice['ventas']['orden'][inicio:fin]] = True
+    return mascara
+
+
+def filas_seleccionadas(indice, sector=None, municipios=None, ventas_range=None):
+    # Devuelve las posiciones (en orden original) de las filas que cumplen los filtros,
+    # o None si no hay filtro y sirven todas las filas
+    seleccion = None
+
+    if sector:
+        seleccion = bitmap_valores(indice, 'SectorProductivo', [sector])
+
+    if municipios:
+        bitmap = bitmap_valores(indice, 'Municipio', municipios)
+        seleccion = bitmap if seleccion is None else np.bitwise_and(seleccion, bitmap, out=bitmap)
+
+    if not ventas_range:
+        if seleccion is None:
+            return None
+        return np.flatnonzero(np.unpackbits(seleccion, count=indice['filas']))
+
+    inicio, fin = limites_ventas(indice, ventas_range[0], ventas_range[1])
+
+    if seleccion is None:
+        return np.flatnonzero(mascara_ventas(indice, inicio, fin))
+
+    # Con filtros categóricos basta revisar la posición en el orden de las filas ya elegidas
+    posiciones = np.flatnonzero(np.unpackbits(seleccion, count=indice['filas']))
+    rangos = indice['ventas']['rangos'][posiciones]
+    return posiciones[(rangos >= inicio) & (rangos < fin)]
@@ -1,19 +1,395 @@
+import argparse
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import numpy as np
 
+from reglas_limpieza import REGLAS, aplicar_reglas, reporte_tiempos
+
 # Archivo de Excel con los datos originales
 archivo = "PROYECTO BOYACÁ EMPRESAS.xlsx"
+hoja = 'Datos_Empresas_Boyaca_2022_ENRI'
+archivo_limpio = "PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx"
+
+# Filas por bloque en el modo por bloques
+FILAS_POR_BLOQUE = 50000
+
+# Cambiar este número cuando cambien las reglas de limpieza (o la huella de las filas):
+# el modo incremental vuelve entonces a limpiar todas las filas
+VERSION_LIMPIEZA = 3
+
+# Almacén particionado del modo por lotes: <directorio>/departamento=X/anio=Y/<archivo>.parquet
+DIRECTORIO_LOTES = "datos_limpios"
+DEPARTAMENTO = "Boyaca"
+
+
+def limpiar(df, tiempos=None):
+    # Limpiar datos según las reglas de reglas_limpieza.REGLAS
+    return aplicar_reglas(df, REGLAS, tiempos)
+
+
+def _enteros(df):
+    # openpyxl en modo lectura devuelve los enteros como float (1.0); read_excel los
+    # convierte a int, así que se hace lo mismo para que ambos modos den los mismos tipos
+    for columna in df.select_dtypes(include='float').columns:
+        valores = df[columna].dropna()
+        if len(valores) and (valores == np.floor(valores)).all():
+            df[columna] = df[columna].astype('Int64')
+    return df
+
+
+def leer_excel_por_bloques(ruta, hoja, filas_por_bloque=FILAS_POR_BLOQUE):
+    # Lectura fila a fila en modo solo lectura: en memoria solo hay un bloque a la vez
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro[hoja].iter_rows(values_only=True)
+        encabezado = next(filas)
+        bloque = []
+        for fila in filas:
+            if all(valor is None for valor in fila):
+                continue
+            bloque.append(fila)
+            if len(bloque) == filas_por_bloque:
+                yield _enteros(pd.DataFrame.from_records(bloque, columns=encabezado))
+                bloque = []
+        if bloque:
+            yield _enteros(pd.DataFrame.from_records(bloque, columns=encabezado))
+    finally:
+        libro.close()
+
+
+def leer_por_bloques(ruta, hoja=hoja, filas_por_bloque=FILAS_POR_BLOQUE):
+    if ruta.lower().endswith('.csv'):
+        return pd.read_csv(ruta, chunksize=filas_por_bloque)
+    return leer_excel_por_bloques(ruta, hoja, filas_por_bloque)
+
+
+def _tipo_comun(a, b):
+    # Tipo que admite los valores de dos bloques: una columna vacía no dice nada, enteros
+    # con decimales dan float64 y cualquier otra mezcla (número y texto) queda como texto
+    import pyarrow as pa
+
+    if pa.types.is_null(b) or a == b:
+        return a
+    if pa.types.is_null(a):
+        return b
+    if pa.types.is_integer(a) and pa.types.is_integer(b):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (a, b)):
+        return pa.float64()
+    return pa.string()
+
+
+def _tabla_bloque(bloque):
+    # Las columnas sin ningún dato en el bloque van como nulas (read_csv las lee como
+    # float64) para que no fijen el tipo de la columna
+    import pyarrow as pa
+
+    tabla = pa.Table.from_pandas(bloque, preserve_index=False).replace_schema_metadata()
+    for i, columna in enumerate(bloque.columns):
+        if bloque[columna].isna().all():
+            tabla = tabla.set_column(i, tabla.field(i).name, pa.nulls(len(tabla)))
+    return tabla
+
+
+def limpiar_por_bloques(ruta, salida, hoja=hoja, filas_por_bloque=FILAS_POR_BLOQUE, tiempos=None):
+    # Modo por bloques: cada bloque se limpia y se guarda aparte, así la memoria no crece
+    # con el tamaño del archivo de origen. Los tipos de un bloque no dicen los del
+    # siguiente ('10' y luego '12.5', una columna vacía y luego con texto), así que el
+    # esquema de salida se arma con todos los bloques y al final cada uno se añade,
+    # convertido a ese esquema, como un row group del Parquet de salida
+    import shutil
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    temporal = f"{salida}.{os.getpid()}.tmp"
+    directorio = f"{salida}.{os.getpid()}.bloques"
+    os.makedirs(directorio, exist_ok=True)
+    partes = []
+    tipos = {}
+    filas = 0
+    try:
+        for bloque in leer_por_bloques(ruta, hoja, filas_por_bloque):
+            tabla = _tabla_bloque(limpiar(bloque, tiempos))
+            for campo in tabla.schema:
+                tipos[campo.name] = _tipo_comun(tipos.get(campo.name, pa.null()), campo.type)
+            partes.append(os.path.join(directorio, f"{len(partes):06d}.parquet"))
+            pq.write_table(tabla, partes[-1])
+            filas += tabla.num_rows
+
+        if partes:
+            # Una columna que no tuvo datos en ningún bloque se guarda como texto
+            esquema = pa.schema([(nombre, pa.string() if pa.types.is_null(tipo) else tipo)
+                                 for nombre, tipo in tipos.items()])
+            with pq.ParquetWriter(temporal, esquema) as escritor:
+                for parte in partes:
+                    escritor.write_table(pq.read_table(parte).cast(esquema))
+            os.replace(temporal, salida)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return filas
+
+
+def _hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def ruta_manifiesto(almacen):
+    return os.path.splitext(almacen)[0] + ".manifiesto.parquet"
+
+
+def leer_manifiesto(almacen):
+    # Huella de cada fila de origen (por clave) en la corrida anterior, o None si no
+    # hay corrida anterior válida y hay que limpiar todo
+    import pyarrow.parquet as pq
+
+    ruta = ruta_manifiesto(almacen)
+    if not (os.path.exists(almacen) and os.path.exists(ruta)):
+        return None
+
+    tabla = pq.read_table(ruta)
+    metadatos = tabla.schema.metadata or {}
+    if metadatos.get(b'version_limpieza') != str(VERSION_LIMPIEZA).encode():
+        return None
+
+    manifiesto = tabla.to_pandas()
+    return {
+        'claves': pd.Index(manifiesto['clave']),
+        'huellas': manifiesto['huella'].to_numpy(),
+        'origen': metadatos.get(b'sha256_origen', b'').decode(),
+    }
+
+
+def _escribir_parquet(tabla, ruta):
+    import pyarrow.parquet as pq
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(tabla, temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def huellas_filas(bloque):
+    # La huella no puede depender del tipo que se infirió para cada bloque: según las demás
+    # filas del bloque, el mismo valor llega como 12 (int), 12.0 (float) o '12.0' (texto).
+    # Cada valor se lleva a un texto canónico: los números como float y el resto como texto
+    canonico = {}
+    for columna in bloque.columns:
+        valores = bloque[columna]
+        numeros = pd.to_numeric(valores, errors='coerce') if valores.dtype == object else valores
+        if pd.api.types.is_numeric_dtype(numeros) and not pd.api.types.is_bool_dtype(numeros):
+            numeros = numeros.astype(float)
+            texto = np.where(numeros.notna(), numeros.map(repr), valores.astype(str))
+        else:
+            texto = valores.astype(str).to_numpy()
+        canonico[columna] = np.where(valores.isna(), '', texto)
+    return pd.util.hash_pandas_object(pd.DataFrame(canonico), index=False).to_numpy()
+
+
+def limpiar_incremental(ruta, almacen, hoja=hoja, clave='ID', filas_por_bloque=FILAS_POR_BLOQUE):
+    # Modo incremental: cada fila de origen se identifica por su clave y una huella de
+    # su contenido. Solo se limpian las filas nuevas o modificadas, y se mezclan con
+    # las ya limpias del almacén (Parquet) de la corrida anterior
+    import pyarrow as pa
+
+    anterior = leer_manifiesto(almacen)
+    sha_origen = _hash_archivo(ruta)
+    if anterior is not None and anterior['origen'] == sha_origen:
+        return {'filas': len(anterior['claves']), 'limpiadas': 0, 'eliminadas': 0}
+
+    claves, huellas, limpias = [], [], []
+    for bloque in leer_por_bloques(ruta, hoja, filas_por_bloque):
+        huellas_bloque = huellas_filas(bloque)
+        claves_bloque = bloque[clave].to_numpy()
+
+        if anterior is None:
+            cambiadas = np.ones(len(bloque), dtype=bool)
+        else:
+            posiciones = anterior['claves'].get_indexer(claves_bloque)
+            cambiadas = (posiciones == -1) | (anterior['huellas'][posiciones] != huellas_bloque)
+
+        if cambiadas.any():
+            limpias.append(limpiar(bloque[cambiadas].copy()))
+        claves.append(claves_bloque)
+        huellas.append(huellas_bloque)
+
+    claves = pd.Index(np.concatenate(claves) if claves else [])
+    huellas = np.concatenate(huellas) if huellas else np.array([], dtype=np.uint64)
+    if claves.has_duplicates:
+        raise ValueError(f"La columna {clave} tiene valores repetidos; no sirve como clave del modo incremental")
+
+    limpiadas = sum(len(bloque) for bloque in limpias)
+    partes = limpias
+    eliminadas = 0
+    if anterior is not None:
+        existentes = pd.read_parquet(almacen)
+        eliminadas = int((~existentes[clave].isin(claves)).sum())
+        cambiadas = pd.concat([bloque[clave] for bloque in limpias]) if limpias else []
+        vigentes = existentes[existentes[clave].isin(claves) & ~existentes[clave].isin(cambiadas)]
+        partes = [vigentes] + limpias
+
+    # También se reescribe si solo cambió el orden de las filas en el origen
+    if limpiadas or eliminadas or anterior is None or not claves.equals(anterior['claves']):
+        resultado = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+        if len(resultado):
+            # Mismo orden de filas que el archivo de origen
+            resultado = resultado.set_index(clave, drop=False).loc[claves].reset_index(drop=True)
+        _escribir_parquet(pa.Table.from_pandas(resultado, preserve_index=False), almacen)
+
+    manifiesto = pa.table({'clave': claves.to_numpy(), 'huella': huellas}).replace_schema_metadata({
+        'version_limpieza': str(VERSION_LIMPIEZA),
+        'sha256_origen': sha_origen,
+    })
+    _escribir_parquet(manifiesto, ruta_manifiesto(almacen))
+
+    return {'filas': len(claves), 'limpiadas': limpiadas, 'eliminadas': eliminadas}
+
+
+def _valor_particion(valor):
+    if pd.isna(valor):
+        return "desconocido"
+    return str(valor).replace('/', '-').replace('=', '-')
+
+
+def limpiar_para_lote(ruta, hoja, directorio, departamento):
+    # Se ejecuta en un proceso del pool: limpia una hoja de un archivo y la reparte
+    # por departamento y año. Devuelve (filas, segundos) o el error como texto
+    inicio = time.perf_counter()
+    try:
+        if ruta.lower().endswith('.csv'):
+            df = pd.read_csv(ruta)
+        else:
+            df = pd.read_excel(ruta, sheet_name=hoja)
+        df = limpiar(df)
+
+        import pyarrow as pa
+
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+        if not ruta.lower().endswith('.csv'):
+            nombre = f"{nombre}-{hoja}"
+        nombre = _valor_particion(nombre) + ".parquet"
+
+        # Una nueva corrida del mismo archivo reemplaza lo que dejó la anterior
+        for viejo in glob.glob(os.path.join(glob.escape(directorio), '*', '*', glob.escape(nombre))):
+            os.remove(viejo)
+
+        departamentos = df['Departamento'] if 'Departamento' in df.columns else pd.Series(departamento, index=df.index)
+        anios = df['Año'] if 'Año' in df.columns else pd.Series(np.nan, index=df.index)
+        for (dpto, anio), parte in df.groupby([departamentos, anios], dropna=False, sort=False):
+            carpeta = os.path.join(directorio, f"departamento={_valor_particion(dpto)}",
+                                   f"anio={_valor_particion(anio)}")
+            os.makedirs(carpeta, exist_ok=True)
+            _escribir_parquet(pa.Table.from_pandas(parte, preserve_index=False), os.path.join(carpeta, nombre))
+
+        return len(df), time.perf_counter() - inicio, None
+    except Exception as e:
+        return 0, time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+
+
+def tareas_lote(patrones, hoja=hoja, todas_las_hojas=False):
+    # Una tarea por cada (archivo, hoja); los patrones admiten comodines
+    tareas = []
+    for patron in patrones:
+        rutas = sorted(glob.glob(patron)) or [patron]
+        for ruta in rutas:
+            if todas_las_hojas and not ruta.lower().endswith('.csv'):
+                from openpyxl import load_workbook
+
+                libro = load_workbook(ruta, read_only=True)
+                tareas.extend((ruta, nombre) for nombre in libro.sheetnames)
+                libro.close()
+            else:
+                tareas.append((ruta, hoja))
+    return tareas
+
+
+def limpiar_lote(tareas, directorio=DIRECTORIO_LOTES, departamento=DEPARTAMENTO, procesos=None):
+    # Cada hoja se limpia en un proceso distinto: leer Excel es lento y de un solo núcleo
+    inicio = time.perf_counter()
+    total_filas, errores = 0, 0
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        futuros = {pool.submit(limpiar_para_lote, ruta, nombre_hoja, directorio, departamento): (ruta, nombre_hoja)
+                   for ruta, nombre_hoja in tareas}
+        for hechas, futuro in enumerate(as_completed(futuros), start=1):
+            ruta, nombre_hoja = futuros[futuro]
+            filas, segundos, error = futuro.result()
+            if error:
+                errores += 1
+                print(f" [{hechas}/{len(tareas)}] {ruta} ({nombre_hoja}): error tras {segundos:.1f} s - {error}")
+            else:
+                total_filas += filas
+                print(f" [{hechas}/{len(tareas)}] {ruta} ({nombre_hoja}): {filas} filas en {segundos:.1f} s")
+
+    print(f" Lote completado: {len(tareas) - errores} de {len(tareas)} hojas, {total_filas} filas "
+          f"en {time.perf_counter() - inicio:.1f} s")
+    return total_filas, errores
+
+
+def limpiar_archivo(ruta=archivo, salida=archivo_limpio, hoja=hoja, tiempos=None):
+    # Cargar la hoja con los datos
+    df = pd.read_excel(ruta, sheet_name=hoja)
+    df = limpiar(df, tiempos)
+
+    # Guardar archivo limpio
+    df.to_excel(salida, index=False)
+    return len(df)
+
 
-# Cargar la hoja con los datos
-df = pd.read_excel(archivo, sheet_name='Datos_Empresas_Boyaca_2022_ENRI')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Limpieza de los datos de empresas de Boyacá")
+    parser.add_argument('--entrada', default=archivo, help="Archivo de origen (.xlsx o .csv)")
+    parser.add_argument('--hoja', default=hoja, help="Hoja del Excel con los datos")
+    parser.add_argument('--salida', help="Archivo limpio (.xlsx, o .parquet en modo por bloques)")
+    parser.add_argument('--por-bloques', action='store_true',
+                        help="Leer y limpiar por bloques, con memoria acotada, y escribir Parquet")
+    parser.add_argument('--filas-por-bloque', type=int, default=FILAS_POR_BLOQUE)
+    parser.add_argument('--incremental', action='store_true',
+                        help="Limpiar solo las filas nuevas o modificadas desde la última corrida (salida Parquet)")
+    parser.add_argument('--clave', default='ID', help="Columna que identifica a cada empresa en el modo incremental")
+    parser.add_argument('--lote', nargs='+', metavar='ARCHIVO',
+                        help="Limpiar varios archivos (admite comodines) en paralelo hacia un almacén particionado")
+    parser.add_argument('--todas-las-hojas', action='store_true', help="En modo lote, limpiar todas las hojas de cada Excel")
+    parser.add_argument('--procesos', type=int, help="Procesos del modo lote (por defecto, uno por núcleo)")
+    parser.add_argument('--directorio-salida', default=DIRECTORIO_LOTES, help="Almacén particionado del modo lote")
+    parser.add_argument('--departamento', default=DEPARTAMENTO,
+                        help="Departamento de los archivos sin columna Departamento (modo lote)")
+    parser.add_argument('--tiempos', action='store_true', help="Mostrar el tiempo de cada regla de limpieza")
+    args = parser.parse_args()
+    tiempos = {} if args.tiempos else None
 
-# Limpiar datos
-df['ProductoElaborado'] = df['ProductoElaborado'].replace('Sin datos', np.nan)
-df['ProgramaVinculado'] = df['ProgramaVinculado'].str.replace(';x|', ';', regex=True)
-df['AcompanamientoRecibido'] = df['AcompanamientoRecibido'].fillna('No reportado')
-df['Ventas mensuales (Millones)'] = pd.to_numeric(df['Ventas mensuales (Millones)'], errors='coerce')
+    if args.lote:
+        tareas = tareas_lote(args.lote, args.hoja, args.todas_las_hojas)
+        _, errores = limpiar_lote(tareas, args.directorio_salida, args.departamento, args.procesos)
+        raise SystemExit(1 if errores else 0)
 
-# Guardar archivo limpio
-df.to_excel("PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx", index=False)
+    if args.incremental:
+        salida = args.salida or os.path.splitext(archivo_limpio)[0] + ".parquet"
+        resumen = limpiar_incremental(args.entrada, salida, args.hoja, args.clave, args.filas_por_bloque)
+        filas = resumen['filas']
+        print(f" {resumen['limpiadas']} filas nuevas o modificadas, {resumen['eliminadas']} eliminadas")
+    elif args.por_bloques:
+        salida = args.salida or os.path.splitext(archivo_limpio)[0] + ".parquet"
+        filas = limpiar_por_bloques(args.entrada, salida, args.hoja, args.filas_por_bloque, tiempos)
+    else:
+        salida = args.salida or archivo_limpio
+        filas = limpiar_archivo(args.entrada, salida, args.hoja, tiempos)
 
-print(" Limpieza completada. Archivo guardado como PROYECTO_BOYACA_EMPRESAS_LIMPIO.xlsx")
\ No newline at end of file
+    print(f" Limpieza completada ({filas} filas). Archivo guardado como {salida}")
+    if tiempos:
+        print(" Tiempo por regla:")
+        print(reporte_tiempos(tiempos))
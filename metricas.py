@@ -0,0 +1,362 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Métricas de rendimiento del dashboard en el formato de texto de Prometheus, servidas
+# en /metrics por el servidor Flask de Dash. Se registran el tiempo de cada etapa de
+# los callbacks (filtrado, KPIs, cada figura, tabla), el de cada callback completo, el
+# de la petición entera y el tamaño de la respuesta.
+#
+# Con varios workers de gunicorn cada uno mide en su memoria y escribe sus series en
+# DIRECTORIO_METRICAS (un archivo por pid, cada INTERVALO_ESCRITURA segundos), como el
+# modo multiproceso de prometheus_client. /metrics, lo responda el worker que lo
+# responda, suma sus series en vivo con las escritas por los demás: contadores e
+# histogramas se suman y de los máximos se queda el mayor. Los archivos de workers que
+# terminaron se conservan para que sus conteos no se pierdan; los de procesos que ya no
+# existen se borran al arrancar. Con METRICAS_DIR vacío cada proceso expone solo lo suyo.
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Combinaciones de filtros exactas que se guardan en dashboard_filtros_lentos_segundos
+MAX_FILTROS_LENTOS = 10
+
+RUTA_CALLBACKS = "/_dash-update-component"
+
+DIRECTORIO_METRICAS = os.environ.get("METRICAS_DIR", ".metricas")
+INTERVALO_ESCRITURA = float(os.environ.get("METRICAS_ESCRITURA_SEGUNDOS", 5))
+
+
+def _texto_etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nombre}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _numero(valor):
+    return repr(float(valor)) if valor not in (float('inf'), float('-inf')) else ('+Inf' if valor > 0 else '-Inf')
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas.get(nombre, "")) for nombre in self.etiquetas)
+
+    def _copia(self, valor):
+        return valor
+
+    def _recortar(self, series):
+        return series
+
+    def estado(self):
+        # Series del proceso como lista para JSON, para sumarlas en otro proceso
+        with self._lock:
+            return [[list(clave), self._copia(valor)] for clave, valor in self._series.items()]
+
+    def exponer(self, otros=()):
+        # otros: estados (ver estado()) de otros procesos que se suman a las series propias
+        with self._lock:
+            series = {clave: self._copia(valor) for clave, valor in self._series.items()}
+        for estado in otros:
+            for clave, valor in estado:
+                clave = tuple(clave)
+                series[clave] = self._sumar(series[clave], valor) if clave in series else valor
+
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for clave, valor in sorted(self._recortar(series).items()):
+            lineas.extend(self._lineas(clave, valor))
+        return lineas
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + cantidad
+
+    def _sumar(self, a, b):
+        return a + b
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{_texto_etiquetas(self.etiquetas, clave)} {_numero(valor)}"]
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                # Conteo por bucket (el último es +Inf) y suma de los valores
+                serie = self._series[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][bisect.bisect_left(self.buckets, valor)] += 1
+            serie[1] += valor
+
+    def _copia(self, serie):
+        return [list(serie[0]), serie[1]]
+
+    def _sumar(self, a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1]]
+
+    def _lineas(self, clave, serie):
+        conteos, suma = serie
+        nombres = self.etiquetas + ('le',)
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets + (float('inf'),), conteos):
+            acumulado += conteo
+            lineas.append(f"{self.nombre}_bucket{_texto_etiquetas(nombres, clave + (_numero(limite),))} {acumulado}")
+        lineas.append(f"{self.nombre}_sum{_texto_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+        lineas.append(f"{self.nombre}_count{_texto_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+class Maximos(Metrica):
+    # Gauge con el mayor valor visto para cada clave, solo para las `limite` claves con
+    # los valores más altos: sirve para etiquetas de cardinalidad no acotada (como la
+    # combinación exacta de filtros) sin que el número de series crezca sin fin
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limite=MAX_FILTROS_LENTOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limite = limite
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            if valor <= self._series.get(clave, float('-inf')):
+                return
+            self._series[clave] = valor
+            if len(self._series) > self.limite:
+                del self._series[min(self._series, key=self._series.get)]
+
+    def _sumar(self, a, b):
+        return max(a, b)
+
+    def _recortar(self, series):
+        # Al sumar varios procesos quedan de nuevo solo las `limite` claves más altas
+        return dict(sorted(series.items(), key=lambda item: item[1], reverse=True)[:self.limite])
+
+    def _lineas(self, clave, valor):
+        return [f"{self.nombre}{_texto_etiquetas(self.etiquetas, clave)} {_numero(valor)}"]
+
+
+etapas = Histograma('dashboard_etapa_segundos', "Tiempo de cada etapa de los callbacks",
+                    ('etapa', 'filtros'))
+callbacks = Histograma('dashboard_callback_segundos', "Tiempo de cada callback, incluida la caché de resultados",
+                       ('callback', 'filtros'))
+peticiones = Histograma('dashboard_peticion_segundos', "Tiempo de cada petición de un callback en el servidor",
+                        ('callback',))
+despacho = Histograma('dashboard_despacho_segundos',
+                      "Tiempo de la petición fuera del callback: serialización de la salida y despacho de Dash",
+                      ('callback',))
+respuestas = Histograma('dashboard_respuesta_bytes', "Tamaño de la respuesta de cada callback",
+                        ('callback',), BUCKETS_BYTES)
+estados = Contador('dashboard_peticiones_total', "Peticiones de callbacks por código de estado",
+                   ('callback', 'estado'))
+filtros_lentos = Maximos('dashboard_filtros_lentos_segundos',
+                         f"Mayor tiempo de callback de las {MAX_FILTROS_LENTOS} combinaciones de filtros más lentas",
+                         ('callback', 'filtros'))
+METRICAS = [etapas, callbacks, peticiones, despacho, respuestas, estados, filtros_lentos]
+
+# Callback y tipo de filtros de la petición en curso en este hilo, para etiquetar las etapas
+_contexto = threading.local()
+
+# Se apagan en los procesos hijos de los trabajos en segundo plano: nadie expone lo que
+# midan y los locks de las métricas pueden haber quedado tomados por otro hilo al hacer fork
+_activas = True
+
+
+def desactivar_metricas():
+    global _activas
+    _activas = False
+
+
+def exponer_metricas(metricas=METRICAS, otros=()):
+    # otros: estados de otros procesos, {nombre de la métrica: series}
+    lineas = []
+    for metrica in metricas:
+        lineas.extend(metrica.exponer([estado.get(metrica.nombre, []) for estado in otros]))
+    return "\n".join(lineas) + "\n"
+
+
+class MetricasCompartidas:
+    # Series de cada proceso en `directorio`, para sumarlas en /metrics. Cada proceso las
+    # escribe desde un hilo propio que arranca en su primera petición, como el vigilante
+    # de datos: con gunicorn --preload los hilos del maestro no pasan a los workers
+    def __init__(self, directorio, metricas=METRICAS, intervalo=INTERVALO_ESCRITURA):
+        self.directorio = directorio
+        self.metricas = metricas
+        self.intervalo = intervalo
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        self.descartar_terminados()
+
+    def _ruta(self, pid):
+        return os.path.join(self.directorio, f"{pid}.json")
+
+    def descartar_terminados(self):
+        # Lo que dejaron procesos que ya no existen (por ejemplo, de una ejecución anterior)
+        import psutil
+
+        for ruta in glob.glob(self._ruta("*")):
+            pid = os.path.basename(ruta)[:-len(".json")]
+            if pid.isdigit() and not psutil.pid_exists(int(pid)):
+                os.remove(ruta)
+
+    def escribir(self):
+        ruta = self._ruta(os.getpid())
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({metrica.nombre: metrica.estado() for metrica in self.metricas}, archivo)
+        os.replace(temporal, ruta)
+
+    def _escribir_periodicamente(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.escribir()
+            except OSError as e:
+                print(f"No se pudieron escribir las métricas en {self.directorio}: {e}")
+
+    def arrancar(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    threading.Thread(target=self._escribir_periodicamente, name="metricas", daemon=True).start()
+                    # Al terminar el worker se escribe lo medido desde la última escritura
+                    atexit.register(self.escribir)
+                    self._pid = os.getpid()
+
+    def otros_procesos(self):
+        estados = []
+        for ruta in glob.glob(self._ruta("*")):
+            if ruta == self._ruta(os.getpid()):
+                continue
+            try:
+                with open(ruta, encoding="utf-8") as archivo:
+                    estados.append(json.load(archivo))
+            except (OSError, ValueError) as e:
+                print(f"No se pudieron leer las métricas de {ruta}: {e}")
+        return estados
+
+    def exponer(self):
+        return exponer_metricas(self.metricas, self.otros_procesos())
+
+
+@contextmanager
+def etapa(nombre):
+    if not _activas:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas.observar(time.perf_counter() - inicio, etapa=nombre, filtros=getattr(_contexto, 'filtros', ""))
+
+
+def medir_callback(nombre, tipo_filtros, clave_filtros=None):
+    # Decorador para callbacks cuyos tres primeros argumentos son los filtros.
+    # tipo_filtros(sector, municipios, ventas_range) da una etiqueta de pocos valores
+    # ("sector+municipios"...); clave_filtros, la combinación exacta para los más lentos
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(sector, municipios, ventas_range, *args):
+            if not _activas:
+                return funcion(sector, municipios, ventas_range, *args)
+            _contexto.callback = nombre
+            _contexto.filtros = tipo_filtros(sector, municipios, ventas_range)
+            inicio = time.perf_counter()
+            try:
+                return funcion(sector, municipios, ventas_range, *args)
+            finally:
+                segundos = time.perf_counter() - inicio
+                _contexto.segundos = getattr(_contexto, 'segundos', 0.0) + segundos
+                callbacks.observar(segundos, callback=nombre, filtros=_contexto.filtros)
+                if clave_filtros is not None:
+                    filtros_lentos.observar(segundos, callback=nombre,
+                                            filtros=clave_filtros(sector, municipios, ventas_range))
+        return envoltura
+    return decorador
+
+
+def instrumentar_servidor(server, perfilador=None, ruta="/metrics", directorio=DIRECTORIO_METRICAS):
+    # Mide cada petición de callback en el servidor Flask y publica las métricas en `ruta`,
+    # sumadas las de todos los procesos que escriben en `directorio` (sin él, las propias).
+    # Con un perfilador, las peticiones lentas dejan además un volcado de sus pilas
+    from flask import Response, request
+
+    compartidas = MetricasCompartidas(directorio) if directorio else None
+
+    @server.before_request
+    def _inicio_peticion():
+        if request.path != RUTA_CALLBACKS:
+            return
+        if compartidas is not None:
+            compartidas.arrancar()
+        _contexto.inicio = time.perf_counter()
+        _contexto.callback = None
+        _contexto.filtros = ""
+        _contexto.segundos = 0.0
+        if perfilador is not None:
+            perfilador.iniciar()
+
+    @server.after_request
+    def _fin_peticion(respuesta):
+        if request.path != RUTA_CALLBACKS or getattr(_contexto, 'inicio', None) is None:
+            return respuesta
+        segundos = time.perf_counter() - _contexto.inicio
+        _contexto.inicio = None
+
+        # Los callbacks sin medir_callback se identifican por sus salidas
+        nombre = _contexto.callback
+        if nombre is None:
+            cuerpo = request.get_json(silent=True) or {}
+            nombre = str(cuerpo.get('output', "desconocido"))
+
+        tamano = respuesta.content_length
+        if tamano is None and not respuesta.is_streamed:
+            tamano = len(respuesta.get_data())
+        peticiones.observar(segundos, callback=nombre)
+        despacho.observar(max(segundos - _contexto.segundos, 0.0), callback=nombre)
+        if tamano is not None:
+            respuestas.observar(tamano, callback=nombre)
+        estados.incrementar(callback=nombre, estado=respuesta.status_code)
+        if perfilador is not None:
+            perfilador.terminar(segundos, f"{nombre} {_contexto.filtros}".strip())
+        return respuesta
+
+    @server.route(ruta)
+    def _metricas():
+        texto = compartidas.exponer() if compartidas is not None else exponer_metricas()
+        return Response(texto, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return server
@@ -0,0 +1,95 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+# Perfilador por muestreo para las peticiones lentas. Mientras una petición está en
+# curso, un hilo toma cada INTERVALO_MS la pila del hilo que la atiende; si la petición
+# tarda más de PERFILAR_PETICIONES_LENTAS_MS, las pilas se escriben en DIRECTORIO_PERFILES
+# en formato "collapsed" (una pila por línea, "f1;f2;f3 muestras"), que leen
+# speedscope y flamegraph.pl. Sin la variable de entorno no se muestrea nada.
+
+UMBRAL_MS = os.environ.get("PERFILAR_PETICIONES_LENTAS_MS")
+INTERVALO_MS = float(os.environ.get("PERFILAR_INTERVALO_MS", 5))
+DIRECTORIO_PERFILES = os.environ.get("PERFILES_DIR", "perfiles")
+
+
+def _pila(frame):
+    # Un marco por función (archivo y primera línea), así las muestras de una misma
+    # función se agrupan aunque estén en líneas distintas
+    marcos = []
+    while frame is not None:
+        codigo = frame.f_code
+        marcos.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(marcos))
+
+
+class Perfilador:
+    def __init__(self, umbral_ms, intervalo_ms=INTERVALO_MS, directorio=DIRECTORIO_PERFILES):
+        self.umbral = umbral_ms / 1000
+        self.intervalo = intervalo_ms / 1000
+        self.directorio = directorio
+        self._muestras = {}
+        self._inicios = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        # El hilo de muestreo se arranca en el primer uso de cada proceso, como el
+        # vigilante de datos: con gunicorn --preload no pasa del maestro a los workers
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._muestras.clear()
+                    threading.Thread(target=self._muestrear, name="perfilador", daemon=True).start()
+                    self._pid = os.getpid()
+        hilo = threading.get_ident()
+        with self._lock:
+            self._muestras[hilo] = Counter()
+            self._inicios[hilo] = time.time()
+
+    def terminar(self, segundos, descripcion=""):
+        hilo = threading.get_ident()
+        with self._lock:
+            muestras = self._muestras.pop(hilo, None)
+            inicio = self._inicios.pop(hilo, time.time())
+        if not muestras or segundos < self.umbral:
+            return None
+
+        fecha = time.strftime('%Y%m%d-%H%M%S', time.localtime(inicio))
+        nombre = re.sub(r'[^\w.+-]+', '_', descripcion).strip('_')[:80] or "peticion"
+        ruta = os.path.join(self.directorio, f"{fecha}-{os.getpid()}-{nombre}-{segundos * 1000:.0f}ms.txt")
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(ruta, 'w', encoding='utf-8') as f:
+                for pila, cantidad in muestras.most_common():
+                    f.write(f"{pila} {cantidad}\n")
+        except OSError as e:
+            print(f"No se pudo guardar el perfil de una petición lenta: {e}")
+            return None
+        print(f"Petición lenta ({descripcion}, {segundos * 1000:.0f} ms): perfil en {ruta}")
+        return ruta
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while True:
+            time.sleep(self.intervalo)
+            with self._lock:
+                if not self._muestras:
+                    continue
+                marcos = sys._current_frames()
+                for hilo, muestras in self._muestras.items():
+                    frame = marcos.get(hilo)
+                    if frame is not None and hilo != propio:
+                        muestras[_pila(frame)] += 1
+            del marcos
+
+
+def perfilador_configurado():
+    # Perfilador según el entorno, o None si PERFILAR_PETICIONES_LENTAS_MS no está definida
+    if not UMBRAL_MS:
+        return None
+    return Perfilador(float(UMBRAL_MS))
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+# Recarga en caliente de los datos: un hilo en segundo plano revisa cada cierto
+# tiempo si el archivo limpio cambió y, si es así, prepara los datos nuevos (lectura,
+# cubo, índices) fuera de las peticiones y los publica con una sola asignación.
+# Cada petición toma la versión vigente al empezar y la usa hasta terminar.
+#
+# Cada proceso tiene su propio hilo y prepara los datos nuevos por su cuenta: con
+# varios workers de gunicorn, una recarga cuesta una copia de los datos por worker,
+# que ya no se comparte con el proceso maestro (ver el final de dashboard_empresas).
+
+INTERVALO_REVISION = float(os.environ.get("RECARGA_DATOS_SEGUNDOS", 30))
+
+
+def version_archivo(ruta):
+    # Todos los workers ven el mismo archivo, así que llegan a la misma versión
+    estado = os.stat(ruta)
+    return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+
+def orden_version(version):
+    # Para comparar versiones por fecha de modificación (y tamaño), no como texto
+    return tuple(int(parte) for parte in version.split("-"))
+
+
+class VigilanteDatos:
+    def __init__(self, ruta, preparar, intervalo=INTERVALO_REVISION, al_recargar=None):
+        # preparar(ruta) devuelve un diccionario con los datos listos para las peticiones;
+        # al_recargar(datos), si se da, se llama después de publicar cada versión nueva
+        self.ruta = ruta
+        self.preparar = preparar
+        self.intervalo = intervalo
+        self.al_recargar = al_recargar
+        self.datos = self._construir(version_archivo(ruta))
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _construir(self, version):
+        datos = self.preparar(self.ruta)
+        datos['version'] = version
+        return datos
+
+    def actual(self):
+        # El hilo se arranca en el primer uso de cada proceso: con gunicorn --preload
+        # los hilos del proceso maestro no pasan a los workers al hacer fork. Al armar
+        # el layout en el maestro se lee self.datos directamente, sin arrancarlo
+        if self.intervalo > 0 and self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    threading.Thread(target=self._vigilar, name="vigilante-datos", daemon=True).start()
+                    self._pid = os.getpid()
+        return self.datos
+
+    def sin_revision(self):
+        # Para procesos hijos de vida corta (trabajos en segundo plano): usan los datos
+        # heredados del worker sin arrancar el hilo ni tomar el lock
+        self.intervalo = 0
+
+    def revisar(self):
+        try:
+            version = version_archivo(self.ruta)
+        except OSError as e:
+            # Mientras se reemplaza el archivo puede no existir un instante
+            print(f"No se pudo revisar {self.ruta}: {e}")
+            return False
+        if version == self.datos['version']:
+            return False
+
+        inicio = time.perf_counter()
+        try:
+            nuevos = self._construir(version)
+        except Exception as e:
+            # Se sigue sirviendo la versión anterior y se reintenta en la próxima revisión
+            print(f"No se pudo recargar {self.ruta}: {e}")
+            return False
+
+        self.datos = nuevos
+        print(f"Datos recargados (versión {version}, {len(nuevos['df'])} filas) "
+              f"en {time.perf_counter() - inicio:.1f} s")
+        if self.al_recargar is not None:
+            try:
+                self.al_recargar(nuevos)
+            except Exception as e:
+                print(f"Error después de recargar {self.ruta}: {e}")
+        return True
+
+    def _vigilar(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.revisar()
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Reglas de limpieza declarativas, una entrada por columna. Los pasos se aplican en
+# este orden: normalizar, nulos, separador, rellenar, numerico.
+#   normalizar: quita espacios al inicio y al final y deja uno solo entre palabras
+#   nulos: valores que significan "sin dato" y pasan a NaN
+#   separador / unir_con: parte el texto por el separador literal, limpia cada parte,
+#                         descarta las vacías y las vuelve a unir con unir_con
+#   rellenar: valor para los datos faltantes
+#   numerico: convierte a número; lo que no se puede convertir queda como NaN
+REGLAS = {
+    'ProductoElaborado': {'nulos': ['Sin datos']},
+    'ProgramaVinculado': {'separador': ';x|', 'unir_con': '; '},
+    'AcompanamientoRecibido': {'rellenar': 'No reportado'},
+    'Ventas mensuales (Millones)': {'numerico': True},
+}
+
+PASOS = ('normalizar', 'nulos', 'separador', 'rellenar', 'numerico')
+
+
+def _normalizar(valores, regla):
+    es_texto = valores.map(lambda v: isinstance(v, str))
+    valores = valores.copy()
+    valores[es_texto] = valores[es_texto].str.split().str.join(' ')
+    return valores
+
+
+def _nulos(valores, regla):
+    return valores.mask(valores.isin(regla['nulos']))
+
+
+def _separador(valores, regla):
+    es_texto = valores.map(lambda v: isinstance(v, str))
+    partes = valores[es_texto].str.split(regla['separador'], regex=False)
+    valores = valores.copy()
+    valores[es_texto] = partes.map(
+        lambda lista: regla.get('unir_con', regla['separador']).join(p.strip() for p in lista if p.strip())
+    )
+    return valores
+
+
+def _rellenar(valores, regla):
+    return valores.fillna(regla['rellenar'])
+
+
+def _numerico(valores, regla):
+    return pd.to_numeric(valores, errors='coerce')
+
+
+FUNCIONES = {
+    'normalizar': _normalizar,
+    'nulos': _nulos,
+    'separador': _separador,
+    'rellenar': _rellenar,
+    'numerico': _numerico,
+}
+
+
+def compilar(reglas=REGLAS):
+    # Lista de (columna, [(paso, funcion, regla)]) con solo los pasos que usa cada regla
+    compiladas = []
+    for columna, regla in reglas.items():
+        pasos = [(paso, FUNCIONES[paso], regla) for paso in PASOS if regla.get(paso) not in (None, False)]
+        desconocidos = set(regla) - set(PASOS) - {'unir_con'}
+        if desconocidos:
+            raise ValueError(f"Regla de {columna} con pasos desconocidos: {sorted(desconocidos)}")
+        compiladas.append((columna, pasos))
+    return compiladas
+
+
+def aplicar_columna(serie, pasos, tiempos=None, columna=None):
+    # Todos los pasos trabajan sobre los valores distintos de la columna (como en una
+    # columna categórica): la columna completa se recorre una vez al factorizar y otra
+    # al reconstruirla, sin importar cuántos pasos tenga la regla
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    valores = pd.Series(np.asarray(unicos, dtype=object), dtype=object)
+    faltantes = codigos == -1
+    if faltantes.any():
+        # Los faltantes comparten una posición extra al final para que los pasos los vean
+        codigos = np.where(faltantes, len(valores), codigos)
+        valores = pd.concat([valores, pd.Series([np.nan], dtype=object)], ignore_index=True)
+
+    for paso, funcion, regla in pasos:
+        inicio = time.perf_counter()
+        valores = funcion(valores, regla)
+        if tiempos is not None:
+            clave = (columna, paso)
+            tiempos[clave] = tiempos.get(clave, 0.0) + time.perf_counter() - inicio
+
+    return pd.Series(valores.to_numpy().take(codigos), index=serie.index, name=serie.name)
+
+
+def aplicar_reglas(df, reglas=REGLAS, tiempos=None):
+    # tiempos: diccionario opcional {(columna, paso): segundos} que se va acumulando
+    for columna, pasos in compilar(reglas):
+        df[columna] = aplicar_columna(df[columna], pasos, tiempos, columna)
+    return df
+
+
+def reporte_tiempos(tiempos):
+    lineas = [f"   {columna} / {paso}: {segundos * 1000:.1f} ms"
+              for (columna, paso), segundos in sorted(tiempos.items(), key=lambda item: -item[1])]
+    return "\n".join(lineas)
@@ -0,0 +1,164 @@
+import numpy as np
+
+# Resúmenes calculados en el servidor para los gráficos del dashboard, de modo que
+# el tamaño de la figura no crezca con el número de empresas filtradas.
+
+# Por encima de estos tamaños la dispersión pasa a WebGL y, después, a densidad agregada
+UMBRAL_WEBGL = 1000
+UMBRAL_DENSIDAD = 50000
+CELDAS_DENSIDAD = 60
+
+
+def _celda(valores, bordes):
+    celdas = len(bordes) - 1
+    return np.clip(np.searchsorted(bordes, valores, side='right') - 1, 0, celdas - 1)
+
+
+def densidad_por_grupo(df, x, y, grupo, celdas=CELDAS_DENSIDAD):
+    # Agrupa los puntos en una rejilla celdas x celdas (común a todos los grupos) y
+    # devuelve un punto por celda ocupada y grupo: su centroide y cuántas empresas tiene.
+    # El resultado tiene como máximo grupos x celdas² filas, sin importar el tamaño de df
+    datos = df[[x, y, grupo]].dropna(subset=[x, y])
+    bordes_x = np.histogram_bin_edges(datos[x].to_numpy(dtype=float), celdas)
+    bordes_y = np.histogram_bin_edges(datos[y].to_numpy(dtype=float), celdas)
+
+    datos = datos.assign(
+        celda_x=_celda(datos[x].to_numpy(dtype=float), bordes_x),
+        celda_y=_celda(datos[y].to_numpy(dtype=float), bordes_y),
+    )
+    densidad = datos.groupby([grupo, 'celda_x', 'celda_y'], sort=False, observed=True).agg(
+        empresas=(y, 'size'),
+        x=(x, 'mean'),
+        y=(y, 'mean'),
+    )
+    return densidad.reset_index()[[grupo, 'x', 'y', 'empresas']]
+
+
+def _ancho_redondo(ancho):
+    # Lleva el ancho de barra a 1, 2 o 5 por una potencia de 10, como hace Plotly
+    magnitud = 10 ** np.floor(np.log10(ancho))
+    for factor in (1, 2, 5, 10):
+        if factor * magnitud >= ancho:
+            return factor * magnitud
+    return 10 * magnitud
+
+
+def histograma(valores, barras=25):
+    # Conteos del histograma con bordes "redondos"; la figura solo recibe barras, no filas
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[~np.isnan(valores)]
+    if len(valores) == 0:
+        return np.array([]), np.array([], dtype=np.int64)
+
+    minimo, maximo = valores.min(), valores.max()
+    if minimo == maximo:
+        bordes = np.array([minimo - 0.5, maximo + 0.5])
+    else:
+        ancho = _ancho_redondo((maximo - minimo) / barras)
+        inicio = np.floor(minimo / ancho) * ancho
+        n_barras = int(np.floor((maximo - inicio) / ancho)) + 1
+        bordes = inicio + ancho * np.arange(n_barras + 1)
+
+    conteos, _ = np.histogram(valores, bins=bordes)
+    return bordes, conteos
+
+
+def factor_banda(n, ancho_banda='scott'):
+    # Mismo significado que bw_method en scipy.stats.gaussian_kde: 'scott', 'silverman'
+    # o un número que multiplica la desviación estándar de los datos
+    if ancho_banda == 'scott':
+        return n ** (-1 / 5)
+    if ancho_banda == 'silverman':
+        return (n * 3 / 4) ** (-1 / 5)
+    return float(ancho_banda)
+
+
+def densidad_kde(valores, x, ancho_banda='scott', puntos_por_banda=20, max_rejilla=2 ** 20):
+    # KDE gaussiana por binning lineal + convolución con FFT: los datos se reparten en
+    # una rejilla fina (O(n)), la rejilla se convoluciona con el núcleo (O(m log m)) y
+    # el resultado se interpola en x. Con 20 puntos de rejilla por ancho de banda el
+    # error frente a gaussian_kde es del orden de 1e-4 relativo al máximo
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[np.isfinite(valores)]
+    x = np.asarray(x, dtype=float)
+    n = len(valores)
+    if n < 2 or valores.min() == valores.max():
+        return np.zeros(len(x))
+
+    h = valores.std(ddof=1) * factor_banda(n, ancho_banda)
+    bajo = min(valores.min(), x.min()) - 4 * h
+    alto = max(valores.max(), x.max()) + 4 * h
+    m = int(min(max(1024, np.ceil((alto - bajo) / h * puntos_por_banda)), max_rejilla))
+    rejilla, delta = np.linspace(bajo, alto, m, retstep=True)
+
+    # Binning lineal: cada dato reparte su peso entre los dos puntos de rejilla vecinos
+    posicion = (valores - bajo) / delta
+    izquierda = np.minimum(np.floor(posicion).astype(np.int64), m - 2)
+    fraccion = posicion - izquierda
+    pesos = np.bincount(izquierda, 1 - fraccion, minlength=m)
+    pesos += np.bincount(izquierda + 1, fraccion, minlength=m)
+
+    # Núcleo muestreado hasta 5 anchos de banda y convolución lineal (sin dar la vuelta)
+    radio = int(min(m - 1, np.ceil(5 * h / delta)))
+    desplazamientos = np.arange(-radio, radio + 1) * delta
+    nucleo = np.exp(-0.5 * (desplazamientos / h) ** 2) / (h * np.sqrt(2 * np.pi))
+    tamano = 1 << int(np.ceil(np.log2(m + 2 * radio)))
+    densidad = np.fft.irfft(np.fft.rfft(pesos, tamano) * np.fft.rfft(nucleo, tamano), tamano)
+    densidad = densidad[radio:radio + m] / n
+
+    return np.interp(x, rejilla, np.maximum(densidad, 0))
+
+
+def _percentil(ordenados, inicios, tamanos, q):
+    # Percentil con interpolación lineal (el método por defecto de NumPy y de Plotly)
+    # para muchos grupos a la vez sobre un único arreglo ordenado por grupo
+    posicion = (tamanos - 1) * q
+    abajo = np.floor(posicion).astype(np.int64)
+    arriba = np.minimum(abajo + 1, tamanos - 1)
+    fraccion = posicion - abajo
+    return ordenados[inicios + abajo] * (1 - fraccion) + ordenados[inicios + arriba] * fraccion
+
+
+def estadisticas_caja(df, valor, grupo, max_atipicos=200):
+    # Cuartiles, bigotes (1.5 * IQR) y una muestra acotada de atípicos por grupo,
+    # en el orden en que aparece cada grupo en los datos
+    datos = df[[grupo, valor]].dropna()
+    codigos, grupos = datos[grupo].factorize()
+    valores = datos[valor].to_numpy(dtype=float)
+    if len(valores) == 0:
+        return []
+
+    orden = np.lexsort((valores, codigos))
+    ordenados = valores[orden]
+    tamanos = np.bincount(codigos, minlength=len(grupos))
+    inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1]))
+
+    q1 = _percentil(ordenados, inicios, tamanos, 0.25)
+    mediana = _percentil(ordenados, inicios, tamanos, 0.5)
+    q3 = _percentil(ordenados, inicios, tamanos, 0.75)
+    iqr = q3 - q1
+
+    cajas = []
+    for i, nombre in enumerate(grupos):
+        valores_grupo = ordenados[inicios[i]:inicios[i] + tamanos[i]]
+        limite_bajo, limite_alto = q1[i] - 1.5 * iqr[i], q3[i] + 1.5 * iqr[i]
+
+        # Los bigotes llegan al último dato dentro de los límites
+        dentro_bajo = np.searchsorted(valores_grupo, limite_bajo, side='left')
+        dentro_alto = np.searchsorted(valores_grupo, limite_alto, side='right')
+        atipicos = np.concatenate((valores_grupo[:dentro_bajo], valores_grupo[dentro_alto:]))
+
+        # Muestra repartida a lo largo de los atípicos, conservando siempre los extremos
+        if len(atipicos) > max_atipicos:
+            atipicos = atipicos[np.linspace(0, len(atipicos) - 1, max_atipicos).round().astype(np.int64)]
+
+        cajas.append({
+            'grupo': nombre,
+            'q1': q1[i],
+            'mediana': mediana[i],
+            'q3': q3[i],
+            'limite_inferior': valores_grupo[dentro_bajo],
+            'limite_superior': valores_grupo[dentro_alto - 1],
+            'atipicos': atipicos,
+        })
+    return cajas
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+PROGRAMAS = ['BOYACÁ EMPRENDE', 'HERRAMIENTAS GERENCIALES', 'MARCA TERRITORIAL SOY BOYACÁ', 'TERRITORIO DE SABORES']
+
+
+def crudos_aleatorios(rng, filas, primer_id=1):
+    # Filas con la forma de la hoja original antes de limpiar: ventas como texto con
+    # valores inválidos, programas combinados con ' ;x| ', 'Sin datos' y faltantes
+    ids = np.arange(primer_id, primer_id + filas)
+    programas = rng.choice(PROGRAMAS, filas).astype(object)
+    combinados = rng.random(filas) < 0.3
+    programas[combinados] = programas[combinados] + ' ;x| ' + rng.choice(PROGRAMAS, combinados.sum())
+
+    productos = rng.choice(['CAFÉ', 'ARTESANÍAS', 'SERVICIOS', 'Sin datos'], filas).astype(object)
+    acompanamiento = rng.choice(['INNOVA 2.0', 'MENTORÍA'], filas).astype(object)
+    acompanamiento[rng.random(filas) < 0.2] = None
+
+    ventas = np.char.mod('%.2f', rng.uniform(0, 50, filas)).astype(object)
+    ventas[rng.random(filas) < 0.2] = '2025-05-09 00:00:00'
+
+    return pd.DataFrame({
+        'ID': ids,
+        'Año': np.full(filas, 2022),
+        'NombreEmpresa': [f"EMPRESA {i}" for i in ids],
+        'ProductoElaborado': productos,
+        'ProgramaVinculado': programas,
+        'AcompanamientoRecibido': acompanamiento,
+        'Numero empleados': rng.integers(1, 50, filas),
+        'Ventas mensuales (Millones)': ventas,
+    })
+
+
+def nulos_como_nan(df):
+    # Parquet y Arrow devuelven los textos faltantes como None; limpiar() los deja como NaN
+    return df.where(df.notna(), np.nan)
+
+
+def leer_parquet(ruta):
+    return nulos_como_nan(pd.read_parquet(ruta))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from consulta_tabla import aplicar_filtros, separar_filtro
+
+
+@pytest.mark.parametrize('parte, esperado', [
+    ('{Correo} icontains 1', ('Correo', 'icontains', '1')),
+    ('{ID} > 1390', ('ID', '>', '1390')),
+    ('{ID} = 12.5', ('ID', '=', '12.5')),
+    ('{NombreEmpresa} contains "EMPRESA 3"', ('NombreEmpresa', 'contains', 'EMPRESA 3')),
+    ("{NombreEmpresa} eq 'don\\'t'", ('NombreEmpresa', 'eq', "don't")),
+    ('{Municipio} = Tunja', ('Municipio', '=', 'Tunja')),
+    ('sin columna', (None, None, None)),
+])
+def test_separar_filtro_conserva_el_texto(parte, esperado):
+    assert separar_filtro(parte) == esperado
+
+
+def tabla_de_prueba():
+    ids = np.arange(1, 41)
+    correos = pd.array([f"empresa{i}@correo.com" if i % 5 else None for i in ids], dtype='string[pyarrow]')
+    return pd.DataFrame({
+        'ID': ids.astype('int16'),
+        'Ventas': [i / 4 if i % 7 else np.nan for i in ids],
+        'NombreEmpresa': pd.array([f"EMPRESA {i} S.A.S" for i in ids], dtype='string[pyarrow]'),
+        'Correo': correos,
+        'Codigo': [str(i % 12) for i in ids],
+    })
+
+
+def filas_directas(df, columna, prueba):
+    # Fila por fila, sin pandas: los faltantes no cumplen ninguna condición
+    return [i for i, valor in zip(df.index, df[columna]) if not pd.isna(valor) and prueba(valor)]
+
+
+@pytest.mark.parametrize('consulta, columna, prueba', [
+    # Texto de solo dígitos en columnas de texto: se busca el texto, no "1.0"
+    ('{Correo} icontains 1', 'Correo', lambda v: '1' in v.lower()),
+    ('{Correo} contains 3', 'Correo', lambda v: '3' in v),
+    ('{NombreEmpresa} icontains 3', 'NombreEmpresa', lambda v: '3' in v.lower()),
+    ('{Codigo} = 7', 'Codigo', lambda v: v == '7'),
+    ('{Codigo} eq 07', 'Codigo', lambda v: v == '07'),
+    # En columnas numéricas las comparaciones usan el número
+    ('{ID} = 7', 'ID', lambda v: v == 7),
+    ('{ID} > 30', 'ID', lambda v: v > 30),
+    ('{ID} <= 4', 'ID', lambda v: v <= 4),
+    ('{Ventas} >= 7.5', 'Ventas', lambda v: v >= 7.5),
+    ('{Ventas} = 2.5', 'Ventas', lambda v: v == 2.5),
+    # contains en una columna numérica busca en el texto del número
+    ('{ID} contains 3', 'ID', lambda v: '3' in str(v)),
+    ('{ID} icontains 1', 'ID', lambda v: '1' in str(v)),
+])
+def test_aplicar_filtros_con_texto_de_digitos(consulta, columna, prueba):
+    df = tabla_de_prueba()
+    assert list(aplicar_filtros(df, consulta).index) == filas_directas(df, columna, prueba)
+
+
+def test_aplicar_filtros_combinados():
+    df = tabla_de_prueba()
+    resultado = aplicar_filtros(df, '{Correo} icontains 1 && {ID} < 20')
+    assert list(resultado.index) == filas_directas(df[df['ID'] < 20], 'Correo', lambda v: '1' in v)
+
+
+def test_aplicar_filtros_numero_contra_texto_no_deja_filas():
+    assert len(aplicar_filtros(tabla_de_prueba(), '{ID} > abc')) == 0
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from estadisticas import combinar, correlacion, covarianza, descriptivos, momentos, momentos_por_grupo, spearman
+
+
+def valores_aleatorios(rng, filas, columnas):
+    # Columnas con escalas distintas, faltantes en cada una y a veces una constante
+    valores = rng.normal(rng.uniform(-50, 50, columnas), rng.uniform(0.1, 100, columnas), (filas, columnas))
+    valores[rng.random((filas, columnas)) < rng.uniform(0, 0.4, columnas)] = np.nan
+    if rng.random() < 0.3:
+        valores[:, rng.integers(columnas)] = 7.0
+    return valores
+
+
+@pytest.mark.parametrize('semilla', range(8))
+def test_correlacion_coincide_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    valores = valores_aleatorios(rng, int(rng.integers(0, 400)), 4)
+    esperado = pd.DataFrame(valores).corr().to_numpy()
+    np.testing.assert_allclose(correlacion(momentos(valores)), esperado, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('semilla', range(8))
+def test_correlacion_de_grupos_combinados_coincide_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    filas = int(rng.integers(1, 600))
+    n_grupos = int(rng.integers(1, 30))
+    valores = valores_aleatorios(rng, filas, 4)
+    grupos = rng.integers(0, n_grupos, filas)
+    por_grupo = momentos_por_grupo(valores, grupos, n_grupos)
+
+    # Selecciones de grupos como las celdas del cubo que deja cada combinación de filtros,
+    # incluidas la vacía, la completa y las que caen en grupos sin filas
+    for _ in range(20):
+        seleccion = np.flatnonzero(rng.random(n_grupos) < rng.random())
+        esperado = pd.DataFrame(valores[np.isin(grupos, seleccion)]).corr().to_numpy()
+        np.testing.assert_allclose(correlacion(combinar(por_grupo, seleccion)), esperado, rtol=1e-9, atol=1e-12)
+
+    esperado = pd.DataFrame(valores).corr().to_numpy()
+    np.testing.assert_allclose(correlacion(combinar(por_grupo)), esperado, rtol=1e-9, atol=1e-12)
+
+
+def descripcion_pandas(valores):
+    return pd.DataFrame(valores).describe().T[['count', 'mean', 'std', 'min', 'max']]
+
+
+# pandas avisa al calcular cov() de selecciones vacías o de una fila
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('semilla', range(8))
+def test_covarianza_y_descriptivos_coinciden_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    valores = valores_aleatorios(rng, int(rng.integers(0, 400)), 4)
+    m = momentos(valores)
+    np.testing.assert_allclose(covarianza(m), pd.DataFrame(valores).cov().to_numpy(), rtol=1e-9, atol=1e-9)
+    pd.testing.assert_frame_equal(descriptivos(m), descripcion_pandas(valores), rtol=1e-9, atol=1e-12,
+                                  check_index_type=False, check_names=False)
+
+
+# pandas avisa al calcular cov() de selecciones vacías o de una fila
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('semilla', range(8))
+def test_covarianza_y_descriptivos_de_grupos_combinados_coinciden_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    filas = int(rng.integers(1, 600))
+    n_grupos = int(rng.integers(1, 30))
+    valores = valores_aleatorios(rng, filas, 4)
+    grupos = rng.integers(0, n_grupos, filas)
+    por_grupo = momentos_por_grupo(valores, grupos, n_grupos)
+
+    for _ in range(20):
+        seleccion = np.flatnonzero(rng.random(n_grupos) < rng.random())
+        elegidos = valores[np.isin(grupos, seleccion)]
+        m = combinar(por_grupo, seleccion)
+        np.testing.assert_allclose(covarianza(m), pd.DataFrame(elegidos).cov().to_numpy(), rtol=1e-9, atol=1e-9)
+        pd.testing.assert_frame_equal(descriptivos(m), descripcion_pandas(elegidos), rtol=1e-9, atol=1e-12,
+                                      check_index_type=False, check_names=False)
+
+
+@pytest.mark.parametrize('semilla', range(8))
+def test_spearman_coincide_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    valores = valores_aleatorios(rng, int(rng.integers(0, 400)), 4)
+    # Valores repetidos para que haya empates en los rangos
+    if rng.random() < 0.5:
+        valores = np.round(valores / 20)
+    esperado = pd.DataFrame(valores).corr('spearman').to_numpy()
+    np.testing.assert_allclose(spearman(valores), esperado, rtol=1e-9, atol=1e-12)
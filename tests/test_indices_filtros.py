@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indices_filtros import VENTAS, construir_indice, filas_seleccionadas
+
+SECTORES = ['Agroindustria', 'Artesanal', 'Industria', 'Servicios']
+MUNICIPIOS = ['Tunja', 'Duitama', 'Sogamoso', 'Paipa', 'Chiquinquirá', 'Moniquirá']
+
+
+def datos_aleatorios(rng, filas):
+    ventas = np.round(rng.uniform(0, 50, filas), 1)
+    ventas[rng.random(filas) < 0.15] = np.nan
+    sectores = rng.choice(SECTORES + [None], filas, p=[0.24, 0.24, 0.24, 0.24, 0.04])
+    return pd.DataFrame({
+        'SectorProductivo': pd.Categorical(sectores),
+        'Municipio': pd.Categorical(rng.choice(MUNICIPIOS, filas)),
+        VENTAS: ventas,
+    })
+
+
+def filtrar_directo(df, sector, municipios, ventas_range):
+    mascara = pd.Series(True, index=df.index)
+    if sector:
+        mascara &= df['SectorProductivo'] == sector
+    if municipios:
+        mascara &= df['Municipio'].isin(municipios)
+    if ventas_range:
+        mascara &= df[VENTAS].between(*ventas_range)
+    return np.flatnonzero(mascara.to_numpy())
+
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_filas_seleccionadas_coincide_con_pandas(semilla):
+    rng = np.random.default_rng(semilla)
+    df = datos_aleatorios(rng, int(rng.integers(1, 3000)))
+    indice = construir_indice(df)
+
+    # Una secuencia de consultas como la de un usuario moviendo los filtros, con rangos
+    # que se solapan, que no se solapan, vacíos y fuera de los datos
+    for _ in range(60):
+        sector = rng.choice(SECTORES + ['Inexistente']) if rng.random() < 0.4 else None
+        municipios = list(rng.choice(MUNICIPIOS + ['Otro'], int(rng.integers(0, 4)), replace=False))
+        minimo = float(rng.integers(-5, 55))
+        ventas_range = [minimo, minimo + float(rng.integers(0, 30))] if rng.random() < 0.9 else None
+
+        posiciones = filas_seleccionadas(indice, sector, municipios, ventas_range)
+        if posiciones is None:
+            posiciones = np.arange(len(df))
+        np.testing.assert_array_equal(posiciones, filtrar_directo(df, sector, municipios, ventas_range))
+
+
+def test_sin_ventas_ni_filtros():
+    df = pd.DataFrame({
+        'SectorProductivo': pd.Categorical(['Industria', 'Servicios']),
+        'Municipio': pd.Categorical(['Tunja', 'Paipa']),
+        VENTAS: [np.nan, np.nan],
+    })
+    indice = construir_indice(df)
+    assert filas_seleccionadas(indice) is None
+    assert len(filas_seleccionadas(indice, ventas_range=[0, 100])) == 0
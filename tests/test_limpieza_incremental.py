@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos_crudos import crudos_aleatorios, leer_parquet
+from limpiar_datos_empresas import limpiar, limpiar_incremental
+
+
+def comprobar_almacen(ruta, almacen):
+    esperado = limpiar(pd.read_csv(ruta))
+    pd.testing.assert_frame_equal(leer_parquet(almacen), esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('semilla, filas_por_bloque', [(0, 7), (1, 50), (2, 1000)])
+def test_incremental_igual_a_limpiar_todo(tmp_path, semilla, filas_por_bloque):
+    rng = np.random.default_rng(semilla)
+    ruta, almacen = tmp_path / 'crudos.csv', tmp_path / 'limpio.parquet'
+    crudos = crudos_aleatorios(rng, 120)
+    siguiente_id = 121
+
+    crudos.to_csv(ruta, index=False)
+    resumen = limpiar_incremental(str(ruta), str(almacen), filas_por_bloque=filas_por_bloque)
+    assert resumen == {'filas': 120, 'limpiadas': 120, 'eliminadas': 0}
+    comprobar_almacen(ruta, almacen)
+
+    for ronda in range(4):
+        # Se borran, modifican y agregan filas, y se cambia el orden del archivo
+        borrar = rng.random(len(crudos)) < 0.1
+        crudos = crudos[~borrar].reset_index(drop=True)
+        modificar = rng.random(len(crudos)) < 0.15
+        crudos.loc[modificar, 'NombreEmpresa'] = crudos.loc[modificar, 'NombreEmpresa'] + f" MOD{ronda}"
+        crudos.loc[modificar, 'Ventas mensuales (Millones)'] = np.char.mod('%.3f', rng.uniform(0, 50, modificar.sum()))
+        nuevas = int(rng.integers(0, 15))
+        crudos = pd.concat([crudos, crudos_aleatorios(rng, nuevas, siguiente_id)], ignore_index=True)
+        siguiente_id += nuevas
+        crudos = crudos.sample(frac=1, random_state=ronda).reset_index(drop=True)
+
+        crudos.to_csv(ruta, index=False)
+        resumen = limpiar_incremental(str(ruta), str(almacen), filas_por_bloque=filas_por_bloque)
+        assert resumen == {'filas': len(crudos), 'limpiadas': int(modificar.sum()) + nuevas,
+                           'eliminadas': int(borrar.sum())}
+        comprobar_almacen(ruta, almacen)
+
+    # Mismas filas en otro orden: nada que limpiar, pero el almacén sigue el orden nuevo
+    crudos.iloc[::-1].to_csv(ruta, index=False)
+    resumen = limpiar_incremental(str(ruta), str(almacen), filas_por_bloque=filas_por_bloque)
+    assert resumen == {'filas': len(crudos), 'limpiadas': 0, 'eliminadas': 0}
+    comprobar_almacen(ruta, almacen)
+
+    # Sin cambios en el archivo no se vuelve a leer
+    resumen = limpiar_incremental(str(ruta), str(almacen), filas_por_bloque=filas_por_bloque)
+    assert resumen == {'filas': len(crudos), 'limpiadas': 0, 'eliminadas': 0}
+
+
+def test_incremental_rechaza_claves_repetidas(tmp_path):
+    crudos = crudos_aleatorios(np.random.default_rng(0), 10)
+    crudos.loc[3, 'ID'] = crudos.loc[2, 'ID']
+    ruta = tmp_path / 'crudos.csv'
+    crudos.to_csv(ruta, index=False)
+
+    with pytest.raises(ValueError):
+        limpiar_incremental(str(ruta), str(tmp_path / 'limpio.parquet'))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from datos_crudos import crudos_aleatorios, nulos_como_nan
+from limpiar_datos_empresas import limpiar, limpiar_lote, tareas_lote
+
+
+def leer_almacen(directorio):
+    # Las particiones vuelven como columnas departamento/anio; se ordena por ID porque
+    # el orden entre archivos de partición no está definido
+    df = pd.read_parquet(directorio)
+    df = df.assign(departamento=df['departamento'].astype(str), anio=df['anio'].astype(str))
+    return nulos_como_nan(df).sort_values('ID', ignore_index=True)
+
+
+def test_lote_igual_a_limpiar_cada_archivo(tmp_path):
+    rng = np.random.default_rng(0)
+    primero = crudos_aleatorios(rng, 57)
+    primero['Año'] = rng.choice([2021, 2022, 2023], len(primero))
+    segundo = crudos_aleatorios(rng, 31, primer_id=1000)
+    segundo.insert(1, 'Departamento', rng.choice(['Boyaca', 'Cundinamarca'], len(segundo)))
+    primero.to_csv(tmp_path / 'a.csv', index=False)
+    segundo.to_csv(tmp_path / 'b.csv', index=False)
+    directorio = tmp_path / 'almacen'
+
+    tareas = tareas_lote([str(tmp_path / '*.csv')])
+    assert limpiar_lote(tareas, str(directorio), procesos=2) == (len(primero) + len(segundo), 0)
+    # Una segunda corrida reemplaza lo que dejó la primera en lugar de duplicarlo
+    assert limpiar_lote(tareas, str(directorio), procesos=2) == (len(primero) + len(segundo), 0)
+
+    esperado = pd.concat([
+        limpiar(pd.read_csv(tmp_path / 'a.csv')).assign(departamento='Boyaca'),
+        limpiar(pd.read_csv(tmp_path / 'b.csv')).pipe(lambda df: df.assign(departamento=df['Departamento'])),
+    ], ignore_index=True)
+    esperado['anio'] = esperado['Año'].astype(str)
+    # Al leer el directorio completo el esquema sale de uno de los archivos: la columna
+    # Departamento de b.csv se compara a través de la partición
+    esperado = esperado.drop(columns='Departamento').sort_values('ID', ignore_index=True)
+
+    almacen = leer_almacen(directorio)
+    pd.testing.assert_frame_equal(almacen[esperado.columns], esperado, check_dtype=False)
+
+
+def test_lote_informa_los_errores(tmp_path):
+    crudos_aleatorios(np.random.default_rng(1), 5).to_csv(tmp_path / 'bien.csv', index=False)
+    tareas = tareas_lote([str(tmp_path / 'bien.csv'), str(tmp_path / 'no_existe.csv')])
+
+    assert limpiar_lote(tareas, str(tmp_path / 'almacen'), procesos=2) == (5, 1)
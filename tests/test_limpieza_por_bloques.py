@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos_crudos import crudos_aleatorios, leer_parquet
+from limpiar_datos_empresas import limpiar, limpiar_por_bloques
+
+
+@pytest.mark.parametrize('filas_por_bloque', [1, 7, 40, 103, 500])
+def test_por_bloques_csv_igual_a_limpiar_todo(tmp_path, filas_por_bloque):
+    # 103 filas: ninguno de los tamaños (salvo 103 y 500) divide el total
+    crudos = crudos_aleatorios(np.random.default_rng(filas_por_bloque), 103)
+    ruta = tmp_path / 'crudos.csv'
+    crudos.to_csv(ruta, index=False)
+    salida = tmp_path / 'limpio.parquet'
+
+    filas = limpiar_por_bloques(str(ruta), str(salida), filas_por_bloque=filas_por_bloque)
+
+    assert filas == len(crudos)
+    pd.testing.assert_frame_equal(leer_parquet(salida), limpiar(pd.read_csv(ruta)))
+
+
+@pytest.mark.parametrize('filas_por_bloque', [9, 64])
+def test_por_bloques_excel_igual_a_limpiar_todo(tmp_path, filas_por_bloque):
+    crudos = crudos_aleatorios(np.random.default_rng(3), 61)
+    ruta = tmp_path / 'crudos.xlsx'
+    crudos.to_excel(ruta, sheet_name='Datos', index=False)
+    salida = tmp_path / 'limpio.parquet'
+
+    limpiar_por_bloques(str(ruta), str(salida), hoja='Datos', filas_por_bloque=filas_por_bloque)
+
+    esperado = limpiar(pd.read_excel(ruta, sheet_name='Datos'))
+    pd.testing.assert_frame_equal(leer_parquet(salida), esperado, check_dtype=False)
+
+
+@pytest.mark.parametrize('filas_por_bloque', [1, 3, 7])
+def test_por_bloques_con_tipos_que_cambian_entre_bloques(tmp_path, filas_por_bloque):
+    # Los primeros bloques tienen ventas enteras, productos vacíos y empleados enteros;
+    # más adelante aparecen decimales y texto que el primer bloque no anticipa
+    crudos = crudos_aleatorios(np.random.default_rng(5), 20)
+    crudos['Ventas mensuales (Millones)'] = [str(10 + i % 4) for i in range(20)]
+    crudos.loc[14, 'Ventas mensuales (Millones)'] = '12.5'
+    crudos['ProductoElaborado'] = None
+    crudos.loc[[12, 17], 'ProductoElaborado'] = ['CAFÉ', 'Sin datos']
+    crudos['Numero empleados'] = crudos['Numero empleados'].astype(object)
+    crudos.loc[16, 'Numero empleados'] = 4.5
+    ruta = tmp_path / 'crudos.csv'
+    crudos.to_csv(ruta, index=False)
+    salida = tmp_path / 'limpio.parquet'
+
+    assert limpiar_por_bloques(str(ruta), str(salida), filas_por_bloque=filas_por_bloque) == 20
+    pd.testing.assert_frame_equal(leer_parquet(salida), limpiar(pd.read_csv(ruta)))
+
+
+def test_por_bloques_sin_filas(tmp_path):
+    crudos = crudos_aleatorios(np.random.default_rng(0), 0)
+    ruta = tmp_path / 'vacio.csv'
+    crudos.to_csv(ruta, index=False)
+    salida = tmp_path / 'limpio.parquet'
+
+    assert limpiar_por_bloques(str(ruta), str(salida), filas_por_bloque=10) == 0
+    limpio = pd.read_parquet(salida)
+    assert len(limpio) == 0 and list(limpio.columns) == list(crudos.columns)
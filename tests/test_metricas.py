@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from metricas import Contador, Histograma, Maximos, MetricasCompartidas, exponer_metricas
+
+
+def nuevas_metricas():
+    return [
+        Histograma('prueba_segundos', "Histograma de prueba", ('callback',)),
+        Contador('prueba_total', "Contador de prueba", ('callback', 'estado')),
+        Maximos('prueba_maximos', "Máximos de prueba", ('filtros',), limite=5),
+    ]
+
+
+def observaciones(semilla, n):
+    rng = np.random.default_rng(semilla)
+    return [(f"c{rng.integers(4)}", float(rng.exponential(0.3)), int(rng.choice([200, 204, 500])),
+             f"f{rng.integers(12)}") for _ in range(n)]
+
+
+def registrar(metricas, lista):
+    histograma, contador, maximos = metricas
+    for callback, segundos, estado, filtros in lista:
+        histograma.observar(segundos, callback=callback)
+        contador.incrementar(callback=callback, estado=estado)
+        maximos.observar(segundos, filtros=filtros)
+
+
+def _worker(compartidas, semilla, n):
+    # Mide sobre las métricas heredadas del maestro con el fork, como un worker de gunicorn
+    registrar(compartidas.metricas, observaciones(semilla, n))
+    compartidas.escribir()
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_metricas_de_varios_procesos_se_suman(tmp_path, workers):
+    # Como con gunicorn --preload: el maestro arranca antes que los workers
+    compartidas = MetricasCompartidas(str(tmp_path), nuevas_metricas())
+    contexto = multiprocessing.get_context('fork')
+    procesos = [contexto.Process(target=_worker, args=(compartidas, semilla, 50 + 17 * semilla))
+                for semilla in range(workers)]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()
+        assert proceso.exitcode == 0
+
+    # El proceso que responde /metrics también midió lo suyo
+    registrar(compartidas.metricas, observaciones(99, 30))
+
+    # Lo mismo medido en un solo proceso
+    todas = nuevas_metricas()
+    for semilla in list(range(workers)) + [99]:
+        registrar(todas, observaciones(semilla, 30 if semilla == 99 else 50 + 17 * semilla))
+
+    # Las sumas en punto flotante dependen del orden; se comparan con tolerancia
+    def valores(texto):
+        filas = [linea.rsplit(" ", 1) for linea in texto.splitlines() if not linea.startswith("#")]
+        return [nombre for nombre, _ in filas], np.array([float(valor) for _, valor in filas])
+
+    nombres, obtenidos = valores(compartidas.exponer())
+    nombres_esperados, esperados = valores(exponer_metricas(todas))
+    assert nombres == nombres_esperados
+    np.testing.assert_allclose(obtenidos, esperados, rtol=1e-12)
+
+
+def test_se_borran_los_archivos_de_procesos_terminados(tmp_path):
+    (tmp_path / "999999999.json").write_text("{}")
+    (tmp_path / f"{os.getppid()}.json").write_text("{}")
+    MetricasCompartidas(str(tmp_path), nuevas_metricas())
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{os.getppid()}.json"]
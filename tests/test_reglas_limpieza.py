@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datos_crudos import nulos_como_nan
+from reglas_limpieza import REGLAS, aplicar_reglas, compilar
+
+VALORES = [
+    'CAFÉ', '  café  de  origen ', 'Sin datos', ' Sin  datos ', '', '   ', 'A ;x| B', ' ;x| A ;x|  ;x| ',
+    'A;B', ';', ' uno ; dos ;; tres ', '12.5', ' 7 ', '1e3', 'abc', 3, 4.25, None, np.nan,
+]
+
+REGLAS_PRUEBA = {
+    **REGLAS,
+    'todo': {'normalizar': True, 'nulos': ['Sin datos', ''], 'separador': ';', 'unir_con': ' | ', 'rellenar': 'N/A'},
+    'numero_normalizado': {'normalizar': True, 'numerico': True},
+    'sin_unir_con': {'separador': ';'},
+}
+
+
+def limpiar_valor(valor, regla):
+    # La misma regla aplicada valor por valor, sin factorizar
+    if regla.get('normalizar') and isinstance(valor, str):
+        valor = ' '.join(valor.split())
+    if regla.get('nulos') and not pd.isna(valor) and valor in regla['nulos']:
+        valor = np.nan
+    if regla.get('separador') and isinstance(valor, str):
+        partes = [parte.strip() for parte in valor.split(regla['separador'])]
+        valor = regla.get('unir_con', regla['separador']).join(parte for parte in partes if parte)
+    if 'rellenar' in regla and pd.isna(valor):
+        valor = regla['rellenar']
+    return valor
+
+
+def aplicar_directo(df, reglas):
+    df = df.copy()
+    for columna, regla in reglas.items():
+        limpia = df[columna].map(lambda valor: limpiar_valor(valor, regla)).astype(object)
+        if regla.get('numerico'):
+            limpia = pd.to_numeric(limpia, errors='coerce')
+        df[columna] = limpia
+    return df
+
+
+@pytest.mark.parametrize('semilla', range(5))
+def test_reglas_igual_a_aplicar_valor_por_valor(semilla):
+    rng = np.random.default_rng(semilla)
+    filas = int(rng.integers(0, 400))
+    valores = np.empty(len(VALORES), dtype=object)
+    valores[:] = VALORES
+    df = pd.DataFrame({columna: rng.choice(valores, filas) for columna in REGLAS_PRUEBA})
+    df['otra'] = rng.choice(valores, filas)
+
+    tiempos = {}
+    resultado = aplicar_reglas(df.copy(), REGLAS_PRUEBA, tiempos)
+
+    pd.testing.assert_frame_equal(nulos_como_nan(resultado), nulos_como_nan(aplicar_directo(df, REGLAS_PRUEBA)))
+    assert {columna for columna, _ in tiempos} == set(REGLAS_PRUEBA)
+
+
+def test_reglas_columna_numerica_sin_faltantes():
+    df = pd.DataFrame({'Ventas mensuales (Millones)': ['1', '2', '3', '2']})
+    resultado = aplicar_reglas(df.copy(), {'Ventas mensuales (Millones)': {'numerico': True}})
+    pd.testing.assert_series_equal(resultado['Ventas mensuales (Millones)'],
+                                   pd.Series([1, 2, 3, 2], name='Ventas mensuales (Millones)'))
+
+
+def test_compilar_rechaza_pasos_desconocidos():
+    with pytest.raises(ValueError):
+        compilar({'ProductoElaborado': {'quitar_tildes': True}})